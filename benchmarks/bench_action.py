@@ -0,0 +1,86 @@
+"""
+Throughput of ``CallbackAction`` serialization for actions with 2 to 10 fields
+in the default and compact encodings.
+
+Run with ``python -m benchmarks.bench_action``.
+"""
+
+from enum import Enum
+from typing import Any, Type
+
+from aiokilogram.action import (
+    CallbackAction, EnumActionField, IntegerActionField, StringActionField,
+)
+from benchmarks.common import BenchResult, measure, print_results
+
+
+class BenchEnum(Enum):
+    first = 'first'
+    second = 'second'
+    third = 'third'
+
+
+# Kinds of fields (string, integer, enum) the actions consist of
+FIELD_MIXES = {
+    'str': 's',
+    'int': 'i',
+    'enum': 'e',
+    'mixed': 'sie',
+}
+
+
+def _get_field_kind(idx: int, mix: str) -> str:
+    kinds = FIELD_MIXES[mix]
+    return kinds[idx % len(kinds)]
+
+
+def make_action_cls(field_count: int, compact: bool = False, mix: str = 'mixed') -> Type[CallbackAction]:
+    fields: dict[str, Any] = {}
+    if compact:
+        fields['COMPACT_TAG'] = 'b'
+
+    for idx in range(field_count):
+        kind = _get_field_kind(idx, mix)
+        if kind == 's':
+            fields[f'field_{idx}'] = StringActionField()
+        elif kind == 'i':
+            fields[f'field_{idx}'] = IntegerActionField()
+        else:
+            fields[f'field_{idx}'] = EnumActionField(enum_cls=BenchEnum)
+    name = f'{"Compact" if compact else ""}BenchAction{field_count}'
+    return type(name, (CallbackAction,), fields)
+
+
+def make_action_values(field_count: int, mix: str = 'mixed') -> dict[str, Any]:
+    values: dict[str, Any] = {}
+    for idx in range(field_count):
+        kind = _get_field_kind(idx, mix)
+        if kind == 's':
+            values[f'field_{idx}'] = f'value{idx}'
+        elif kind == 'i':
+            values[f'field_{idx}'] = idx * 1000
+        else:
+            values[f'field_{idx}'] = BenchEnum.second
+    return values
+
+
+def collect(number: int = 20000) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    for compact in (False, True):
+        codec_name = 'compact' if compact else 'default'
+        for mix in FIELD_MIXES:
+            for field_count in (2, 5, 10):
+                action_cls = make_action_cls(field_count, compact=compact, mix=mix)
+                action = action_cls(**make_action_values(field_count, mix=mix))
+                data = action.serialize()
+                params = dict(codec=codec_name, mix=mix, fields=field_count)
+                results.append(measure('action.serialize', action.serialize, number, **params))
+                results.append(measure(
+                    'action.deserialize', lambda: action_cls.deserialize(data), number, **params))
+                results.append(measure('action.get_pattern', action_cls.get_pattern, number, **params))
+
+    return results
+
+
+if __name__ == '__main__':
+    print_results(collect())
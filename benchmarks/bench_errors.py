@@ -0,0 +1,52 @@
+"""
+Overhead of the ``handle_errors`` wrapper around handler methods.
+
+Run with ``python -m benchmarks.bench_errors``.
+"""
+
+from aiogram import types
+
+from aiokilogram.errors import DefaultErrorHandler, handle_errors
+from aiokilogram.handler import CommandHandler
+from aiokilogram.settings import BaseGlobalSettings
+from benchmarks.common import BenchResult, FakeBot, measure_async, print_results
+
+
+class BenchErrorHandler(DefaultErrorHandler):
+    def make_message(self, err: Exception) -> str:
+        return 'Something went wrong'
+
+
+def make_message() -> types.Message:
+    return types.Message(**{
+        'message_id': 1, 'date': 0, 'text': '/start',
+        'chat': {'id': 100, 'type': 'private'},
+        'from': {'id': 100, 'is_bot': False, 'first_name': 'User'},
+    })
+
+
+def collect(number: int = 20000) -> list[BenchResult]:
+    messenger = CommandHandler(bot=FakeBot(), global_settings=BaseGlobalSettings(tg_bot_token='12345:BENCHMARK'))
+    message = make_message()
+
+    async def handle(event: types.Message) -> None:
+        pass
+
+    async def fail(event: types.Message) -> None:
+        raise ValueError('Failed')
+
+    wrap = handle_errors(error_handlers=[BenchErrorHandler()], messenger=messenger)
+    wrapped_handle = wrap(handle)
+    wrapped_fail = wrap(fail)
+    return [
+        measure_async('errors.handler', lambda: handle(message), number, wrapper='none'),
+        measure_async('errors.handler', lambda: wrapped_handle(message), number, wrapper='handle_errors'),
+        measure_async(
+            'errors.handler', lambda: wrapped_fail(message), number,
+            wrapper='handle_errors', error='handled',
+        ),
+    ]
+
+
+if __name__ == '__main__':
+    print_results(collect())
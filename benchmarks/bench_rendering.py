@@ -0,0 +1,63 @@
+"""
+Sending pages with large keyboards via ``CommandHandler.send_message_page``.
+
+Run with ``python -m benchmarks.bench_rendering``.
+"""
+
+from aiokilogram.action import CallbackAction, IntegerActionField, StringActionField
+from aiokilogram.handler import CommandHandler
+from aiokilogram.page import MessagePage, simple_page
+from aiokilogram.rendering import KeyboardRenderer
+from aiokilogram.settings import BaseGlobalSettings
+from benchmarks.common import BenchResult, FakeBot, measure_async, print_results
+
+
+class ItemAction(CallbackAction):
+    kind = StringActionField()
+    item_id = IntegerActionField()
+
+
+def make_page(button_count: int) -> MessagePage:
+    return simple_page(
+        text='Items',
+        buttons=[(f'Item {idx}', ItemAction(kind='item', item_id=idx)) for idx in range(button_count)],
+    )
+
+
+def make_handler(max_cache_size: int = 1024) -> CommandHandler:
+    return CommandHandler(
+        bot=FakeBot(), global_settings=BaseGlobalSettings(tg_bot_token='12345:BENCHMARK'),
+        keyboard_renderer=KeyboardRenderer(max_cache_size=max_cache_size),
+    )
+
+
+def collect(number: int = 500) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    for button_count in (10, 50, 100):
+        uncached_handler = make_handler(max_cache_size=0)
+        results.append(measure_async(
+            'rendering.send_message_page',
+            lambda: uncached_handler.send_message_page(user_id='1', page=make_page(button_count)),
+            number, buttons=button_count, mode='uncached',
+        ))
+
+        cached_handler = make_handler()
+        results.append(measure_async(
+            'rendering.send_message_page',
+            lambda: cached_handler.send_message_page(user_id='1', page=make_page(button_count)),
+            number, buttons=button_count, mode='cached',
+        ))
+
+        frozen_handler = make_handler()
+        frozen_page = make_page(button_count).freeze()
+        results.append(measure_async(
+            'rendering.send_message_page',
+            lambda: frozen_handler.send_message_page(user_id='1', page=frozen_page),
+            number, buttons=button_count, mode='frozen',
+        ))
+
+    return results
+
+
+if __name__ == '__main__':
+    print_results(collect())
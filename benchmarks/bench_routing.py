@@ -0,0 +1,109 @@
+"""
+Routing of callback queries through ``KiloDispatcher``
+with 10, 100 and 1000 registered actions
+and with 10, 100 and 1000 distinct action classes.
+
+Run with ``python -m benchmarks.bench_routing``.
+"""
+
+from typing import Any, Type
+
+from aiogram import types
+
+from aiokilogram.action import CallbackAction, IntegerActionField, StringActionField
+from aiokilogram.dispatcher import KiloDispatcher
+from benchmarks.common import BenchResult, FakeBot, measure_async, print_results
+
+
+ROUTES_PER_ACTION_CLS = 10
+
+
+def make_dispatcher(route_count: int, compact: bool) -> tuple[KiloDispatcher, list[CallbackAction]]:
+    """
+    Register ``route_count`` routes over action classes
+    with ``ROUTES_PER_ACTION_CLS`` fixed values each.
+    Return the dispatcher and an action matching each of the routes
+    """
+
+    dispatcher = KiloDispatcher(bot=FakeBot())
+    actions: list[CallbackAction] = []
+
+    async def handler(query: types.CallbackQuery) -> None:
+        pass
+
+    for cls_idx in range(max(route_count // ROUTES_PER_ACTION_CLS, 1)):
+        fields: dict[str, Any] = dict(kind=StringActionField(), item_id=IntegerActionField())
+        if compact:
+            fields['COMPACT_TAG'] = f'r{cls_idx}'
+        action_cls: Type[CallbackAction] = type(f'RouteAction{cls_idx}', (CallbackAction,), fields)
+        for value_idx in range(min(route_count, ROUTES_PER_ACTION_CLS)):
+            kind = f'kind{value_idx}'
+            dispatcher.register_callback_query_handler(handler, action=action_cls.when(kind=kind))
+            actions.append(action_cls(kind=kind, item_id=12345))
+
+    return dispatcher, actions
+
+
+def make_class_dispatcher(class_count: int) -> tuple[KiloDispatcher, list[CallbackAction]]:
+    """
+    Register a route for each of ``class_count`` action classes
+    that differ by the pattern of their first field.
+    Return the dispatcher and an action of each of the classes
+    """
+
+    dispatcher = KiloDispatcher(bot=FakeBot())
+    actions: list[CallbackAction] = []
+
+    async def handler(query: types.CallbackQuery) -> None:
+        pass
+
+    for cls_idx in range(class_count):
+        section = f'section{cls_idx}'
+        fields: dict[str, Any] = dict(
+            a_section=StringActionField(pattern=section), item_id=IntegerActionField(),
+        )
+        action_cls: Type[CallbackAction] = type(f'ClassAction{cls_idx}', (CallbackAction,), fields)
+        dispatcher.register_callback_query_handler(handler, action=action_cls)
+        actions.append(action_cls(a_section=section, item_id=12345))
+
+    return dispatcher, actions
+
+
+def make_callback_update(data: str) -> types.Update:
+    return types.Update(**{
+        'update_id': 1,
+        'callback_query': {
+            'id': '1', 'chat_instance': '1', 'data': data,
+            'from': {'id': 100, 'is_bot': False, 'first_name': 'User'},
+        },
+    })
+
+
+def collect(number: int = 2000) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    for compact in (False, True):
+        for route_count in (10, 100, 1000):
+            dispatcher, actions = make_dispatcher(route_count, compact=compact)
+            params = dict(codec='compact' if compact else 'default', routes=route_count)
+            # The first and the last registered routes
+            for position, action in (('first', actions[0]), ('last', actions[-1])):
+                update = make_callback_update(action.serialize())
+                results.append(measure_async(
+                    'routing.process_update', lambda: dispatcher.process_update(update), number,
+                    position=position, **params,
+                ))
+
+    for class_count in (10, 100, 1000):
+        dispatcher, actions = make_class_dispatcher(class_count)
+        for position, action in (('first', actions[0]), ('last', actions[-1])):
+            update = make_callback_update(action.serialize())
+            results.append(measure_async(
+                'routing.process_update', lambda: dispatcher.process_update(update), number,
+                position=position, classes=class_count,
+            ))
+
+    return results
+
+
+if __name__ == '__main__':
+    print_results(collect())
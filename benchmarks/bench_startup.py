@@ -0,0 +1,68 @@
+"""
+Registration of many handler classes at bot startup.
+
+Run with ``python -m benchmarks.bench_startup``.
+"""
+
+from typing import Any, Type
+
+from aiogram import types
+
+from aiokilogram.bot import KiloBot
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.handler import CommandHandler
+from aiokilogram.registration import register_message_handler
+from aiokilogram.settings import BaseGlobalSettings
+from benchmarks.common import BenchResult, FakeBot, measure, print_results
+
+
+class BaseBenchHandler(CommandHandler):
+    """Has helper methods and attributes like most real handler classes do"""
+
+    def format_item(self, item: Any) -> str:
+        return str(item)
+
+    def get_user_name(self, event: types.Message) -> str:
+        return event.from_user.first_name
+
+    @register_message_handler(commands={'help'})
+    async def help(self, event: types.Message) -> None:
+        pass
+
+
+def make_handler_cls(idx: int, method_count: int) -> Type[CommandHandler]:
+    namespace: dict[str, Any] = {}
+    for method_idx in range(method_count):
+        async def handle(self: CommandHandler, event: types.Message) -> None:
+            pass
+
+        namespace[f'handle_{method_idx}'] = register_message_handler(commands={f'cmd_{idx}_{method_idx}'})(handle)
+    return type(f'BenchHandler{idx}', (BaseBenchHandler,), namespace)
+
+
+def collect(number: int = 20) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    bot = FakeBot()
+    for method_count in (1, 10):
+        # Decorated methods are collected when the class is created
+        results.append(measure(
+            'startup.define_class', lambda: make_handler_cls(0, method_count),
+            number * 10, methods=method_count,
+        ))
+        for class_count in (10, 100):
+            handler_classes = [make_handler_cls(idx, method_count) for idx in range(class_count)]
+            kilo_bot = KiloBot(
+                handler_classes=handler_classes,
+                global_settings=BaseGlobalSettings(tg_bot_token='12345:BENCHMARK'),
+            )
+            results.append(measure(
+                'startup.register',
+                lambda: kilo_bot.register(bot=bot, dispatcher=KiloDispatcher(bot=bot)),
+                number, classes=class_count, methods=method_count,
+            ))
+
+    return results
+
+
+if __name__ == '__main__':
+    print_results(collect())
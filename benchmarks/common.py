@@ -0,0 +1,106 @@
+"""
+Measurement helpers and a fake ``Bot`` shared by the benchmarks
+"""
+
+import asyncio
+import datetime
+import json
+import platform
+import time
+from importlib import metadata
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import attr
+from aiogram import Bot, types
+
+
+@attr.s(frozen=True)
+class BenchResult:
+    name: str = attr.ib(kw_only=True)
+    params: dict[str, Any] = attr.ib(kw_only=True)
+    number: int = attr.ib(kw_only=True)
+    usec_per_op: float = attr.ib(kw_only=True)
+
+    @property
+    def key(self) -> str:
+        params = ','.join(f'{name}={value}' for name, value in sorted(self.params.items()))
+        return f'{self.name}[{params}]'
+
+    @property
+    def ops_per_sec(self) -> float:
+        return 1_000_000 / self.usec_per_op if self.usec_per_op else 0.0
+
+
+def measure(name: str, func: Callable[[], Any], number: int, **params: Any) -> BenchResult:
+    func()  # Warm up caches
+    started_at = time.perf_counter()
+    for _ in range(number):
+        func()
+    elapsed = time.perf_counter() - started_at
+    return BenchResult(name=name, params=params, number=number, usec_per_op=elapsed / number * 1_000_000)
+
+
+def measure_async(name: str, func: Callable[[], Awaitable], number: int, **params: Any) -> BenchResult:
+    async def run() -> float:
+        await func()
+        started_at = time.perf_counter()
+        for _ in range(number):
+            await func()
+        return time.perf_counter() - started_at
+
+    elapsed = asyncio.run(run())
+    return BenchResult(name=name, params=params, number=number, usec_per_op=elapsed / number * 1_000_000)
+
+
+class FakeBot(Bot):
+    """Answers API calls locally without sending any requests"""
+
+    def __init__(self) -> None:
+        super().__init__(token='12345:BENCHMARK')
+        self.call_count = 0
+
+    async def send_message(self, chat_id: Any, *args: Any, **kwargs: Any) -> types.Message:  # type: ignore
+        self.call_count += 1
+        return types.Message(message_id=self.call_count, chat={'id': chat_id, 'type': 'private'})
+
+    async def edit_message_text(self, *args: Any, **kwargs: Any) -> bool:  # type: ignore
+        self.call_count += 1
+        return True
+
+    async def edit_message_reply_markup(self, *args: Any, **kwargs: Any) -> bool:  # type: ignore
+        self.call_count += 1
+        return True
+
+    async def answer_callback_query(self, *args: Any, **kwargs: Any) -> bool:  # type: ignore
+        self.call_count += 1
+        return True
+
+
+def print_results(results: Iterable[BenchResult], baseline: Optional[dict[str, float]] = None) -> None:
+    for result in results:
+        line = f'{result.key:<70} {result.usec_per_op:>12.2f} us {result.ops_per_sec:>12.0f} op/s'
+        if baseline is not None and result.key in baseline:
+            line += f' {baseline[result.key] / result.usec_per_op:>8.2f}x'
+        print(line)
+
+
+def write_results(results: Iterable[BenchResult], path: str) -> None:
+    data = {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'aiokilogram': metadata.version('aiokilogram'),
+        'aiogram': metadata.version('aiogram'),
+        'results': [
+            {'key': result.key, **attr.asdict(result)}
+            for result in results
+        ],
+    }
+    with open(path, 'w') as result_file:
+        json.dump(data, result_file, indent=2)
+
+
+def load_baseline(path: str) -> dict[str, float]:
+    """Return ``{key: usec_per_op}`` of a previously written result file"""
+    with open(path) as result_file:
+        data = json.load(result_file)
+    return {result['key']: result['usec_per_op'] for result in data['results']}
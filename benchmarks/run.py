@@ -0,0 +1,51 @@
+"""
+Run all benchmarks and store the results as JSON.
+
+Run with ``python -m benchmarks.run --output results.json``.
+Pass ``--compare old_results.json`` to show the speedup relative to an earlier run.
+"""
+
+import argparse
+
+from benchmarks import bench_action, bench_errors, bench_rendering, bench_routing, bench_startup
+from benchmarks.common import BenchResult, load_baseline, print_results, write_results
+
+
+# {name: (collect function, number of iterations)}
+BENCHMARKS = {
+    'action': (bench_action.collect, 20000),
+    'routing': (bench_routing.collect, 2000),
+    'rendering': (bench_rendering.collect, 500),
+    'errors': (bench_errors.collect, 20000),
+    'startup': (bench_startup.collect, 20),
+}
+
+# Numbers of iterations are divided by this in quick mode
+QUICK_DIVISOR = 10
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', help='Path of the JSON file to write the results to')
+    parser.add_argument('--compare', help='Path of a JSON file with earlier results')
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help='Run only these benchmarks')
+    parser.add_argument('--quick', action='store_true', help='Run fewer iterations')
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    results: list[BenchResult] = []
+    for name, (collect, number) in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        if args.quick:
+            number = max(number // QUICK_DIVISOR, 1)
+        bench_results = collect(number)
+        print_results(bench_results, baseline=baseline)
+        results.extend(bench_results)
+
+    if args.output:
+        write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
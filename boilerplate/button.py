@@ -39,8 +39,7 @@ class RecipeCommandHandler(CommandHandler):
     """Handles recipe commands"""
 
     @register_callback_query_handler(action=SingleRecipeAction)
-    async def do_single_recipe_action(self, query: types.CallbackQuery) -> None:
-        action = SingleRecipeAction.deserialize(query.data)
+    async def do_single_recipe_action(self, query: types.CallbackQuery, action: SingleRecipeAction) -> None:
         if action.action_type == ActionType.show_recipe:
             page = simple_page(
                 text=rf'Here is the "{action.recipe_title}" recipe: \.\.\.',
@@ -56,7 +55,8 @@ class RecipeCommandHandler(CommandHandler):
         else:
             raise ValueError(f'Unsupported action: {action.action_type}')
 
-        await self.send_message_page(user_id=query.from_user.id, page=page)
+        # Show the page in place of the message with the pressed button
+        await self.update_message_page(message=query.message, page=page)
 
     def _make_recipe_list_page(self, owner: RecipeOwner) -> MessagePage:
         """Using the `simple_page` shortcut function here"""
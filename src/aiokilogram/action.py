@@ -4,10 +4,13 @@ import abc
 import inspect
 import re
 from enum import Enum
-from typing import Any, ClassVar, Generic, Optional, Type, TypeVar, overload
+from types import MappingProxyType
+from typing import Any, ClassVar, Generic, Mapping, Optional, Type, TypeVar, overload
 
 import attr
 
+from aiokilogram import codec
+
 
 _ACTION_FIELD_TV = TypeVar('_ACTION_FIELD_TV', bound='ActionField')
 
@@ -28,6 +31,19 @@ class ActionField(abc.ABC):
     def deserialize(self, str_value: str) -> Any:
         raise NotImplementedError
 
+    def get_literals(self) -> Optional[frozenset[str]]:
+        """Return all serialized values the field can take or ``None`` if they are not limited"""
+        return None
+
+    def encode_compact(self, value: Any) -> str:
+        """Encode value for the compact callback data format"""
+        return codec.encode_str(self.serialize(value))
+
+    def decode_compact(self, data: str, pos: int) -> tuple[Any, int]:
+        """Decode value starting at ``pos``. Return the value and the position after it"""
+        str_value, pos = codec.decode_str(data, pos)
+        return self.deserialize(str_value), pos
+
     def __set_name__(self, owner: Type[CallbackAction], name: str) -> None:
         self._name = name
 
@@ -47,6 +63,10 @@ class ActionField(abc.ABC):
 @attr.s(slots=True)
 class StringActionField(ActionField):
     pattern: str = attr.ib(default='.*')
+    _compiled_pattern: re.Pattern = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._compiled_pattern = re.compile(self.pattern)
 
     def get_pattern(self, value: Optional[Any] = None) -> str:
         if value is not None:
@@ -58,9 +78,25 @@ class StringActionField(ActionField):
         assert isinstance(value, str)
         return value
 
+    def get_literals(self) -> Optional[frozenset[str]]:
+        if re.escape(self.pattern) == self.pattern:
+            # The pattern has no special characters
+            return frozenset((self.pattern,))
+        return None
+
     def deserialize(self, str_value: str) -> Any:
         return str_value
 
+    def encode_compact(self, value: Any) -> str:
+        assert isinstance(value, str)
+        return codec.encode_str(value)
+
+    def decode_compact(self, data: str, pos: int) -> tuple[Any, int]:
+        value, end = codec.decode_str(data, pos)
+        if self._compiled_pattern.fullmatch(value) is None:
+            raise ValueError(f'Compact string at position {pos} of {data!r} does not match {self.pattern!r}')
+        return value, end
+
 
 @attr.s(slots=True)
 class IntegerActionField(ActionField):
@@ -79,6 +115,13 @@ class IntegerActionField(ActionField):
     def deserialize(self, str_value: str) -> Any:
         return int(str_value)
 
+    def encode_compact(self, value: Any) -> str:
+        assert isinstance(value, int)
+        return codec.encode_int(value)
+
+    def decode_compact(self, data: str, pos: int) -> tuple[Any, int]:
+        return codec.decode_int(data, pos)
+
 
 _ENUM_ACTION_FIELD_TV = TypeVar('_ENUM_ACTION_FIELD_TV', bound=Enum)
 
@@ -86,6 +129,12 @@ _ENUM_ACTION_FIELD_TV = TypeVar('_ENUM_ACTION_FIELD_TV', bound=Enum)
 @attr.s(slots=True)
 class EnumActionField(ActionField, Generic[_ENUM_ACTION_FIELD_TV]):
     enum_cls: Type[_ENUM_ACTION_FIELD_TV] = attr.ib()
+    _members: tuple[_ENUM_ACTION_FIELD_TV, ...] = attr.ib(init=False, repr=False)
+    _ordinals: dict[_ENUM_ACTION_FIELD_TV, int] = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._members = tuple(self.enum_cls)
+        self._ordinals = {member: idx for idx, member in enumerate(self._members)}
 
     def serialize_enum_value(self, value: _ENUM_ACTION_FIELD_TV) -> str:
         return value.name
@@ -108,6 +157,42 @@ class EnumActionField(ActionField, Generic[_ENUM_ACTION_FIELD_TV]):
     def deserialize(self, str_value: str) -> _ENUM_ACTION_FIELD_TV:
         return self.enum_cls[str_value]
 
+    def get_literals(self) -> Optional[frozenset[str]]:
+        return frozenset(self.serialize_enum_value(value) for value in self.enum_cls)
+
+    def encode_compact(self, value: Any) -> str:
+        assert isinstance(value, self.enum_cls)
+        return codec.encode_uint(self._ordinals[value])
+
+    def decode_compact(self, data: str, pos: int) -> tuple[Any, int]:
+        ordinal, pos = codec.decode_uint(data, pos)
+        try:
+            return self._members[ordinal], pos
+        except IndexError:
+            raise ValueError(f'Invalid ordinal {ordinal} for {self.enum_cls.__name__}')
+
+
+@attr.s(frozen=True, slots=True)
+class ActionSchema:
+    """Ordered set of fields of an action class, compiled once per class"""
+
+    fields: tuple[tuple[str, ActionField], ...] = attr.ib(kw_only=True)
+    props: Mapping[str, ActionField] = attr.ib(kw_only=True)
+    names: frozenset[str] = attr.ib(kw_only=True)
+
+    @classmethod
+    def from_action_cls(cls, action_cls: Type[CallbackAction]) -> ActionSchema:
+        fields = tuple(sorted(
+            (name, member)
+            for name, member in inspect.getmembers(action_cls)
+            if isinstance(member, ActionField)
+        ))
+        return cls(
+            fields=fields,
+            props=MappingProxyType(dict(fields)),
+            names=frozenset(name for name, _ in fields),
+        )
+
 
 _ACTION_TV = TypeVar('_ACTION_TV', bound='CallbackAction')
 
@@ -116,21 +201,31 @@ class CallbackAction(abc.ABC):
     __slots__ = ('_data',)
 
     SEP: ClassVar[str] = '/'
+    # Set this to a short unique string to enable the compact encoding for the action class
+    COMPACT_TAG: ClassVar[Optional[str]] = None
+
+    _action_schema: ClassVar[ActionSchema] = ActionSchema(fields=(), props=MappingProxyType({}), names=frozenset())
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.COMPACT_TAG is not None:
+            codec.validate_tag(cls.COMPACT_TAG)
+        cls._action_schema = ActionSchema.from_action_cls(cls)
 
     def __init__(self, **data: Any):
-        action_props = self.get_action_props()
-        for name, value in data.items():
-            if name not in action_props:
+        field_names = self._action_schema.names
+        for name in data:
+            if name not in field_names:
                 raise AttributeError(f'Invalid action field {name} for {type(self).__name__}')
         self._data: dict[str, Any] = data
 
+    @classmethod
+    def get_action_schema(cls) -> ActionSchema:
+        return cls._action_schema
+
     @classmethod
     def get_action_props(cls) -> dict[str, ActionField]:
-        return {
-            name: member
-            for name, member in inspect.getmembers(cls)
-            if isinstance(member, ActionField)
-        }
+        return dict(cls._action_schema.props)
 
     @property
     def data(self) -> dict[str, Any]:
@@ -138,28 +233,84 @@ class CallbackAction(abc.ABC):
 
     @classmethod
     def get_pattern(cls, **values: Any) -> str:
+        """
+        Return a regexp matching the callback data of the action with the given field values.
+        The data of compact actions can only be matched as a whole,
+        so for them field values raise ``ValueError``
+        (route them via ``action=cls.when(...)`` instead).
+        """
         assert isinstance(values, dict)
+        if cls.COMPACT_TAG is not None:
+            if any(value is not None for value in values.values()):
+                raise ValueError(
+                    f'Field values of compact action {cls.__name__} cannot be matched with a regexp, '
+                    f'route it via action={cls.__name__}.when(...) instead'
+                )
+            return f'^{re.escape(cls.COMPACT_TAG + codec.TAG_SEP)}.*$'
+
         sep_pattern = re.escape(cls.SEP)
         parts: list[str] = []
-        for name, field in sorted(cls.get_action_props().items()):
+        for name, field in cls._action_schema.fields:
             parts.append(field.get_pattern(value=values.get(name)))
 
         main_pattern = sep_pattern.join(parts)
         return f'^{main_pattern}$'
 
+    @classmethod
+    def get_capturing_pattern(cls) -> str:
+        """Same as ``get_pattern()``, but with each field captured in a named group"""
+        sep_pattern = re.escape(cls.SEP)
+        main_pattern = sep_pattern.join([
+            f'(?P<{name}>{field.get_pattern()})'
+            for name, field in cls._action_schema.fields
+        ])
+        return f'^{main_pattern}$'
+
     def serialize(self) -> str:
-        parts: list[str] = []
-        for name, field in sorted(self.get_action_props().items()):
-            parts.append(field.serialize(getattr(self, name)))
+        if self.COMPACT_TAG is not None:
+            return self.serialize_compact()
+
+        data = self._data
+        return self.SEP.join([
+            field.serialize(data[name])
+            for name, field in self._action_schema.fields
+        ])
 
-        return self.SEP.join(parts)
+    def serialize_compact(self) -> str:
+        tag = self.COMPACT_TAG
+        assert tag is not None
+        data = self._data
+        body = ''.join([
+            field.encode_compact(data[name])
+            for name, field in self._action_schema.fields
+        ])
+        return f'{tag}{codec.TAG_SEP}{body}'
 
     @classmethod
     def deserialize(cls: Type[_ACTION_TV], str_value: str) -> _ACTION_TV:
+        if cls.COMPACT_TAG is not None:
+            return cls.deserialize_compact(str_value)
+
         parts = str_value.split(cls.SEP)
+        kwargs: dict[str, Any] = {
+            name: field.deserialize(prop_str_value)
+            for (name, field), prop_str_value in zip(cls._action_schema.fields, parts)
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def deserialize_compact(cls: Type[_ACTION_TV], str_value: str) -> _ACTION_TV:
+        tag = cls.COMPACT_TAG
+        assert tag is not None
+        data_tag, pos = codec.split_tag(str_value)
+        if data_tag != tag:
+            raise ValueError(f'Invalid tag {data_tag!r} for {cls.__name__}, expected {tag!r}')
+
         kwargs: dict[str, Any] = {}
-        for (name, field), prop_str_value in zip(sorted(cls.get_action_props().items()), parts):
-            kwargs[name] = field.deserialize(prop_str_value)
+        for name, field in cls._action_schema.fields:
+            kwargs[name], pos = field.decode_compact(str_value, pos)
+        if pos != len(str_value):
+            raise ValueError(f'Unexpected trailing data in {str_value!r} for {cls.__name__}')
 
         return cls(**kwargs)
 
@@ -171,6 +322,9 @@ class CallbackAction(abc.ABC):
 
     @classmethod
     def when(cls, **values) -> ActionParameterization:
+        for name in values:
+            if name not in cls._action_schema.names:
+                raise AttributeError(f'Invalid action field {name} for {cls.__name__}')
         return ActionParameterization(action_cls=cls, values=values)
 
     def clone(self: _ACTION_TV, **kwargs: Any) -> _ACTION_TV:
@@ -183,4 +337,5 @@ class ActionParameterization:
     values: dict[str, Any] = attr.ib(kw_only=True)
 
     def get_pattern(self, **values) -> str:
+        """See ``CallbackAction.get_pattern()``. Not supported for compact actions"""
         return self.action_cls.get_pattern(**self.values, **values)
@@ -0,0 +1,112 @@
+"""
+Server-side storage for callback data that doesn't fit into a button.
+
+Telegram limits callback data to 64 bytes. Longer data is saved in an ``ActionStore``
+and the button gets a short token instead, which is resolved back
+by ``KiloDispatcher`` before routing the callback query.
+"""
+
+from __future__ import annotations
+
+import abc
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import attr
+
+
+MAX_CALLBACK_DATA_SIZE = 64
+TOKEN_PREFIX = '~'
+
+
+@attr.s
+class ActionStoreStats:
+    hits: int = attr.ib(kw_only=True, default=0)
+    misses: int = attr.ib(kw_only=True, default=0)
+    evictions: int = attr.ib(kw_only=True, default=0)
+    expirations: int = attr.ib(kw_only=True, default=0)
+
+
+@attr.s
+class ActionStore(abc.ABC):
+    """
+    Base class for action stores.
+
+    Tokens are derived from the content,
+    so re-rendering the same button doesn't produce new entries.
+    Redefine ``save`` and ``load`` to use an external backend.
+    """
+
+    stats: ActionStoreStats = attr.ib(init=False, factory=ActionStoreStats)
+
+    @abc.abstractmethod
+    async def save(self, token: str, data: str) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def load(self, token: str) -> Optional[str]:
+        """Return saved data or ``None`` if it is unknown or has expired"""
+        raise NotImplementedError
+
+    def make_token(self, data: str) -> str:
+        digest = hashlib.blake2b(data.encode(), digest_size=12).digest()
+        return base64.urlsafe_b64encode(digest).decode()
+
+    async def shorten(self, data: str) -> str:
+        """Replace callback data with a token if it doesn't fit into a button"""
+        if len(data.encode()) <= MAX_CALLBACK_DATA_SIZE:
+            return data
+
+        token = self.make_token(data)
+        await self.save(token=token, data=data)
+        return f'{TOKEN_PREFIX}{token}'
+
+    async def resolve(self, data: str) -> str:
+        """Return the original callback data if ``data`` is a token or ``data`` itself otherwise"""
+        if not data.startswith(TOKEN_PREFIX):
+            return data
+
+        full_data = await self.load(token=data[len(TOKEN_PREFIX):])
+        if full_data is None:
+            self.stats.misses += 1
+            return data
+
+        self.stats.hits += 1
+        return full_data
+
+
+@attr.s
+class MemoryActionStore(ActionStore):
+    """In-memory store with LRU eviction and expiration"""
+
+    max_size: int = attr.ib(kw_only=True, default=100_000)
+    ttl: float = attr.ib(kw_only=True, default=7 * 24 * 3600)  # seconds
+    # {token: (data, expiration time)}
+    _entries: OrderedDict[str, tuple[str, float]] = attr.ib(init=False, factory=OrderedDict)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def save(self, token: str, data: str) -> None:
+        self._entries[token] = (data, time.monotonic() + self.ttl)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def load(self, token: str) -> Optional[str]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+
+        data, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[token]
+            self.stats.expirations += 1
+            return None
+
+        self._entries.move_to_end(token)
+        return data
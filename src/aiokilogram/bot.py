@@ -1,17 +1,30 @@
 from __future__ import annotations
 
 import abc
-from typing import Collection, Generic, Optional, Type, TypeVar, TYPE_CHECKING
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Collection, Generic, Optional, Type, TypeVar, TYPE_CHECKING
 
+import aiohttp
 import attr
-from aiogram import Bot
+from aiogram import Bot, Dispatcher
+from aiogram.bot.api import TELEGRAM_PRODUCTION, TelegramAPIServer
 from aiogram.dispatcher.storage import BaseStorage
 
 from aiokilogram.settings import BaseGlobalSettings
 from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.action_store import ActionStore
+from aiokilogram.rendering import KeyboardRenderer, RenderedPageHistory
+from aiokilogram.scheduler import SendScheduler
+from aiokilogram.profiling import UpdateProfiler
 
 if TYPE_CHECKING:
+    # Optional features are imported when they are first used
+    from aiohttp import web
     from aiokilogram.handler import CommandHandler
+    from aiokilogram.http_pool import HttpSessionPool
+    from aiokilogram.metrics import MetricsRegistry
+    from aiokilogram.sharding import _Queue
 
 
 _GSETTINGS_TV = TypeVar('_GSETTINGS_TV', bound=BaseGlobalSettings)
@@ -21,22 +34,193 @@ _GSETTINGS_TV = TypeVar('_GSETTINGS_TV', bound=BaseGlobalSettings)
 class KiloBot(abc.ABC, Generic[_GSETTINGS_TV]):
     _handler_classes: Collection[Type[CommandHandler]] = attr.ib(kw_only=True, default=())
     _global_settings: _GSETTINGS_TV = attr.ib(kw_only=True)
+    _send_scheduler: Optional[SendScheduler] = attr.ib(init=False, default=None)
+    _metrics_registry: Optional[MetricsRegistry] = attr.ib(init=False, default=None)
+    # Can be shared by several bots. Is made by ``make_http_session_pool`` if not set
+    _http_session_pool: Optional[HttpSessionPool] = attr.ib(kw_only=True, default=None)
+
+    @property
+    def http_session_pool(self) -> Optional[HttpSessionPool]:
+        return self._http_session_pool
 
     def register(self, bot: Bot, dispatcher: KiloDispatcher) -> None:
+        keyboard_renderer = self.make_keyboard_renderer(dispatcher=dispatcher)
+        page_history = RenderedPageHistory()
         for handler_cls in self._handler_classes:
-            handler = handler_cls(bot=bot, global_settings=self._global_settings)
+            handler = handler_cls(
+                bot=bot, global_settings=self._global_settings,
+                keyboard_renderer=keyboard_renderer,
+                page_history=page_history,
+                send_scheduler=self._send_scheduler,
+                metrics_registry=self._metrics_registry,
+            )
             handler.register(dispatcher=dispatcher)
 
     def make_fsm_storage(self) -> Optional[BaseStorage]:
         """Redefine this if you want to use FSMStorage in your bot"""
         return None
 
-    async def run(self):
-        bot = Bot(token=self._global_settings.tg_bot_token)
+    def make_action_store(self) -> Optional[ActionStore]:
+        """Redefine this if your buttons' callback data can exceed 64 bytes"""
+        return None
+
+    def make_keyboard_renderer(self, dispatcher: KiloDispatcher) -> KeyboardRenderer:
+        """Redefine this to tune the keyboard rendering cache"""
+        return KeyboardRenderer(action_store=dispatcher.action_store)
+
+    def make_send_scheduler(self) -> Optional[SendScheduler]:
+        """Redefine this to keep outbound messages within Telegram's rate limits"""
+        return None
+
+    def make_metrics_registry(self) -> Optional[MetricsRegistry]:
+        """Redefine this to collect per-handler metrics"""
+        if self._global_settings.metrics_port is not None:
+            from aiokilogram.metrics import MetricsRegistry
+
+            return MetricsRegistry()
+        return None
+
+    def make_update_profiler(self) -> Optional[UpdateProfiler]:
+        """Redefine this to customize slow update reports and profiling"""
+        settings = self._global_settings
+        if settings.slow_update_threshold is None and settings.profile_sample_every is None:
+            return None
+        return UpdateProfiler(
+            slow_threshold=settings.slow_update_threshold,
+            sample_every=settings.profile_sample_every,
+            output_dir=settings.profile_dir,
+        )
+
+    def make_http_session_pool(self) -> HttpSessionPool:
+        """Redefine this to customize the connection pool of Bot API requests"""
+        from aiokilogram.http_pool import HttpSessionPool
+
+        return HttpSessionPool.from_settings(self._global_settings)
+
+    def make_bot(self) -> Bot:
+        """Redefine this to customize the bot object"""
+        from aiokilogram.http_pool import PooledBot
+
+        settings = self._global_settings
+        server = TELEGRAM_PRODUCTION
+        if settings.tg_api_server is not None:
+            server = TelegramAPIServer.from_base(settings.tg_api_server)
+        timeout: Optional[aiohttp.ClientTimeout] = None
+        if settings.http_request_timeout is not None:
+            timeout = aiohttp.ClientTimeout(
+                total=settings.http_request_timeout, connect=settings.http_connect_timeout,
+            )
+        if self._http_session_pool is None:
+            self._http_session_pool = self.make_http_session_pool()
+        return PooledBot(
+            token=settings.tg_bot_token, server=server, timeout=timeout,
+            session_pool=self._http_session_pool,
+        )
+
+    @asynccontextmanager
+    async def _make_dispatcher(self, shard_id: Optional[int] = None) -> AsyncGenerator[KiloDispatcher, None]:
+        bot = self.make_bot()
+        self._send_scheduler = self.make_send_scheduler()
+        self._metrics_registry = self.make_metrics_registry()
+        metrics_runner: Optional[web.AppRunner] = None
         try:
+            settings = self._global_settings
+            if self._metrics_registry is not None and settings.metrics_port is not None:
+                from aiokilogram.metrics import serve_metrics
+
+                # Every shard serves the metrics of its own handlers
+                metrics_port = settings.metrics_port + (shard_id or 0)
+                metrics_runner = await serve_metrics(
+                    self._metrics_registry, host=settings.metrics_host, port=metrics_port,
+                )
             fsm_storage = self.make_fsm_storage()
-            dispatcher = KiloDispatcher(bot=bot, storage=fsm_storage)
+            dispatcher = KiloDispatcher(
+                bot=bot, storage=fsm_storage,
+                action_store=self.make_action_store(),
+                chat_ordered_concurrency=self._global_settings.chat_ordered_concurrency,
+                profiler=self.make_update_profiler(),
+            )
             self.register(bot=bot, dispatcher=dispatcher)
+            try:
+                yield dispatcher
+            finally:
+                if dispatcher.profiler is not None:
+                    dispatcher.profiler.dump_handler_stats()
+                if fsm_storage is not None:
+                    # Pending writes of caching storages are flushed here
+                    await fsm_storage.close()
+                    await fsm_storage.wait_closed()
+        finally:
+            if self._send_scheduler is not None:
+                await self._send_scheduler.close()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            await bot.close()
+
+    async def _receive_updates(self, bot: Bot, dispatcher: Dispatcher) -> None:
+        if self._global_settings.webhook_url is not None:
+            await self.run_webhook(bot=bot, dispatcher=dispatcher)
+        else:
             await dispatcher.start_polling()
+
+    async def run(self):
+        async with self._make_dispatcher() as dispatcher:
+            await self._receive_updates(bot=dispatcher.bot, dispatcher=dispatcher)
+
+    async def run_sharded(self, shard_count: int, health_interval: float = 5.0, max_pending: int = 100) -> None:
+        """
+        Receive updates in this process and handle them in ``shard_count`` worker processes.
+
+        Every worker builds its own dispatcher and handlers,
+        so the bot object must be picklable.
+        Updates of a single chat are always handled by the same worker in order.
+        Every worker processes updates of different chats concurrently
+        and takes at most ``max_pending`` updates ahead of processing.
+        If ``metrics_port`` is set, worker N serves its metrics on ``metrics_port + N``.
+        """
+        from aiokilogram.sharding import ShardPool, ShardingDispatcher
+
+        shard_pool = ShardPool(
+            kilo_bot=self, shard_count=shard_count,
+            health_interval=health_interval, max_pending=max_pending,
+        )
+        shard_pool.start()
+        bot = self.make_bot()
+        monitor_task = asyncio.create_task(shard_pool.monitor())
+        try:
+            dispatcher = ShardingDispatcher(bot=bot, shard_pool=shard_pool)
+            await self._receive_updates(bot=bot, dispatcher=dispatcher)
         finally:
+            monitor_task.cancel()
+            await shard_pool.stop()
             await bot.close()
+
+    async def run_shard(
+            self, shard_id: int, update_queue: _Queue, health_queue: _Queue, health_interval: float,
+            max_pending: int = 100,
+    ) -> None:
+        """Entry point of a worker process started by ``run_sharded``"""
+        from aiokilogram.sharding import serve_shard
+
+        async with self._make_dispatcher(shard_id=shard_id) as dispatcher:
+            await serve_shard(
+                dispatcher=dispatcher, shard_id=shard_id,
+                update_queue=update_queue, health_queue=health_queue,
+                health_interval=health_interval, max_pending=max_pending,
+            )
+
+    async def run_webhook(self, bot: Bot, dispatcher: Dispatcher) -> None:
+        from aiokilogram.webhook import WebhookServer
+
+        settings = self._global_settings
+        server = WebhookServer(
+            dispatcher=dispatcher, path=settings.webhook_path,
+            secret_token=settings.webhook_secret_token,
+            max_pending=settings.webhook_max_pending,
+        )
+        await bot.set_webhook(settings.webhook_url, secret_token=settings.webhook_secret_token)
+        try:
+            await server.serve(host=settings.webhook_host, port=settings.webhook_port)
+        finally:
+            # Telegram keeps the updates until the webhook is set again or they are polled
+            await bot.delete_webhook()
@@ -0,0 +1,136 @@
+"""
+Sending the same message to a large number of users
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+import attr
+from aiogram.utils.exceptions import BotBlocked, ChatNotFound, NetworkError, RetryAfter, UserDeactivated
+
+
+LOGGER = logging.getLogger(__name__)
+
+UserIds = Union[AsyncIterable[Any], Iterable[Any]]
+
+# Errors meaning that the user will never receive the message
+_UNREACHABLE_USER_ERRORS = (BotBlocked, ChatNotFound, UserDeactivated)
+
+
+@attr.s
+class BroadcastProgress:
+    sent: int = attr.ib(kw_only=True, default=0)
+    blocked: int = attr.ib(kw_only=True, default=0)
+    failed: int = attr.ib(kw_only=True, default=0)
+    retries: int = attr.ib(kw_only=True, default=0)
+    started_at: float = attr.ib(kw_only=True, factory=time.monotonic)
+    finished_at: Optional[float] = attr.ib(kw_only=True, default=None)
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at if self.finished_at is not None else time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Processed recipients per second"""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+async def _iter_user_ids(user_ids: UserIds) -> AsyncIterator[Any]:
+    if isinstance(user_ids, AsyncIterable):
+        async for user_id in user_ids:
+            yield user_id
+    else:
+        for user_id in user_ids:
+            yield user_id
+
+
+async def _send_to_user(
+        send: Callable[[Any], Awaitable[Any]], user_id: Any,
+        progress: BroadcastProgress, max_retries: int, retry_flood_errors: bool,
+) -> None:
+    attempt = 0
+    while True:
+        try:
+            await send(user_id)
+        except _UNREACHABLE_USER_ERRORS:
+            progress.blocked += 1
+        except (RetryAfter, NetworkError) as err:
+            if attempt >= max_retries or (isinstance(err, RetryAfter) and not retry_flood_errors):
+                LOGGER.warning(f'Failed to send broadcast message to {user_id}: {err}')
+                progress.failed += 1
+                return
+            attempt += 1
+            progress.retries += 1
+            await asyncio.sleep(err.timeout if isinstance(err, RetryAfter) else 2 ** attempt)
+            continue
+        except Exception as err:
+            LOGGER.warning(f'Failed to send broadcast message to {user_id}: {err!r}')
+            progress.failed += 1
+        else:
+            progress.sent += 1
+        return
+
+
+async def run_broadcast(
+        send: Callable[[Any], Awaitable[Any]], user_ids: UserIds,
+        concurrency: int = 20, max_retries: int = 3,
+        on_progress: Optional[Callable[[BroadcastProgress], Any]] = None,
+        progress_every: int = 1000, retry_flood_errors: bool = True,
+) -> BroadcastProgress:
+    """
+    Call ``send`` for every user ID with at most ``concurrency`` calls in progress.
+
+    User IDs are consumed lazily, so memory usage doesn't depend on their number.
+    Users that have blocked the bot or no longer exist are counted, but not retried.
+    ``on_progress`` is called after every ``progress_every`` recipients and at the end.
+    Disable ``retry_flood_errors`` if ``send`` retries ``RetryAfter`` errors itself.
+    """
+
+    progress = BroadcastProgress()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stop = object()
+    next_report_at = progress_every
+
+    async def produce() -> None:
+        async for user_id in _iter_user_ids(user_ids):
+            await queue.put(user_id)
+        for _ in range(concurrency):
+            await queue.put(stop)
+
+    async def consume() -> None:
+        nonlocal next_report_at
+        while True:
+            user_id = await queue.get()
+            if user_id is stop:
+                return
+            await _send_to_user(
+                send=send, user_id=user_id, progress=progress,
+                max_retries=max_retries, retry_flood_errors=retry_flood_errors,
+            )
+            if on_progress is not None and progress.processed >= next_report_at:
+                while next_report_at <= progress.processed:
+                    next_report_at += progress_every
+                on_progress(progress)
+
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(consume()) for _ in range(concurrency))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    progress.finished_at = time.monotonic()
+    if on_progress is not None:
+        on_progress(progress)
+    return progress
@@ -0,0 +1,126 @@
+"""
+Automatic answering of callback queries
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import attr
+from aiogram import Bot, types
+from aiogram.dispatcher.handler import SkipHandler, ctx_data
+from aiogram.utils.exceptions import TelegramAPIError
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@attr.s(frozen=True)
+class CallbackAnswer:
+    """Can be returned by callback query handlers to show a notification to the user"""
+
+    text: Optional[str] = attr.ib(kw_only=True, default=None)
+    # Show an alert instead of a notification at the top of the chat screen
+    show_alert: bool = attr.ib(kw_only=True, default=False)
+
+
+_FUNC_TV = TypeVar('_FUNC_TV', bound=Callable[..., Awaitable])
+
+# Key of the handler data the answer of the query is kept in for the handlers after a skipped one
+_ANSWER_DATA_KEY = '_kilo_callback_answer'
+
+
+@attr.s
+class _PendingAnswer:
+    """Answer of a callback query sent concurrently with its handler"""
+
+    bot: Bot = attr.ib(kw_only=True)
+    query: types.CallbackQuery = attr.ib(kw_only=True)
+    timeout: float = attr.ib(kw_only=True)
+    handler_result: asyncio.Future = attr.ib(init=False, factory=lambda: asyncio.get_running_loop().create_future())
+    # The answer request has been started, so the query can't be answered again
+    is_sent: bool = attr.ib(init=False, default=False)
+    sent_answer: Optional[CallbackAnswer] = attr.ib(init=False, default=None)
+
+    async def send(self) -> None:
+        answer: Optional[CallbackAnswer] = None
+        if self.timeout > 0:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(self.handler_result), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                result = None
+            if isinstance(result, CallbackAnswer):
+                answer = result
+        elif self.handler_result.done() and isinstance(self.handler_result.result(), CallbackAnswer):
+            answer = self.handler_result.result()
+
+        self.is_sent = True
+        self.sent_answer = answer
+        try:
+            if answer is None:
+                await self.bot.answer_callback_query(self.query.id)
+            else:
+                await self.bot.answer_callback_query(self.query.id, text=answer.text, show_alert=answer.show_alert)
+        except TelegramAPIError:
+            LOGGER.warning('Failed to answer callback query %s', self.query.id, exc_info=True)
+
+    def check_dropped(self, result: Any) -> None:
+        if isinstance(result, CallbackAnswer) and self.is_sent and self.sent_answer is not result:
+            LOGGER.warning(
+                'Callback query %s has already been answered, the returned %r is dropped '
+                '(increase the answer timeout to use it)', self.query.id, result,
+            )
+
+
+def auto_answer_callback_query(bot: Bot, timeout: float = 0.0) -> Callable[[_FUNC_TV], _FUNC_TV]:
+    """
+    Answer the callback query concurrently with the handler.
+
+    The query is answered right away if ``timeout`` is 0. Otherwise the answer waits
+    for the handler to return a ``CallbackAnswer``, but for no longer than ``timeout`` seconds.
+    A ``CallbackAnswer`` returned after the query has been answered is dropped with a warning.
+
+    If the handler raises ``SkipHandler`` before the answer request is started,
+    the answer is cancelled and left to the next handler. Otherwise the next
+    auto-answering handlers don't answer the query again.
+    """
+
+    answer_tasks: set[asyncio.Task] = set()
+
+    def decorator(func: _FUNC_TV) -> _FUNC_TV:
+        @wraps(func)
+        async def wrapper(query: types.CallbackQuery, *args: Any, **kwargs: Any) -> Any:
+            data: dict[str, Any] = ctx_data.get({})
+            previous_answer: Optional[_PendingAnswer] = data.get(_ANSWER_DATA_KEY)
+            if previous_answer is not None and previous_answer.is_sent:
+                # Answered while a skipped handler was running
+                result = await func(query, *args, **kwargs)
+                previous_answer.check_dropped(result)
+                return result
+
+            answer = _PendingAnswer(bot=bot, query=query, timeout=timeout)
+            answer_task = asyncio.create_task(answer.send())
+            answer_tasks.add(answer_task)
+            answer_task.add_done_callback(answer_tasks.discard)
+            try:
+                result = await func(query, *args, **kwargs)
+            except SkipHandler:
+                if answer.is_sent:
+                    data[_ANSWER_DATA_KEY] = answer
+                else:
+                    # The query is left to the next handler
+                    answer_task.cancel()
+                raise
+            except BaseException:
+                answer.handler_result.set_result(None)
+                raise
+            answer.handler_result.set_result(result)
+            answer.check_dropped(result)
+            return result
+
+        return wrapper  # type: ignore
+
+    return decorator
@@ -0,0 +1,85 @@
+"""
+Primitives of the compact callback data encoding.
+
+Integers are written as base-64 varints: every character of ``ALPHABET``
+carries 5 bits of the value plus a continuation bit,
+so values below 32 take a single character.
+Strings are prefixed with their length.
+"""
+
+from __future__ import annotations
+
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ-_'
+TAG_SEP = '~'
+
+_CHAR_VALUES = {char: idx for idx, char in enumerate(ALPHABET)}
+_PAYLOAD_BITS = 5
+_PAYLOAD_MASK = (1 << _PAYLOAD_BITS) - 1
+_CONTINUATION_BIT = 1 << _PAYLOAD_BITS
+
+
+def encode_uint(value: int) -> str:
+    if value < 0:
+        raise ValueError(f'Cannot encode negative value {value} as unsigned')
+
+    chars: list[str] = []
+    while value > _PAYLOAD_MASK:
+        chars.append(ALPHABET[(value & _PAYLOAD_MASK) | _CONTINUATION_BIT])
+        value >>= _PAYLOAD_BITS
+    chars.append(ALPHABET[value])
+    return ''.join(chars)
+
+
+def decode_uint(data: str, pos: int) -> tuple[int, int]:
+    """Decode an unsigned integer starting at ``pos``. Return the value and the position after it"""
+    value = 0
+    shift = 0
+    while True:
+        try:
+            char_value = _CHAR_VALUES[data[pos]]
+        except (IndexError, KeyError):
+            raise ValueError(f'Invalid compact integer at position {pos} of {data!r}')
+        pos += 1
+        value |= (char_value & _PAYLOAD_MASK) << shift
+        if not char_value & _CONTINUATION_BIT:
+            return value, pos
+        shift += _PAYLOAD_BITS
+
+
+def encode_int(value: int) -> str:
+    # zigzag: 0, -1, 1, -2, 2, ... -> 0, 1, 2, 3, 4, ...
+    return encode_uint(value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def decode_int(data: str, pos: int) -> tuple[int, int]:
+    value, pos = decode_uint(data, pos)
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+
+
+def encode_str(value: str) -> str:
+    return encode_uint(len(value)) + value
+
+
+def decode_str(data: str, pos: int) -> tuple[str, int]:
+    length, pos = decode_uint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise ValueError(f'Compact string at position {pos} of {data!r} is truncated')
+    return data[pos:end], end
+
+
+def validate_tag(tag: str) -> None:
+    if not tag or any(char not in _CHAR_VALUES for char in tag):
+        raise ValueError(f'Invalid compact tag {tag!r}: must be a non-empty string of characters from {ALPHABET!r}')
+
+
+def split_tag(data: str) -> tuple[str, int]:
+    """
+    Return the compact tag of the callback data and the position of the body.
+    The tag is empty if the data is not in compact form.
+    """
+    tag_end = data.find(TAG_SEP)
+    if tag_end <= 0:
+        return '', 0
+    return data[:tag_end], tag_end + 1
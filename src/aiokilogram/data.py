@@ -4,10 +4,12 @@ Tools for accessing data within the state storage
 
 from __future__ import annotations
 
+import copy
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, TYPE_CHECKING, Type, TypeVar
 
 from aiokilogram.action import CallbackAction
+from aiokilogram.profiling import profile_phase
 
 if TYPE_CHECKING:
     from aiogram.dispatcher import FSMContext
@@ -19,23 +21,47 @@ KEY_ACTION_DATA = '__action_data__'
 
 
 @asynccontextmanager
-async def get_state_data(state: FSMContext, clear_state: bool = False) -> AsyncGenerator[dict, None]:
-    async with state.proxy() as data_proxy:
-        if KEY_STATE not in data_proxy:
-            data_proxy[KEY_STATE] = {}
-        state_data = data_proxy[KEY_STATE]
-        assert isinstance(state_data, dict)
+async def get_state_data(
+        state: FSMContext, clear_state: bool = False, read_only: bool = False,
+) -> AsyncGenerator[dict, None]:
+    """
+    Yield the bot's part of the state data.
+
+    It is written back only if it has been changed (and never if ``read_only`` is set).
+    """
+
+    if read_only and clear_state:
+        raise ValueError('Cannot clear state in read-only mode')
+
+    with profile_phase('state'):
+        data = await state.get_data()
+    state_data = data.get(KEY_STATE)
+    if state_data is None:
+        state_data = {}
+    assert isinstance(state_data, dict)
+    if read_only:
         yield state_data
-        if clear_state:
-            state_data.clear()
+        return
+
+    original_state_data = copy.deepcopy(state_data)
+    yield state_data
+    if clear_state:
+        state_data.clear()
+    if state_data != original_state_data:
+        with profile_phase('state'):
+            await state.update_data({KEY_STATE: state_data})
 
 
 @asynccontextmanager
-async def get_action_data(state: FSMContext, clear_state: bool = False) -> AsyncGenerator[dict, None]:
-    async with get_state_data(state=state, clear_state=clear_state) as state_data:
-        if KEY_ACTION_DATA not in state_data:
-            state_data[KEY_ACTION_DATA] = {}
-        action_data = state_data[KEY_ACTION_DATA]
+async def get_action_data(
+        state: FSMContext, clear_state: bool = False, read_only: bool = False,
+) -> AsyncGenerator[dict, None]:
+    async with get_state_data(state=state, clear_state=clear_state, read_only=read_only) as state_data:
+        action_data = state_data.get(KEY_ACTION_DATA)
+        if action_data is None:
+            action_data = {}
+            if not read_only:
+                state_data[KEY_ACTION_DATA] = action_data
         assert isinstance(action_data, dict)
         yield action_data
 
@@ -46,7 +72,7 @@ _ACTION_TV = TypeVar('_ACTION_TV', bound=CallbackAction)
 async def load_current_action_from_state(
         state: FSMContext, action_cls: Type[_ACTION_TV], clear_state: bool = False
 ) -> _ACTION_TV:
-    async with get_action_data(state, clear_state=clear_state) as action_data:
+    async with get_action_data(state, clear_state=clear_state, read_only=not clear_state) as action_data:
         current_action_cb_data = action_data[KEY_CURRENT_ACTION]
         action = action_cls.deserialize(current_action_cb_data)
         return action
@@ -1,30 +1,100 @@
-import re
 from typing import Optional, Type, Union
 
-from aiogram import Dispatcher
+from aiogram import Dispatcher, types
 
 from aiokilogram.action import CallbackAction, ActionParameterization
+from aiokilogram.action_store import ActionStore
+from aiokilogram.routing import CallbackQueryRouter, CallbackRouterEntry
+from aiokilogram.ordering import OrderedConcurrencyLimiter, get_update_partition_key
+from aiokilogram.profiling import UpdateProfiler
 
 
 class KiloDispatcher(Dispatcher):
     """
     Override some of the methods to add a bit more functionality.
+
+    Callback query handlers bound via ``action=...`` are served
+    by a single ``CallbackQueryRouter``. Every run of such bindings registered
+    one after another is represented among the other callback query handlers
+    by a single entry of the router, so the order of registration is kept.
+
+    If ``chat_ordered_concurrency`` is set, updates of different chats
+    are processed concurrently (at most this many at a time),
+    while the updates of each chat are processed strictly one after another.
+
+    If ``profiler`` is set, every update is processed under it.
+
+    If ``action_store`` is set, tokens of oversized callback data are resolved
+    and ``query.data`` is replaced with the original callback data before any handler sees it.
     """
 
+    def __init__(  # type: ignore
+            self, *args,
+            action_store: Optional[ActionStore] = None,
+            chat_ordered_concurrency: Optional[int] = None,
+            profiler: Optional[UpdateProfiler] = None,
+            **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.action_store = action_store
+        self.profiler = profiler
+        self.update_limiter: Optional[OrderedConcurrencyLimiter] = None
+        if chat_ordered_concurrency is not None:
+            self.update_limiter = OrderedConcurrencyLimiter(max_concurrency=chat_ordered_concurrency)
+        self.callback_query_router = CallbackQueryRouter(dispatcher=self)
+        self._callback_router_entry: Optional[CallbackRouterEntry] = None
+
+    async def process_update(self, update: types.Update):  # type: ignore
+        if self.update_limiter is None:
+            return await self._process_update(update)
+
+        # The token is resolved inside the slot, so that updates of a chat can't overtake each other
+        async with self.update_limiter.slot(get_update_partition_key(update)):
+            return await self._process_update(update)
+
+    async def _process_update(self, update: types.Update):  # type: ignore
+        query = update.callback_query
+        if self.action_store is not None and query is not None and query.data:
+            # Handlers and filters of all kinds get the original callback data
+            query.data = await self.action_store.resolve(query.data)
+
+        if self.profiler is None:
+            return await super().process_update(update)
+
+        async with self.profiler.profile(update):
+            return await super().process_update(update)
+
     def register_callback_query_handler(
             self, callback, *custom_filters, state=None, run_task=None,
             action: Optional[Union[Type[CallbackAction], ActionParameterization]] = None,
             **kwargs,
     ):  # type: ignore
 
-        if action is not None:
-            if kwargs.get('regexp') is not None:
-                raise ValueError('Cannot combine parameters "regexp" and "action"')
-            kwargs['regexp'] = re.compile(action.get_pattern())
+        if action is None:
+            return super().register_callback_query_handler(
+                callback, *custom_filters,
+                state=state, run_task=run_task, **kwargs,
+            )
+
+        if kwargs.get('regexp') is not None:
+            raise ValueError('Cannot combine parameters "regexp" and "action"')
 
-        return super().register_callback_query_handler(
-            callback, *custom_filters,
-            state=state, run_task=run_task, **kwargs,
+        filters_set = self.filters_factory.resolve(
+            self.callback_query_handlers, *custom_filters,
+            state=state, **kwargs,
+        )
+        entry = self._callback_router_entry
+        handlers = self.callback_query_handlers.handlers
+        if entry is None or not handlers or handlers[-1].handler != entry.dispatch:
+            # Another handler was registered after the last route
+            entry = self.callback_query_router.make_entry()
+            # Routes check their own state filters
+            super().register_callback_query_handler(entry.dispatch, entry.has_routes, state='*')
+            self._callback_router_entry = entry
+
+        self.callback_query_router.add_route(
+            callback=self._wrap_async_task(callback, run_task),
+            action=action, segment=entry.segment, filters=filters_set,
         )
 
     def callback_query_handler(
@@ -33,11 +103,11 @@ class KiloDispatcher(Dispatcher):
             **kwargs,
     ):  # type: ignore
 
-        if action is not None:
-            if kwargs.get('regexp') is not None:
-                raise ValueError('Cannot combine parameters "regexp" and "action"')
-            kwargs['regexp'] = re.compile(action.get_pattern())
+        def decorator(callback):  # type: ignore
+            self.register_callback_query_handler(
+                callback, *custom_filters,
+                state=state, run_task=run_task, action=action, **kwargs,
+            )
+            return callback
 
-        return super().callback_query_handler(
-            *custom_filters, state=state, run_task=run_task, **kwargs,
-        )
+        return decorator
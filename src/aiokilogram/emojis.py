@@ -0,0 +1,49 @@
+"""
+Lookup table of emoji shortcodes.
+
+The ``emoji`` package is imported only when an unknown shortcode is encountered,
+every shortcode is resolved only once.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Mapping
+
+
+_EMOJI_TABLE: dict[str, str] = {}
+
+
+def _normalize_name(code: str) -> str:
+    return sys.intern(code.strip(':'))
+
+
+def register_emojis(emojis: Mapping[str, str]) -> None:
+    """
+    Add shortcodes to the lookup table, e.g. ``{'thumbs_up': '👍'}``.
+    If all used shortcodes are registered, the ``emoji`` package is never imported.
+    """
+    for code, value in emojis.items():
+        _EMOJI_TABLE[_normalize_name(code)] = sys.intern(value)
+
+
+def resolve_emoji(code: str) -> str:
+    """Return the emoji for a shortcode like ``'thumbs_up'`` or ``':thumbs_up:'``"""
+    try:
+        return _EMOJI_TABLE[code]
+    except KeyError:
+        pass
+
+    name = _normalize_name(code)
+    if name not in _EMOJI_TABLE:
+        from emoji.core import emojize
+
+        wrapped_name = f':{name}:'
+        value = emojize(wrapped_name)
+        if value == wrapped_name:
+            raise ValueError(f'Unknown emoji shortcode: {code!r}')
+        _EMOJI_TABLE[name] = sys.intern(value)
+
+    value = _EMOJI_TABLE[name]
+    _EMOJI_TABLE[code] = value
+    return value
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import contextlib
+import time
+from collections import OrderedDict
 from functools import wraps
 from typing import (
-    Any, AsyncGenerator, Awaitable, Callable,
+    Any, AsyncGenerator, Awaitable, Callable, ClassVar, Hashable,
     Optional, Sequence, TypeVar, TYPE_CHECKING, Union, cast,
 )
 
+import attr
 from aiogram import types
+from aiogram.dispatcher.handler import SkipHandler
 
 from aiokilogram.page import MessagePage
+from aiokilogram.scheduler import TokenBucket
 
 if TYPE_CHECKING:
     from aiokilogram.messenger import MessengerInterface
@@ -20,20 +25,93 @@ class ErrorHandler:
         return True
 
 
+async def _send_message(messenger: MessengerInterface, user_id: str, message: Union[MessagePage, str]) -> None:
+    if isinstance(message, MessagePage):
+        await messenger.send_message_page(user_id=user_id, page=message)
+    else:
+        assert isinstance(message, str)
+        await messenger.send_text(user_id=user_id, text=message)
+
+
+@attr.s
+class NotificationThrottleStats:
+    sent: int = attr.ib(kw_only=True, default=0)
+    suppressed: int = attr.ib(kw_only=True, default=0)
+
+
+@attr.s
+class NotificationThrottle:
+    """
+    Limits the error messages sent to users:
+
+    - the same error is reported to a user at most once per ``dedup_interval`` seconds;
+    - a user gets at most one error message per ``user_interval`` seconds;
+    - at most ``global_rate`` error messages per second are sent overall
+      (with bursts of up to ``global_burst``).
+    """
+
+    dedup_interval: float = attr.ib(kw_only=True, default=60.0)
+    user_interval: float = attr.ib(kw_only=True, default=5.0)
+    global_rate: float = attr.ib(kw_only=True, default=10.0)
+    global_burst: float = attr.ib(kw_only=True, default=20.0)
+    # Max number of remembered users and errors
+    max_size: int = attr.ib(kw_only=True, default=100_000)
+    stats: NotificationThrottleStats = attr.ib(init=False, factory=NotificationThrottleStats)
+    _global_bucket: TokenBucket = attr.ib(init=False)
+    # {user_id: time of the last message}
+    _user_sent_at: OrderedDict[str, float] = attr.ib(init=False, factory=OrderedDict)
+    # {(user_id, error key): time of the last message}
+    _error_sent_at: OrderedDict[tuple[str, Hashable], float] = attr.ib(init=False, factory=OrderedDict)
+
+    def __attrs_post_init__(self) -> None:
+        self._global_bucket = TokenBucket(rate=self.global_rate, capacity=self.global_burst)
+
+    def _remember(self, sent_at: OrderedDict, key: Any, now: float) -> None:
+        sent_at[key] = now
+        sent_at.move_to_end(key)
+        while len(sent_at) > self.max_size:
+            sent_at.popitem(last=False)
+
+    def allow(self, user_id: str, error_key: Hashable) -> bool:
+        """Return whether an error message may be sent and account for it if so"""
+        now = time.monotonic()
+        user_sent_at = self._user_sent_at.get(user_id)
+        error_sent_at = self._error_sent_at.get((user_id, error_key))
+        if (
+                (user_sent_at is not None and now - user_sent_at < self.user_interval)
+                or (error_sent_at is not None and now - error_sent_at < self.dedup_interval)
+                or not self._global_bucket.try_take()
+        ):
+            self.stats.suppressed += 1
+            return False
+
+        self._remember(self._user_sent_at, user_id, now)
+        self._remember(self._error_sent_at, (user_id, error_key), now)
+        self.stats.sent += 1
+        return True
+
+
 class DefaultErrorHandler(ErrorHandler):
+    # Shared by all instances of the class. Set it to limit error messages
+    notification_throttle: ClassVar[Optional[NotificationThrottle]] = None
+
     def make_message(self, err: Exception) -> Optional[Union[MessagePage, str]]:
         return None
 
+    def get_error_key(self, err: Exception) -> Hashable:
+        """Errors with equal keys are considered duplicates"""
+        return type(err), str(err)
+
     async def handle(self, err: Exception, messenger: MessengerInterface, user_id: str) -> bool:
         message = self.make_message(err=err)
         if message is None:
             return True
 
-        if isinstance(message, MessagePage):
-            await messenger.send_message_page(user_id=user_id, page=message)
-        else:
-            assert isinstance(message, str)
-            await messenger.send_text(user_id=user_id, text=message)
+        throttle = self.notification_throttle
+        if throttle is not None and not throttle.allow(user_id=user_id, error_key=self.get_error_key(err)):
+            return False
+
+        await _send_message(messenger=messenger, user_id=user_id, message=message)
         return False
 
 
@@ -86,3 +164,134 @@ def handle_errors(
         return wrapper  # type: ignore
 
     return decorator
+
+
+@attr.s
+class CircuitBreakerStats:
+    failures: int = attr.ib(kw_only=True, default=0)
+    tripped: int = attr.ib(kw_only=True, default=0)
+    # Calls that were rejected without calling the handler
+    short_circuited: int = attr.ib(kw_only=True, default=0)
+    # Fallback messages that were not sent because the user had already got one or were throttled
+    suppressed_fallbacks: int = attr.ib(kw_only=True, default=0)
+
+
+@attr.s
+class CircuitBreaker:
+    """
+    Stops calling a handler after ``failure_threshold`` consecutive failures
+    and answers with ``fallback`` (if set) instead for ``cooldown`` seconds.
+    After that a single call is let through: the breaker is reset if it succeeds
+    and trips again if it fails.
+
+    Every user gets the fallback at most once each time the breaker opens.
+    If ``notification_throttle`` is set, the fallbacks are also limited by it
+    (it can be shared with the error handlers).
+
+    Use a separate breaker for each handler method.
+    Breakers set at the class level are copied for each method.
+    """
+
+    failure_threshold: int = attr.ib(kw_only=True, default=5)
+    cooldown: float = attr.ib(kw_only=True, default=30.0)
+    fallback: Optional[Union[MessagePage, str]] = attr.ib(kw_only=True, default=None)
+    notification_throttle: Optional[NotificationThrottle] = attr.ib(kw_only=True, default=None)
+    stats: CircuitBreakerStats = attr.ib(init=False, factory=CircuitBreakerStats)
+    _consecutive_failures: int = attr.ib(init=False, default=0)
+    _opened_at: Optional[float] = attr.ib(init=False, default=None)
+    _trial_in_progress: bool = attr.ib(init=False, default=False)
+    # Users that got the fallback since the breaker was opened
+    _fallback_user_ids: set[str] = attr.ib(init=False, factory=set)
+
+    def __attrs_post_init__(self) -> None:
+        if isinstance(self.fallback, MessagePage):
+            # The page is sent many times
+            self.fallback.freeze()
+
+    def copy(self) -> CircuitBreaker:
+        """Return a new breaker with the same settings"""
+        return attr.evolve(self)
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Return whether the handler should be called"""
+        if self._opened_at is None:
+            return True
+        if self._trial_in_progress or time.monotonic() - self._opened_at < self.cooldown:
+            self.stats.short_circuited += 1
+            return False
+        self._trial_in_progress = True
+        return True
+
+    def allow_fallback(self, user_id: str) -> bool:
+        """Return whether the fallback should be sent to the user and account for it if so"""
+        throttle = self.notification_throttle
+        if user_id in self._fallback_user_ids or (
+                throttle is not None and not throttle.allow(user_id=user_id, error_key=(CircuitBreaker, id(self)))
+        ):
+            self.stats.suppressed_fallbacks += 1
+            return False
+        self._fallback_user_ids.add(user_id)
+        return True
+
+    def record_success(self) -> None:
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._fallback_user_ids.clear()
+
+    def release_trial(self) -> None:
+        """Let the next call be a trial if the trial call ended without a result (e.g. was skipped)"""
+        self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        self.stats.failures += 1
+        self._consecutive_failures += 1
+        if self._trial_in_progress or (
+                self._opened_at is None and self._consecutive_failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._trial_in_progress = False
+            self._fallback_user_ids.clear()
+            self.stats.tripped += 1
+
+
+def with_circuit_breaker(
+        circuit_breaker: CircuitBreaker, messenger: MessengerInterface,
+) -> Callable[[_FUNC_TV], _FUNC_TV]:
+
+    def decorator(func: _FUNC_TV) -> _FUNC_TV:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not circuit_breaker.allow():
+                if circuit_breaker.fallback is not None:
+                    user_id = _extract_user_id_from_args(handler_args=args, handler_kwargs=kwargs)
+                    if circuit_breaker.allow_fallback(user_id):
+                        await _send_message(messenger=messenger, user_id=user_id, message=circuit_breaker.fallback)
+                return None
+
+            # Calls let through by an open breaker are trials
+            is_trial = circuit_breaker.is_open
+            try:
+                result = await func(*args, **kwargs)
+            except SkipHandler:
+                if is_trial:
+                    circuit_breaker.release_trial()
+                raise
+            except Exception:
+                circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                # E.g. the task was cancelled
+                if is_trial:
+                    circuit_breaker.release_trial()
+                raise
+            circuit_breaker.record_success()
+            return result
+
+        return wrapper  # type: ignore
+
+    return decorator
@@ -0,0 +1,232 @@
+"""
+Local stand-in for the Telegram Bot API for load testing.
+
+Implements the subset of methods used by aiokilogram bots
+and measures the time from queueing an update to the bot's reply in the same chat.
+Point a bot at it via the ``tg_api_server`` setting.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import aiohttp
+import attr
+from aiohttp import web
+
+from aiokilogram.webhook import SECRET_TOKEN_HEADER
+
+
+LOGGER = logging.getLogger(__name__)
+
+_ApiMethod = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+@attr.s
+class FakeBotAPIStats:
+    updates_queued: int = attr.ib(kw_only=True, default=0)
+    updates_delivered: int = attr.ib(kw_only=True, default=0)
+    replies: int = attr.ib(kw_only=True, default=0)
+    # {method name: number of calls}
+    api_calls: collections.Counter = attr.ib(kw_only=True, factory=collections.Counter)
+    # Seconds from queueing an update to the first reply in its chat
+    latencies: list[float] = attr.ib(kw_only=True, factory=list)
+
+
+def _parse_json_param(params: dict[str, Any], name: str) -> Any:
+    value = params.get(name)
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+@attr.s
+class FakeBotAPIServer:
+    """
+    Serves ``getUpdates``, ``sendMessage``, ``editMessageText``, ``editMessageReplyMarkup``,
+    ``answerCallbackQuery``, ``setWebhook`` and a few auxiliary methods for any bot token.
+
+    Updates are queued via ``push_update`` and delivered either by ``getUpdates``
+    or to the webhook if one is set.
+    """
+
+    host: str = attr.ib(kw_only=True, default='127.0.0.1')
+    port: int = attr.ib(kw_only=True, default=8081)
+    stats: FakeBotAPIStats = attr.ib(init=False, factory=FakeBotAPIStats)
+    _updates: collections.deque[dict] = attr.ib(init=False, factory=collections.deque)
+    _update_id: int = attr.ib(init=False, default=0)
+    _message_id: int = attr.ib(init=False, default=0)
+    _new_updates: Optional[asyncio.Event] = attr.ib(init=False, default=None)
+    # {chat_id: queue times of updates without a reply}
+    _unanswered: dict[int, collections.deque[float]] = attr.ib(
+        init=False, factory=lambda: collections.defaultdict(collections.deque))
+    _webhook_url: Optional[str] = attr.ib(init=False, default=None)
+    _webhook_secret_token: Optional[str] = attr.ib(init=False, default=None)
+    _webhook_session: Optional[aiohttp.ClientSession] = attr.ib(init=False, default=None)
+    _webhook_tasks: set[asyncio.Task] = attr.ib(init=False, factory=set)
+    _runner: Optional[web.AppRunner] = attr.ib(init=False, default=None)
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def unanswered_count(self) -> int:
+        return sum(len(queue_times) for queue_times in self._unanswered.values())
+
+    def _get_new_updates_event(self) -> asyncio.Event:
+        if self._new_updates is None:
+            self._new_updates = asyncio.Event()
+        return self._new_updates
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle_api_call)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=self.host, port=self.port).start()
+
+    async def stop(self) -> None:
+        for task in list(self._webhook_tasks):
+            task.cancel()
+        if self._webhook_session is not None:
+            await self._webhook_session.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def push_update(self, update: dict[str, Any], chat_id: int) -> int:
+        """Queue an update (without ``update_id``) and return its ID"""
+        self._update_id += 1
+        update = dict(update, update_id=self._update_id)
+        self.stats.updates_queued += 1
+        self._unanswered[chat_id].append(time.perf_counter())
+        if self._webhook_url is not None:
+            self._deliver_to_webhook(update)
+        else:
+            self._updates.append(update)
+            self._get_new_updates_event().set()
+        return self._update_id
+
+    def _deliver_to_webhook(self, update: dict[str, Any]) -> None:
+        task = asyncio.create_task(self._post_to_webhook(update))
+        self._webhook_tasks.add(task)
+        task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _post_to_webhook(self, update: dict[str, Any]) -> None:
+        assert self._webhook_url is not None
+        if self._webhook_session is None:
+            self._webhook_session = aiohttp.ClientSession()
+        headers = {}
+        if self._webhook_secret_token is not None:
+            headers[SECRET_TOKEN_HEADER] = self._webhook_secret_token
+        try:
+            async with self._webhook_session.post(self._webhook_url, json=update, headers=headers) as response:
+                response.raise_for_status()
+        except aiohttp.ClientError:
+            LOGGER.exception('Failed to deliver update %s to the webhook', update['update_id'])
+            return
+        self.stats.updates_delivered += 1
+
+    def _record_reply(self, chat_id: Any) -> None:
+        self.stats.replies += 1
+        queue_times = self._unanswered.get(int(chat_id))
+        if queue_times:
+            self.stats.latencies.append(time.perf_counter() - queue_times.popleft())
+
+    def _make_message(self, chat_id: Any, text: Optional[str], reply_markup: Any) -> dict[str, Any]:
+        self._message_id += 1
+        message: dict[str, Any] = {
+            'message_id': self._message_id, 'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'text': text or '',
+        }
+        if reply_markup is not None:
+            message['reply_markup'] = reply_markup
+        return message
+
+    async def handle_api_call(self, request: web.Request) -> web.Response:
+        method_name = request.match_info['method'].lower()
+        self.stats.api_calls[method_name] += 1
+        method: Optional[_ApiMethod] = getattr(self, f'_api_{method_name}', None)
+        if method is None:
+            return web.json_response(
+                {'ok': False, 'error_code': 404, 'description': 'Not Found: method not found'}, status=404,
+            )
+
+        if request.content_type == 'application/json':
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        return web.json_response({'ok': True, 'result': await method(params)})
+
+    async def _api_getme(self, params: dict[str, Any]) -> Any:
+        return {'id': 1, 'is_bot': True, 'first_name': 'Fake Bot', 'username': 'fake_bot'}
+
+    async def _api_getupdates(self, params: dict[str, Any]) -> Any:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()
+
+        if not self._updates and timeout > 0:
+            new_updates = self._get_new_updates_event()
+            new_updates.clear()
+            try:
+                await asyncio.wait_for(new_updates.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        updates = list(self._updates)[:limit]
+        # Updates are considered delivered when the next offset confirms them
+        self.stats.updates_delivered = max(self.stats.updates_delivered, offset - 1)
+        return updates
+
+    async def _api_sendmessage(self, params: dict[str, Any]) -> Any:
+        self._record_reply(params['chat_id'])
+        return self._make_message(
+            chat_id=params['chat_id'], text=params.get('text'),
+            reply_markup=_parse_json_param(params, 'reply_markup'),
+        )
+
+    def _edit_message(self, params: dict[str, Any], text: Optional[str]) -> Any:
+        reply_markup = _parse_json_param(params, 'reply_markup')
+        if params.get('inline_message_id'):
+            # Inline messages don't belong to a chat, and their edits return ``True``
+            self.stats.replies += 1
+            return True
+
+        self._record_reply(params['chat_id'])
+        return self._make_message(chat_id=params['chat_id'], text=text, reply_markup=reply_markup)
+
+    async def _api_editmessagetext(self, params: dict[str, Any]) -> Any:
+        return self._edit_message(params, text=params.get('text'))
+
+    async def _api_editmessagereplymarkup(self, params: dict[str, Any]) -> Any:
+        return self._edit_message(params, text=None)
+
+    async def _api_answercallbackquery(self, params: dict[str, Any]) -> Any:
+        return True
+
+    async def _api_setwebhook(self, params: dict[str, Any]) -> Any:
+        self._webhook_url = params.get('url') or None
+        self._webhook_secret_token = params.get('secret_token')
+        while self._webhook_url is not None and self._updates:
+            self._deliver_to_webhook(self._updates.popleft())
+        return True
+
+    async def _api_deletewebhook(self, params: dict[str, Any]) -> Any:
+        self._webhook_url = None
+        self._webhook_secret_token = None
+        return True
+
+    async def _api_getwebhookinfo(self, params: dict[str, Any]) -> Any:
+        return {'url': self._webhook_url or '', 'has_custom_certificate': False, 'pending_update_count': 0}
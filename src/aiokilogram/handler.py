@@ -1,24 +1,49 @@
 from __future__ import annotations
 
 import abc
-from typing import Callable, ClassVar, Generic, Optional, TYPE_CHECKING, TypeVar
+from functools import partial
+from typing import Any, Awaitable, Callable, ClassVar, Generic, Optional, TYPE_CHECKING, TypeVar
 
 import attr
 from aiogram import types
 from aiogram import Bot, Dispatcher
+from aiogram.utils.exceptions import MessageNotModified
 
 from aiokilogram.settings import BaseGlobalSettings
+from aiokilogram.rendering import KeyboardRenderer, RenderedPage, RenderedPageHistory
+from aiokilogram.scheduler import SendPriority, SendScheduler
+from aiokilogram.broadcast import BroadcastProgress, UserIds, run_broadcast
 from aiokilogram.registration import KILO_DISP_REG_INFO_ATTR, KiloDispatcherRegInfo
 from aiokilogram.messenger import MessengerInterface
-from aiokilogram.errors import ErrorHandler, handle_errors
+from aiokilogram.pagination import PaginatedKeyboard, PaginationAction
+from aiokilogram.errors import CircuitBreaker, ErrorHandler, handle_errors, with_circuit_breaker
+from aiokilogram.action import ActionParameterization
+from aiokilogram.profiling import profile_handler, profile_phase
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.callback_answer import auto_answer_callback_query
 
 if TYPE_CHECKING:
+    from aiokilogram.metrics import MetricsRegistry
     from aiokilogram.page import MessagePage
 
 
 _GSETTINGS_TV = TypeVar('_GSETTINGS_TV', bound=BaseGlobalSettings)
 
 
+def _is_autoregistered(value: Any) -> bool:
+    return hasattr(value, KILO_DISP_REG_INFO_ATTR) or isinstance(value, PaginatedKeyboard)
+
+
+def _collect_autoregistered_names(cls: type) -> tuple[str, ...]:
+    # Attributes of subclasses override those of base classes
+    is_autoregistered_by_name: dict[str, bool] = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            is_autoregistered_by_name[name] = _is_autoregistered(value)
+
+    return tuple(sorted(name for name, is_autoregistered in is_autoregistered_by_name.items() if is_autoregistered))
+
+
 @attr.s
 class CommandHandler(abc.ABC, MessengerInterface, Generic[_GSETTINGS_TV]):
     """
@@ -28,14 +53,66 @@ class CommandHandler(abc.ABC, MessengerInterface, Generic[_GSETTINGS_TV]):
     """
 
     error_handler: ClassVar[Optional[ErrorHandler]] = None
+    # Is copied for every handler method that doesn't have its own
+    circuit_breaker: ClassVar[Optional[CircuitBreaker]] = None
+    # Answer callback queries automatically (can be overridden for individual methods)
+    auto_answer_callback_queries: ClassVar[bool] = False
+    # How long the automatic answer waits for the handler to return a ``CallbackAnswer``
+    # (0 means the query is answered right away, without waiting,
+    # and a returned ``CallbackAnswer`` is dropped with a warning)
+    callback_answer_timeout: ClassVar[float] = 0.0
 
     _global_settings: _GSETTINGS_TV = attr.ib(kw_only=True)
     _bot: Bot = attr.ib(kw_only=True)
+    # Should use the same action store as the dispatcher
+    _keyboard_renderer: KeyboardRenderer = attr.ib(kw_only=True, factory=KeyboardRenderer)
+    # Should be shared by all handlers so that they can update each other's messages
+    _page_history: RenderedPageHistory = attr.ib(kw_only=True, factory=RenderedPageHistory)
+    # Outbound messages are sent through it if present
+    _send_scheduler: Optional[SendScheduler] = attr.ib(kw_only=True, default=None)
+    # Handler methods are instrumented if present
+    _metrics_registry: Optional[MetricsRegistry] = attr.ib(kw_only=True, default=None)
+    # {method name: breaker}
+    _circuit_breakers: dict[str, CircuitBreaker] = attr.ib(init=False, factory=dict)
+
+    # Names of decorated methods and paginated keyboards (including inherited ones)
+    # in alphabetical order, which is the order of their registration
+    _autoregistered_names: ClassVar[tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._autoregistered_names = _collect_autoregistered_names(cls)
+
+    def _instrument_method(self, method: Callable, reg_info: KiloDispatcherRegInfo) -> Callable:
+        # Is imported only if metrics are collected
+        from aiokilogram.metrics import instrument_handler
+
+        assert self._metrics_registry is not None
+        action = reg_info.kwargs.get('action')
+        if isinstance(action, ActionParameterization):
+            action = action.action_cls
+        return instrument_handler(
+            registry=self._metrics_registry,
+            handler_name=type(self).__name__,
+            method_name=method.__name__,
+            action_name=action.__name__ if action is not None else '',
+        )(method)
 
     def _register_decorated_method(self, dispatcher: Dispatcher, method: Callable) -> None:
         reg_info = getattr(method, KILO_DISP_REG_INFO_ATTR)
         assert isinstance(reg_info, KiloDispatcherRegInfo)
 
+        if self._metrics_registry is not None:
+            method = self._instrument_method(method, reg_info=reg_info)
+        circuit_breaker = reg_info.circuit_breaker
+        if circuit_breaker is None and self.circuit_breaker is not None:
+            circuit_breaker = self.circuit_breaker.copy()
+        if circuit_breaker is not None:
+            self._circuit_breakers[method.__name__] = circuit_breaker
+            method = with_circuit_breaker(circuit_breaker=circuit_breaker, messenger=self)(method)
+        if isinstance(dispatcher, KiloDispatcher) and dispatcher.profiler is not None:
+            method = profile_handler(f'{type(self).__name__}.{method.__name__}')(method)
+
         error_handlers: list[ErrorHandler] = []
         if reg_info.error_handler is not None:
             error_handlers.append(reg_info.error_handler)
@@ -43,14 +120,46 @@ class CommandHandler(abc.ABC, MessengerInterface, Generic[_GSETTINGS_TV]):
             error_handlers.append(self.error_handler)
 
             method = handle_errors(error_handlers=error_handlers, messenger=self)(method)
+
+        auto_answer = reg_info.auto_answer
+        if auto_answer is None:
+            auto_answer = self.auto_answer_callback_queries
+        if auto_answer and reg_info.reg_method_name == 'register_callback_query_handler':
+            method = auto_answer_callback_query(bot=self._bot, timeout=self.callback_answer_timeout)(method)
         getattr(dispatcher, reg_info.reg_method_name)(method, *reg_info.args, **reg_info.kwargs)
 
     def _autoregister_handler_methods(self, dispatcher: Dispatcher) -> None:
-        for name in dir(self):
+        for name in self._autoregistered_names:
             method = getattr(self, name)
             if hasattr(method, KILO_DISP_REG_INFO_ATTR):
                 assert callable(method)
                 self._register_decorated_method(dispatcher=dispatcher, method=method)
+            elif isinstance(method, PaginatedKeyboard):
+                self.register_paginated_keyboard(dispatcher=dispatcher, keyboard=method)
+
+    def register_paginated_keyboard(self, dispatcher: Dispatcher, keyboard: PaginatedKeyboard) -> None:
+        """Register the handler of the keyboard's navigation buttons"""
+
+        async def show_page(query: types.CallbackQuery, action: PaginationAction) -> None:
+            page = await keyboard.make_page(offset=action.offset)
+            if query.message is None:
+                # Buttons of inline mode messages come with the ID of the message only
+                if query.inline_message_id is not None:
+                    await self._update_inline_message_page(
+                        user_id=query.from_user.id, inline_message_id=query.inline_message_id, page=page,
+                    )
+                return
+            await self.update_message_page(message=query.message, page=page)
+
+        # Navigation must work whatever the user's state is.
+        # Nothing else handles these queries, so they are always answered
+        dispatcher.register_callback_query_handler(
+            auto_answer_callback_query(bot=self._bot)(show_page),
+            action=PaginationAction.when(keyboard_id=keyboard.keyboard_id), state='*',
+        )
+
+    def get_circuit_breaker(self, method_name: str) -> Optional[CircuitBreaker]:
+        return self._circuit_breakers.get(method_name)
 
     def register(self, dispatcher: Dispatcher) -> None:
         """
@@ -63,29 +172,135 @@ class CommandHandler(abc.ABC, MessengerInterface, Generic[_GSETTINGS_TV]):
     async def respond_with_text(self, event: types.Message, text: str) -> None:
         await self.send_text(user_id=event.from_user.id, text=text)
 
-    async def send_text(self, user_id: str, text: str) -> None:
-        await self._bot.send_message(
-            user_id, text=text,
+    async def _call_api(self, chat_id: Any, priority: SendPriority, func: Callable[[], Awaitable]) -> Any:
+        with profile_phase('send'):
+            if self._send_scheduler is None:
+                return await func()
+
+            return await self._send_scheduler.run(chat_id=chat_id, priority=priority, func=func)
+
+    async def _send_message(self, user_id: str, priority: SendPriority, **kwargs: Any) -> types.Message:
+        return await self._call_api(
+            user_id, priority=priority,
+            func=lambda: self._bot.send_message(user_id, **kwargs),
+        )
+
+    async def send_text(
+            self, user_id: str, text: str, priority: SendPriority = SendPriority.interactive,
+    ) -> None:
+        await self._send_message(
+            user_id, priority=priority, text=text,
             parse_mode=types.ParseMode.HTML,
         )
 
-    async def send_message_page(self, user_id: str, page: MessagePage) -> None:
+    async def _render_page(self, page: MessagePage) -> RenderedPage:
         keyboard_markup: Optional[types.InlineKeyboardMarkup] = None
         if page.keyboard:
-            keyboard_markup = types.InlineKeyboardMarkup(row_width=page.keyboard.row_width)
-            for button in page.keyboard.buttons:
-                button = types.InlineKeyboardButton(
-                    text=button.full_text,
-                    callback_data=button.get_callback_data(),
-                )
-                keyboard_markup.add(button)
-
-        text = page.body.text
-        parse_mode = page.body.parse_mode
-        await self._bot.send_message(
-            user_id,
-            text=text,
-            parse_mode=parse_mode,
+            with profile_phase('render'):
+                keyboard_markup = await self._keyboard_renderer.render(page.keyboard)
+
+        return RenderedPage(
+            text=page.body.text,
+            parse_mode=page.body.parse_mode,
+            disable_preview=page.disable_preview,
             reply_markup=keyboard_markup,
-            disable_web_page_preview=page.disable_preview,
+        )
+
+    async def send_message_page(
+            self, user_id: str, page: MessagePage, priority: SendPriority = SendPriority.interactive,
+    ) -> None:
+        rendered_page = await self._render_page(page)
+        message = await self._send_message(
+            user_id, priority=priority,
+            text=rendered_page.text,
+            parse_mode=rendered_page.parse_mode,
+            reply_markup=rendered_page.reply_markup,
+            disable_web_page_preview=rendered_page.disable_preview,
+        )
+        self._page_history.set(message.chat.id, message.message_id, rendered_page)
+
+    async def update_message_page(
+            self, message: types.Message, page: MessagePage,
+            priority: SendPriority = SendPriority.interactive,
+    ) -> None:
+        """
+        Show the page in place of the contents of a previously sent message.
+
+        Only the parts that differ from the last page rendered into this message
+        are edited. Nothing is sent if the page hasn't changed.
+        """
+
+        chat_id, message_id = message.chat.id, message.message_id
+        rendered_page = await self._render_page(page)
+        previous_page = self._page_history.get(chat_id, message_id)
+        if previous_page is not None and previous_page.body_equals(rendered_page):
+            if previous_page.markup_equals(rendered_page):
+                return
+            func = partial(
+                self._bot.edit_message_reply_markup,
+                chat_id=chat_id, message_id=message_id,
+                reply_markup=rendered_page.reply_markup,
+            )
+        else:
+            # The markup is removed unless it is passed along with the text
+            func = partial(
+                self._bot.edit_message_text,
+                text=rendered_page.text, chat_id=chat_id, message_id=message_id,
+                parse_mode=rendered_page.parse_mode,
+                disable_web_page_preview=rendered_page.disable_preview,
+                reply_markup=rendered_page.reply_markup,
+            )
+
+        try:
+            await self._call_api(chat_id, priority=priority, func=func)
+        except MessageNotModified:
+            pass
+        self._page_history.set(chat_id, message_id, rendered_page)
+
+    async def _update_inline_message_page(
+            self, user_id: str, inline_message_id: str, page: MessagePage,
+            priority: SendPriority = SendPriority.interactive,
+    ) -> None:
+        """Show the page in place of the contents of an inline mode message (always edited as a whole)"""
+        rendered_page = await self._render_page(page)
+        func = partial(
+            self._bot.edit_message_text,
+            text=rendered_page.text, inline_message_id=inline_message_id,
+            parse_mode=rendered_page.parse_mode,
+            disable_web_page_preview=rendered_page.disable_preview,
+            reply_markup=rendered_page.reply_markup,
+        )
+        try:
+            await self._call_api(user_id, priority=priority, func=func)
+        except MessageNotModified:
+            pass
+
+    async def broadcast(
+            self, page: MessagePage, user_ids: UserIds,
+            concurrency: int = 20, max_retries: int = 3,
+            on_progress: Optional[Callable[[BroadcastProgress], Any]] = None,
+            progress_every: int = 1000,
+    ) -> BroadcastProgress:
+        """
+        Send the page to all given users with bulk priority.
+        The page is rendered only once.
+        """
+
+        rendered_page = await self._render_page(page)
+
+        async def send(user_id: Any) -> None:
+            await self._send_message(
+                user_id, priority=SendPriority.bulk,
+                text=rendered_page.text,
+                parse_mode=rendered_page.parse_mode,
+                reply_markup=rendered_page.reply_markup,
+                disable_web_page_preview=rendered_page.disable_preview,
+            )
+
+        return await run_broadcast(
+            send=send, user_ids=user_ids,
+            concurrency=concurrency, max_retries=max_retries,
+            on_progress=on_progress, progress_every=progress_every,
+            # The scheduler retries flood control errors itself
+            retry_flood_errors=self._send_scheduler is None,
         )
@@ -0,0 +1,197 @@
+"""
+Tunable HTTP session for Bot API requests that can be shared by several bots.
+
+aiogram creates a separate session with default connector settings for every bot.
+An ``HttpSessionPool`` keeps one session with a configurable connection pool instead,
+and collects statistics that help to size it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ssl
+import time
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import attr
+import aiohttp
+import certifi
+from aiogram import Bot
+from aiogram.utils import json
+
+from aiokilogram.settings import BaseGlobalSettings
+
+
+@attr.s
+class HttpSessionPoolStats:
+    requests: int = attr.ib(kw_only=True, default=0)
+    # Requests that had to wait for a free connection because the pool was exhausted
+    waits: int = attr.ib(kw_only=True, default=0)
+    total_wait_time: float = attr.ib(kw_only=True, default=0.0)
+    max_wait_time: float = attr.ib(kw_only=True, default=0.0)
+    connections_created: int = attr.ib(kw_only=True, default=0)
+    connections_reused: int = attr.ib(kw_only=True, default=0)
+    dns_cache_hits: int = attr.ib(kw_only=True, default=0)
+    dns_cache_misses: int = attr.ib(kw_only=True, default=0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+    @property
+    def average_wait_time(self) -> float:
+        return self.total_wait_time / self.waits if self.waits else 0.0
+
+
+@attr.s
+class HttpSessionPool:
+    """
+    Lazily creates an ``aiohttp.ClientSession`` with the given connector settings.
+
+    The session is closed when the last bot using the pool is closed
+    (see ``acquire`` and ``release``), so the pool must be used
+    within a single event loop.
+    """
+
+    # Total number of simultaneous connections and the number per host (0 means no limit)
+    limit: int = attr.ib(kw_only=True, default=100)
+    limit_per_host: int = attr.ib(kw_only=True, default=0)
+    # Idle connections are kept open for this many seconds
+    keepalive_timeout: float = attr.ib(kw_only=True, default=15.0)
+    # Resolved addresses are cached for this many seconds. DNS caching is disabled if ``None``
+    dns_cache_ttl: Optional[int] = attr.ib(kw_only=True, default=10)
+    # Applies to requests of bots without their own request timeout
+    connect_timeout: Optional[float] = attr.ib(kw_only=True, default=None)
+    stats: HttpSessionPoolStats = attr.ib(init=False, factory=HttpSessionPoolStats)
+    _session: Optional[aiohttp.ClientSession] = attr.ib(init=False, default=None)
+    _user_count: int = attr.ib(init=False, default=0)
+
+    @classmethod
+    def from_settings(cls, settings: BaseGlobalSettings) -> HttpSessionPool:
+        return cls(
+            limit=settings.http_connections_limit,
+            limit_per_host=settings.http_connections_limit_per_host,
+            keepalive_timeout=settings.http_keepalive_timeout,
+            dns_cache_ttl=settings.http_dns_cache_ttl,
+            connect_timeout=settings.http_connect_timeout,
+        )
+
+    def _make_trace_config(self) -> aiohttp.TraceConfig:
+        stats = self.stats
+
+        async def on_request_start(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceRequestStartParams,
+        ) -> None:
+            stats.requests += 1
+
+        async def on_connection_queued_start(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceConnectionQueuedStartParams,
+        ) -> None:
+            context.queued_at = time.monotonic()
+
+        async def on_connection_queued_end(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceConnectionQueuedEndParams,
+        ) -> None:
+            wait_time = time.monotonic() - context.queued_at
+            stats.waits += 1
+            stats.total_wait_time += wait_time
+            stats.max_wait_time = max(stats.max_wait_time, wait_time)
+
+        async def on_connection_create_end(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceConnectionCreateEndParams,
+        ) -> None:
+            stats.connections_created += 1
+
+        async def on_connection_reuseconn(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceConnectionReuseconnParams,
+        ) -> None:
+            stats.connections_reused += 1
+
+        async def on_dns_cache_hit(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceDnsCacheHitParams,
+        ) -> None:
+            stats.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(
+                session: aiohttp.ClientSession, context: SimpleNamespace, params: aiohttp.TraceDnsCacheMissParams,
+        ) -> None:
+            stats.dns_cache_misses += 1
+
+        trace_config = aiohttp.TraceConfig()
+        for callback in (
+                on_request_start,
+                on_connection_queued_start,
+                on_connection_queued_end,
+                on_connection_create_end,
+                on_connection_reuseconn,
+                on_dns_cache_hit,
+                on_dns_cache_miss,
+        ):
+            # The signals are named after the callbacks
+            getattr(trace_config, callback.__name__).append(callback)
+        return trace_config
+
+    def _make_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit, limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.dns_cache_ttl is not None, ttl_dns_cache=self.dns_cache_ttl,
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+        )
+        return aiohttp.ClientSession(
+            connector=connector, json_serialize=json.dumps,
+            # aiohttp's default timeout with the custom connection timeout
+            timeout=aiohttp.ClientTimeout(total=5 * 60, sock_connect=30, connect=self.connect_timeout),
+            trace_configs=[self._make_trace_config()],
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = self._make_session()
+        return self._session
+
+    @property
+    def open_connections(self) -> int:
+        """Number of open connections, both idle and in use"""
+        if self._session is None or self._session.closed:
+            return 0
+        connector = self._session.connector
+        idle = sum(len(conns) for conns in getattr(connector, '_conns', {}).values())
+        return idle + len(getattr(connector, '_acquired', ()))
+
+    def acquire(self) -> None:
+        self._user_count += 1
+
+    async def release(self) -> None:
+        self._user_count -= 1
+        if self._user_count <= 0:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # Let the underlying SSL connections close gracefully
+            await asyncio.sleep(0)
+        self._session = None
+
+
+class PooledBot(Bot):
+    """Makes Bot API requests via the session of an ``HttpSessionPool``"""
+
+    def __init__(self, *args: Any, session_pool: HttpSessionPool, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.session_pool = session_pool
+        self._session_pool_released = False
+        session_pool.acquire()
+
+    async def get_session(self) -> Optional[aiohttp.ClientSession]:
+        return await self.session_pool.get_session()
+
+    async def close(self) -> None:
+        """Release the pool (once). The session is closed if no other bot uses it"""
+        if self._session_pool_released:
+            return
+        self._session_pool_released = True
+        await self.session_pool.release()
@@ -0,0 +1,175 @@
+"""
+Load generator for bots running against ``FakeBotAPIServer``.
+
+Run the server and the generator with
+``python -m aiokilogram.loadtest --rate 100 --duration 30``
+and start the bot with ``tg_api_server='http://127.0.0.1:8081'`` in its settings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+from typing import Any, Optional, Sequence
+
+import attr
+
+from aiokilogram.fake_api import FakeBotAPIServer
+
+
+def _get_percentile(sorted_values: Sequence[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(int(len(sorted_values) * percentile / 100), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+@attr.s(frozen=True)
+class LoadReport:
+    updates_sent: int = attr.ib(kw_only=True)
+    replies: int = attr.ib(kw_only=True)
+    unanswered: int = attr.ib(kw_only=True)
+    elapsed: float = attr.ib(kw_only=True)  # seconds
+    # Update-to-reply latencies in seconds
+    latencies: Sequence[float] = attr.ib(kw_only=True, repr=False)
+
+    @property
+    def throughput(self) -> float:
+        """Answered updates per second"""
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def get_latency_percentile(self, percentile: float) -> float:
+        return _get_percentile(sorted(self.latencies), percentile)
+
+    def format(self) -> str:
+        sorted_latencies = sorted(self.latencies)
+        lines = [
+            f'Updates sent: {self.updates_sent}, replies: {self.replies}, unanswered: {self.unanswered}',
+            f'Throughput: {self.throughput:.1f} updates/s over {self.elapsed:.1f}s',
+        ]
+        if sorted_latencies:
+            percentiles = ', '.join(
+                f'p{percentile}={_get_percentile(sorted_latencies, percentile) * 1000:.1f}ms'
+                for percentile in (50, 90, 99)
+            )
+            lines.append(
+                f'Latency: {percentiles}, mean={statistics.mean(sorted_latencies) * 1000:.1f}ms,'
+                f' max={sorted_latencies[-1] * 1000:.1f}ms'
+            )
+        return '\n'.join(lines)
+
+
+@attr.s
+class LoadGenerator:
+    """
+    Queues synthetic message and callback query updates in the fake server
+    at ``rate`` updates per second for ``duration`` seconds.
+
+    ``callback_share`` of the updates are callback queries with data picked from ``callback_data``.
+    """
+
+    server: FakeBotAPIServer = attr.ib(kw_only=True)
+    rate: float = attr.ib(kw_only=True, default=10.0)
+    duration: float = attr.ib(kw_only=True, default=10.0)
+    user_count: int = attr.ib(kw_only=True, default=100)
+    message_texts: Sequence[str] = attr.ib(kw_only=True, default=('/start',))
+    callback_data: Sequence[str] = attr.ib(kw_only=True, default=())
+    callback_share: float = attr.ib(kw_only=True, default=0.0)
+    # Time to wait for the remaining replies after the last update
+    drain_timeout: float = attr.ib(kw_only=True, default=5.0)
+    seed: Optional[int] = attr.ib(kw_only=True, default=None)
+    _random: random.Random = attr.ib(init=False)
+    _ids: itertools.count = attr.ib(init=False, factory=itertools.count)
+
+    def __attrs_post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+
+    def _make_user(self, user_id: int) -> dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}
+
+    def make_update(self, user_id: int) -> dict[str, Any]:
+        item_id = next(self._ids)
+        user = self._make_user(user_id)
+        chat = {'id': user_id, 'type': 'private'}
+        if self.callback_data and self._random.random() < self.callback_share:
+            return {'callback_query': {
+                'id': str(item_id), 'chat_instance': str(user_id), 'from': user,
+                'data': self._random.choice(self.callback_data),
+                'message': {'message_id': item_id, 'date': int(time.time()), 'chat': chat, 'text': ''},
+            }}
+
+        return {'message': {
+            'message_id': item_id, 'date': int(time.time()), 'chat': chat, 'from': user,
+            'text': self._random.choice(self.message_texts),
+        }}
+
+    async def run(self) -> LoadReport:
+        stats = self.server.stats
+        latency_count = len(stats.latencies)
+        replies = stats.replies
+        updates_sent = 0
+        started_at = time.perf_counter()
+        while (elapsed := time.perf_counter() - started_at) < self.duration:
+            # Catch up if the loop was blocked
+            while updates_sent < elapsed * self.rate:
+                user_id = self._random.randint(1, self.user_count)
+                self.server.push_update(self.make_update(user_id), chat_id=user_id)
+                updates_sent += 1
+            await asyncio.sleep(1 / self.rate)
+
+        drain_started_at = time.perf_counter()
+        while (
+                len(stats.latencies) - latency_count < updates_sent
+                and time.perf_counter() - drain_started_at < self.drain_timeout
+        ):
+            await asyncio.sleep(0.01)
+
+        latencies = stats.latencies[latency_count:]
+        return LoadReport(
+            updates_sent=updates_sent,
+            replies=stats.replies - replies,
+            unanswered=updates_sent - len(latencies),
+            elapsed=time.perf_counter() - started_at,
+            latencies=latencies,
+        )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    server = FakeBotAPIServer(host=args.host, port=args.port)
+    await server.start()
+    try:
+        print(f'Fake Bot API server is listening at {server.url}')
+        if args.wait:
+            print(f'Starting in {args.wait}s...')
+            await asyncio.sleep(args.wait)
+        generator = LoadGenerator(
+            server=server, rate=args.rate, duration=args.duration,
+            user_count=args.users, message_texts=args.text or ('/start',),
+            callback_data=args.callback_data or (), callback_share=args.callback_share,
+        )
+        report = await generator.run()
+        print(report.format())
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--rate', type=float, default=10.0, help='Updates per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--text', action='append', help='Text of message updates')
+    parser.add_argument('--callback-data', action='append', help='Data of callback query updates')
+    parser.add_argument('--callback-share', type=float, default=0.0, help='Share of callback query updates')
+    parser.add_argument('--wait', type=float, default=5.0, help='Seconds to wait for the bot to start')
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
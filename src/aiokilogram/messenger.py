@@ -2,16 +2,34 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from aiokilogram.scheduler import SendPriority
+from aiokilogram.broadcast import BroadcastProgress, UserIds
 
 if TYPE_CHECKING:
+    from aiogram import types
     from aiokilogram.page import MessagePage
 
 
 class MessengerInterface:
     # @abc.abstractmethod
-    async def send_text(self, user_id: str, text: str) -> None:
+    async def send_text(
+            self, user_id: str, text: str, priority: SendPriority = SendPriority.interactive,
+    ) -> None:
         raise NotImplementedError
 
     # @abc.abstractmethod
-    async def send_message_page(self, user_id: str, page: MessagePage) -> None:
+    async def send_message_page(
+            self, user_id: str, page: MessagePage, priority: SendPriority = SendPriority.interactive,
+    ) -> None:
+        raise NotImplementedError
+
+    # @abc.abstractmethod
+    async def update_message_page(
+            self, message: types.Message, page: MessagePage,
+            priority: SendPriority = SendPriority.interactive,
+    ) -> None:
+        raise NotImplementedError
+
+    # @abc.abstractmethod
+    async def broadcast(self, page: MessagePage, user_ids: UserIds) -> BroadcastProgress:
         raise NotImplementedError
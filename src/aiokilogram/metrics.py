@@ -0,0 +1,244 @@
+"""
+In-process metrics with Prometheus text exposition
+"""
+
+from __future__ import annotations
+
+import abc
+import bisect
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, ClassVar, Generic, Iterator, Optional, Sequence, Type, TypeVar
+
+import attr
+from aiohttp import web
+from aiogram.dispatcher.handler import SkipHandler
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+    return f'{{{pairs}}}'
+
+
+@attr.s(slots=True)
+class CounterChild:
+    value: float = attr.ib(default=0.0)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+@attr.s(slots=True)
+class GaugeChild:
+    value: float = attr.ib(default=0.0)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+@attr.s(slots=True)
+class HistogramChild:
+    buckets: Sequence[float] = attr.ib()
+    counts: list[int] = attr.ib()
+    sum: float = attr.ib(default=0.0)
+    count: int = attr.ib(default=0)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_CHILD_TV = TypeVar('_CHILD_TV')
+
+
+@attr.s
+class Metric(abc.ABC, Generic[_CHILD_TV]):
+    """A family of metric values with the same name and different label values"""
+
+    type_name: ClassVar[str]
+
+    name: str = attr.ib(kw_only=True)
+    help: str = attr.ib(kw_only=True, default='')
+    label_names: Sequence[str] = attr.ib(kw_only=True, default=())
+    _children: dict[tuple[str, ...], _CHILD_TV] = attr.ib(init=False, factory=dict)
+
+    @abc.abstractmethod
+    def _make_child(self) -> _CHILD_TV:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> _CHILD_TV:
+        """Return the value for the given label values. Keep it to avoid repeated lookups"""
+        if len(values) != len(self.label_names):
+            raise ValueError(f'Expected {len(self.label_names)} label values for {self.name}, got {len(values)}')
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._make_child()
+        return child
+
+    @abc.abstractmethod
+    def _render_samples(self, label_values: tuple[str, ...], child: _CHILD_TV) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.type_name}'
+        for label_values, child in self._children.items():
+            yield from self._render_samples(label_values, child)
+
+
+@attr.s
+class Counter(Metric[CounterChild]):
+    type_name = 'counter'
+
+    def _make_child(self) -> CounterChild:
+        return CounterChild()
+
+    def _render_samples(self, label_values: tuple[str, ...], child: CounterChild) -> Iterator[str]:
+        yield f'{self.name}{_format_labels(self.label_names, label_values)} {child.value}'
+
+
+@attr.s
+class Gauge(Metric[GaugeChild]):
+    type_name = 'gauge'
+
+    def _make_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def _render_samples(self, label_values: tuple[str, ...], child: GaugeChild) -> Iterator[str]:
+        yield f'{self.name}{_format_labels(self.label_names, label_values)} {child.value}'
+
+
+@attr.s
+class Histogram(Metric[HistogramChild]):
+    type_name = 'histogram'
+
+    buckets: Sequence[float] = attr.ib(kw_only=True, default=DEFAULT_BUCKETS)
+
+    def _make_child(self) -> HistogramChild:
+        return HistogramChild(buckets=self.buckets, counts=[0] * (len(self.buckets) + 1))
+
+    def _render_samples(self, label_values: tuple[str, ...], child: HistogramChild) -> Iterator[str]:
+        bucket_label_names = [*self.label_names, 'le']
+        cumulative_count = 0
+        for bound, count in zip([*map(str, self.buckets), '+Inf'], child.counts):
+            cumulative_count += count
+            labels = _format_labels(bucket_label_names, (*label_values, bound))
+            yield f'{self.name}_bucket{labels} {cumulative_count}'
+        labels = _format_labels(self.label_names, label_values)
+        yield f'{self.name}_sum{labels} {child.sum}'
+        yield f'{self.name}_count{labels} {child.count}'
+
+
+_METRIC_TV = TypeVar('_METRIC_TV', bound=Metric)
+
+
+@attr.s
+class MetricsRegistry:
+    _metrics: dict[str, Metric] = attr.ib(init=False, factory=dict)
+
+    def _get_or_create(self, metric_cls: Type[_METRIC_TV], name: str, **kwargs: Any) -> _METRIC_TV:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = metric_cls(name=name, **kwargs)
+        if not isinstance(metric, metric_cls):
+            raise TypeError(f'Metric {name} is already registered as {type(metric).__name__}')
+        return metric
+
+    def counter(self, name: str, help: str = '', label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help=help, label_names=label_names)
+
+    def gauge(self, name: str, help: str = '', label_names: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help=help, label_names=label_names)
+
+    def histogram(
+            self, name: str, help: str = '', label_names: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help=help, label_names=label_names, buckets=buckets)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        lines.append('')
+        return '\n'.join(lines)
+
+
+HANDLER_LABEL_NAMES = ('handler', 'method', 'action')
+
+_FUNC_TV = TypeVar('_FUNC_TV', bound=Callable[..., Awaitable])
+
+
+def instrument_handler(
+        registry: MetricsRegistry, handler_name: str, method_name: str, action_name: str = '',
+) -> Callable[[_FUNC_TV], _FUNC_TV]:
+    """Count calls, errors, in-flight calls and latency of a handler method"""
+
+    label_values = (handler_name, method_name, action_name)
+    calls = registry.counter(
+        'kilo_handler_calls_total', 'Handler method calls', HANDLER_LABEL_NAMES,
+    ).labels(*label_values)
+    errors = registry.counter(
+        'kilo_handler_errors_total', 'Handler method calls that raised an exception', HANDLER_LABEL_NAMES,
+    ).labels(*label_values)
+    in_progress = registry.gauge(
+        'kilo_handler_in_progress', 'Handler method calls in progress', HANDLER_LABEL_NAMES,
+    ).labels(*label_values)
+    latency = registry.histogram(
+        'kilo_handler_latency_seconds', 'Handler method latency', HANDLER_LABEL_NAMES,
+    ).labels(*label_values)
+
+    def decorator(func: _FUNC_TV) -> _FUNC_TV:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            calls.value += 1
+            in_progress.value += 1
+            started_at = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except SkipHandler:
+                raise
+            except Exception:
+                errors.value += 1
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started_at)
+                in_progress.value -= 1
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def make_metrics_app(registry: MetricsRegistry, path: str = '/metrics') -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get(path, handle)
+    return app
+
+
+async def serve_metrics(registry: MetricsRegistry, host: str, port: int, path: str = '/metrics') -> web.AppRunner:
+    """Start the exposition endpoint. Call ``cleanup()`` on the result to stop it"""
+    runner = web.AppRunner(make_metrics_app(registry, path=path))
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    return runner
@@ -0,0 +1,105 @@
+"""
+Concurrent processing of updates with per-key ordering
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncGenerator, Hashable, Optional, TYPE_CHECKING
+
+import attr
+
+if TYPE_CHECKING:
+    from aiogram import types
+
+
+@attr.s
+class _KeyLock:
+    lock: asyncio.Lock = attr.ib(factory=asyncio.Lock)
+    users: int = attr.ib(default=0)
+
+
+@attr.s
+class OrderedConcurrencyLimiter:
+    """
+    Lets at most ``max_concurrency`` tasks run at the same time,
+    but only one task per key. Tasks with the same key run
+    in the order they entered ``slot``.
+    """
+
+    max_concurrency: int = attr.ib(kw_only=True)
+    _key_locks: dict[Hashable, _KeyLock] = attr.ib(init=False, factory=dict)
+    _semaphore: Optional[asyncio.Semaphore] = attr.ib(init=False, default=None)
+    _running: int = attr.ib(init=False, default=0)
+    _waiting: int = attr.ib(init=False, default=0)
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @asynccontextmanager
+    async def slot(self, key: Optional[Hashable]) -> AsyncGenerator[None, None]:
+        """Wait for a free slot. Tasks with ``None`` key are not ordered"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        key_lock: Optional[_KeyLock] = None
+        if key is not None:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.users += 1
+
+        self._waiting += 1
+        started = False
+        try:
+            async with AsyncExitStack() as stack:
+                if key_lock is not None:
+                    await stack.enter_async_context(key_lock.lock)
+                await stack.enter_async_context(self._semaphore)
+                started = True
+                self._waiting -= 1
+                self._running += 1
+                try:
+                    yield
+                finally:
+                    self._running -= 1
+        finally:
+            if not started:
+                self._waiting -= 1
+            if key_lock is not None:
+                key_lock.users -= 1
+                if key_lock.users == 0:
+                    del self._key_locks[key]
+
+
+def get_update_partition_key(update: types.Update) -> Optional[int]:
+    """Return the ID of the chat or user the update belongs to"""
+    for message in (update.message, update.edited_message, update.channel_post, update.edited_channel_post):
+        if message is not None:
+            return message.chat.id
+
+    # Button presses belong to the chat of the message with the keyboard
+    # (there is no message for buttons of inline mode messages)
+    if update.callback_query is not None and update.callback_query.message is not None:
+        return update.callback_query.message.chat.id
+
+    for event in (
+            update.callback_query, update.inline_query, update.chosen_inline_result,
+            update.shipping_query, update.pre_checkout_query, update.poll_answer,
+            update.my_chat_member, update.chat_member, update.chat_join_request,
+    ):
+        if event is not None:
+            chat = getattr(event, 'chat', None)
+            if chat is not None:
+                return chat.id
+            user = getattr(event, 'from_user', None) or getattr(event, 'user', None)
+            if user is not None:
+                return user.id
+
+    return None
@@ -1,22 +1,39 @@
 from __future__ import annotations
 
 import abc
-from typing import Iterable, Optional, TYPE_CHECKING, Union
+from typing import Any, Hashable, Iterable, Optional, Sequence, TYPE_CHECKING, Union
 
 import attr
 import aiogram.types
-from emoji.core import emojize
+
+from aiokilogram.emojis import resolve_emoji
 
 if TYPE_CHECKING:
     from aiokilogram.action import CallbackAction
 
 
-@attr.s
+def _check_not_frozen(instance: Any, attribute: attr.Attribute, value: Any) -> Any:
+    if instance.is_frozen:
+        raise attr.exceptions.FrozenInstanceError()
+    return value
+
+
+@attr.s(on_setattr=_check_not_frozen)
 class MessageBody:
     """Represents the text part of the message page"""
 
     text: str = attr.ib(kw_only=True)
     parse_mode: str = attr.ib(kw_only=True, default=aiogram.types.ParseMode.MARKDOWN_V2)
+    _frozen: bool = attr.ib(init=False, default=False, eq=False, repr=False)
+
+    @property
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self) -> MessageBody:
+        """Make the body immutable"""
+        self._frozen = True
+        return self
 
 
 @attr.s(frozen=True)
@@ -26,10 +43,15 @@ class MessageButton(abc.ABC):
     text: Optional[str] = attr.ib(kw_only=True, default=None)
     emoji: Optional[str] = attr.ib(kw_only=True, default=None)
 
+    @emoji.validator
+    def _validate_emoji(self, attribute: attr.Attribute, value: Optional[str]) -> None:
+        if value is not None:
+            resolve_emoji(value)
+
     @property
     def emoji_code(self) -> str:
         assert self.emoji is not None
-        return emojize(f':{self.emoji.strip(":")}:')
+        return resolve_emoji(self.emoji)
 
     @property
     def full_text(self) -> str:
@@ -45,6 +67,13 @@ class MessageButton(abc.ABC):
     def get_callback_data(self) -> str:
         raise NotImplementedError
 
+    def get_cache_key(self) -> Optional[Hashable]:
+        """
+        Return a key identifying the rendered button
+        or ``None`` if its rendering should not be cached
+        """
+        return None
+
 
 @attr.s
 class PlainMessageButton(MessageButton):
@@ -55,6 +84,9 @@ class PlainMessageButton(MessageButton):
     def get_callback_data(self) -> str:
         return self.callback_data
 
+    def get_cache_key(self) -> Optional[Hashable]:
+        return type(self), self.text, self.emoji, self.callback_data
+
 
 @attr.s
 class ActionMessageButton(MessageButton):
@@ -65,22 +97,67 @@ class ActionMessageButton(MessageButton):
     def get_callback_data(self) -> str:
         return self.action.serialize()
 
+    def get_cache_key(self) -> Optional[Hashable]:
+        return type(self), self.text, self.emoji, type(self.action), tuple(self.action.data.items())
 
-@attr.s
+
+@attr.s(on_setattr=_check_not_frozen)
 class MessageKeyboard:
     """Keyboard to be added to the message"""
 
-    buttons: list[MessageButton] = attr.ib(kw_only=True)
+    buttons: Sequence[MessageButton] = attr.ib(kw_only=True)
     row_width: int = attr.ib(kw_only=True, default=1)
+    _frozen: bool = attr.ib(init=False, default=False, eq=False, repr=False)
+    # Set by ``KeyboardRenderer`` for frozen keyboards
+    rendered_markup: Optional[aiogram.types.InlineKeyboardMarkup] = attr.ib(
+        init=False, default=None, eq=False, repr=False, on_setattr=attr.setters.NO_OP,
+    )
 
+    @property
+    def is_frozen(self) -> bool:
+        return self._frozen
 
-@attr.s
+    def freeze(self) -> MessageKeyboard:
+        """Make the keyboard immutable, so that it is rendered only once"""
+        if not self._frozen:
+            self.buttons = tuple(self.buttons)
+            self._frozen = True
+        return self
+
+    def get_cache_key(self) -> Optional[Hashable]:
+        button_keys: list[Hashable] = []
+        for button in self.buttons:
+            button_key = button.get_cache_key()
+            if button_key is None:
+                return None
+            button_keys.append(button_key)
+
+        return self.row_width, tuple(button_keys)
+
+
+@attr.s(on_setattr=_check_not_frozen)
 class MessagePage:
     """Describes the various parts and attachments of a message"""
 
     body: MessageBody = attr.ib(kw_only=True)
     keyboard: Optional[MessageKeyboard] = attr.ib(kw_only=True, default=None)
     disable_preview: bool = attr.ib(kw_only=True, default=False)
+    _frozen: bool = attr.ib(init=False, default=False, eq=False, repr=False)
+
+    @property
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self) -> MessagePage:
+        """
+        Make the page, its body and its keyboard immutable.
+        Use this for static pages that are sent many times.
+        """
+        self.body.freeze()
+        if self.keyboard is not None:
+            self.keyboard.freeze()
+        self._frozen = True
+        return self
 
 
 def simple_page(
@@ -0,0 +1,80 @@
+"""
+Keyboards that show one page of a large or remote list of items at a time
+"""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable, Generic, Optional, Sequence, TypeVar, Union
+
+import attr
+
+from aiokilogram.action import CallbackAction, IntegerActionField, StringActionField
+from aiokilogram.page import ActionMessageButton, MessageBody, MessageButton, MessageKeyboard, MessagePage
+
+
+class PaginationAction(CallbackAction):
+    """Shows the page of the paginated keyboard starting at ``offset``"""
+
+    COMPACT_TAG = '_pg'
+
+    keyboard_id = StringActionField()
+    offset = IntegerActionField()
+
+
+_ITEM_TV = TypeVar('_ITEM_TV')
+
+# Async callable that returns at most ``limit`` items starting at ``offset``
+PageFetcher = Callable[[int, int], Awaitable[Sequence[_ITEM_TV]]]
+
+
+@attr.s(frozen=True)
+class PaginatedKeyboard(Generic[_ITEM_TV]):
+    """
+    Keyboard over a sized sequence or an async page fetcher.
+
+    Only the items of the current page are fetched and turned into buttons.
+    Navigation buttons carry a ``PaginationAction``, and its handler
+    is registered automatically for keyboards defined as attributes
+    of a ``CommandHandler`` class (or via ``register_paginated_keyboard``).
+    """
+
+    keyboard_id: str = attr.ib(kw_only=True)
+    body: MessageBody = attr.ib(kw_only=True)
+    items: Union[Sequence[_ITEM_TV], PageFetcher] = attr.ib(kw_only=True)
+    make_button: Callable[[_ITEM_TV], MessageButton] = attr.ib(kw_only=True)
+    page_size: int = attr.ib(kw_only=True, default=10)
+    prev_emoji: str = attr.ib(kw_only=True, default='left_arrow')
+    next_emoji: str = attr.ib(kw_only=True, default='right_arrow')
+
+    async def _fetch_items(self, offset: int) -> tuple[Sequence[_ITEM_TV], bool]:
+        """Return the items of the page and whether there are more of them"""
+        if isinstance(self.items, Sequence):
+            return self.items[offset:offset + self.page_size], offset + self.page_size < len(self.items)
+
+        # Fetch one extra item to find out if there is a next page
+        items = await self.items(offset, self.page_size + 1)
+        return items[:self.page_size], len(items) > self.page_size
+
+    def make_action(self, offset: int) -> PaginationAction:
+        return PaginationAction(keyboard_id=self.keyboard_id, offset=offset)
+
+    async def make_keyboard(self, offset: int = 0) -> MessageKeyboard:
+        offset = max(offset, 0)
+        items, has_next = await self._fetch_items(offset)
+        buttons = [self.make_button(item) for item in items]
+        if offset > 0:
+            buttons.append(ActionMessageButton(
+                emoji=self.prev_emoji, action=self.make_action(max(offset - self.page_size, 0)),
+            ))
+        if has_next:
+            buttons.append(ActionMessageButton(
+                emoji=self.next_emoji, action=self.make_action(offset + self.page_size),
+            ))
+        return MessageKeyboard(buttons=buttons)
+
+    async def make_page(self, offset: int = 0, disable_preview: bool = False) -> MessagePage:
+        return MessagePage(
+            body=self.body,
+            keyboard=await self.make_keyboard(offset=offset),
+            disable_preview=disable_preview,
+        )
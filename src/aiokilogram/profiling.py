@@ -0,0 +1,180 @@
+"""
+Slow update detection and sampled profiling of update handling
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, TypeVar, TYPE_CHECKING
+
+import attr
+from aiogram import types
+
+if TYPE_CHECKING:
+    # Are imported only if profiling is enabled
+    import cProfile
+    import pstats
+
+
+LOGGER = logging.getLogger(__name__)
+
+UNHANDLED_NAME = 'unhandled'
+
+
+@attr.s(slots=True)
+class UpdateProfile:
+    update_id: int = attr.ib(kw_only=True)
+    handler_name: Optional[str] = attr.ib(kw_only=True, default=None)
+    # Durations of named phases in seconds. Phases can be nested
+    phases: dict[str, float] = attr.ib(kw_only=True, factory=dict)
+    total: float = attr.ib(kw_only=True, default=0.0)
+
+    def add_phase(self, name: str, duration: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def format_phases(self) -> str:
+        return ', '.join(f'{name}={duration * 1000:.1f}ms' for name, duration in self.phases.items())
+
+
+_current_profile: ContextVar[Optional[UpdateProfile]] = ContextVar('_current_profile', default=None)
+
+
+class profile_phase:
+    """
+    Context manager that adds its duration to the given phase of the update being profiled.
+    Does nothing if there is no such update.
+    """
+
+    __slots__ = ('_name', '_profile', '_started_at')
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._profile = _current_profile.get()
+        if self._profile is not None:
+            self._started_at = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._profile is not None:
+            self._profile.add_phase(self._name, time.perf_counter() - self._started_at)
+
+
+_FUNC_TV = TypeVar('_FUNC_TV', bound=Callable[..., Awaitable])
+
+
+def profile_handler(handler_name: str) -> Callable[[_FUNC_TV], _FUNC_TV]:
+    """Attribute the update being profiled to the handler and time it as the ``handler`` phase"""
+
+    def decorator(func: _FUNC_TV) -> _FUNC_TV:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profile = _current_profile.get()
+            if profile is None:
+                return await func(*args, **kwargs)
+
+            profile.handler_name = handler_name
+            started_at = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profile.add_phase('handler', time.perf_counter() - started_at)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+@attr.s
+class UpdateProfiler:
+    """
+    Logs updates that take longer than ``slow_threshold`` seconds
+    along with the durations of their phases.
+
+    Every ``sample_every``-th update is profiled with ``cProfile``.
+    The results are aggregated per handler and written to ``output_dir`` if it is set.
+    The profiler sees everything that runs while the sampled update is being processed,
+    so with concurrent processing the samples include other updates too.
+    """
+
+    slow_threshold: Optional[float] = attr.ib(kw_only=True, default=1.0)
+    sample_every: Optional[int] = attr.ib(kw_only=True, default=None)
+    output_dir: Optional[str] = attr.ib(kw_only=True, default=None)
+    _update_count: int = attr.ib(init=False, default=0)
+    _sampling: bool = attr.ib(init=False, default=False)
+    _handler_stats: dict[str, pstats.Stats] = attr.ib(init=False, factory=dict)
+
+    def _start_sample(self) -> Optional[cProfile.Profile]:
+        self._update_count += 1
+        if (
+                self.sample_every is None or self._sampling
+                or self._update_count % self.sample_every != 0
+        ):
+            return None
+
+        import cProfile
+
+        self._sampling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    @asynccontextmanager
+    async def profile(self, update: types.Update) -> AsyncGenerator[UpdateProfile, None]:
+        profile = UpdateProfile(update_id=update.update_id)
+        ctx_token = _current_profile.set(profile)
+        profiler = self._start_sample()
+        started_at = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.total = time.perf_counter() - started_at
+            if profiler is not None:
+                profiler.disable()
+                self._sampling = False
+            _current_profile.reset(ctx_token)
+
+            if profiler is not None:
+                self.on_sampled_update(profile=profile, profiler=profiler)
+            if self.slow_threshold is not None and profile.total >= self.slow_threshold:
+                self.on_slow_update(profile=profile)
+
+    def on_slow_update(self, profile: UpdateProfile) -> None:
+        """Redefine this to report slow updates elsewhere"""
+        LOGGER.warning(
+            'Slow update %s handled by %s in %.1fms: %s',
+            profile.update_id, profile.handler_name or UNHANDLED_NAME,
+            profile.total * 1000, profile.format_phases(),
+        )
+
+    def on_sampled_update(self, profile: UpdateProfile, profiler: cProfile.Profile) -> None:
+        import pstats
+
+        handler_name = profile.handler_name or UNHANDLED_NAME
+        stats = pstats.Stats(profiler)
+        if handler_name in self._handler_stats:
+            self._handler_stats[handler_name].add(stats)
+        else:
+            self._handler_stats[handler_name] = stats
+
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.output_dir, f'{handler_name}-{profile.update_id}.prof'))
+
+    def get_handler_stats(self) -> dict[str, pstats.Stats]:
+        """Profiling results of sampled updates aggregated per handler"""
+        return dict(self._handler_stats)
+
+    def dump_handler_stats(self) -> None:
+        """Write aggregated results to ``<output_dir>/<handler>.prof``"""
+        if self.output_dir is None:
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        for handler_name, stats in self._handler_stats.items():
+            stats.dump_stats(os.path.join(self.output_dir, f'{handler_name}.prof'))
@@ -3,7 +3,7 @@ from typing import Any, Callable, Optional, Sequence, Type, TypeVar, Union
 import attr
 
 from aiokilogram.action import CallbackAction, ActionParameterization
-from aiokilogram.errors import ErrorHandler
+from aiokilogram.errors import CircuitBreaker, ErrorHandler
 
 
 KILO_DISP_REG_INFO_ATTR = '__kilo_disp_reg_info'
@@ -15,6 +15,9 @@ class KiloDispatcherRegInfo:
     args: Sequence[Any] = attr.ib(kw_only=True)
     kwargs: dict[str, Any] = attr.ib(kw_only=True)
     error_handler: Optional[ErrorHandler] = attr.ib(kw_only=True, default=None)
+    circuit_breaker: Optional[CircuitBreaker] = attr.ib(kw_only=True, default=None)
+    # Overrides the class-level setting if not ``None``
+    auto_answer: Optional[bool] = attr.ib(kw_only=True, default=None)
 
 
 _CALLABLE_TV = TypeVar('_CALLABLE_TV', bound=Callable)
@@ -24,10 +27,15 @@ def register_callback_query_handler(
         *custom_filters, state=None, run_task=None,
         action: Optional[Union[Type[CallbackAction], ActionParameterization]] = None,
         error_handler: Optional[ErrorHandler] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        auto_answer: Optional[bool] = None,
         **kwargs,
 ) -> Callable[[_CALLABLE_TV], _CALLABLE_TV]:
     """
-    Decorator for registering a kilo bot method as a callback query handler
+    Decorator for registering a kilo bot method as a callback query handler.
+
+    If ``auto_answer`` is set, the query is answered automatically
+    (see ``CommandHandler.auto_answer_callback_queries``).
     """
 
     def decorator(method: _CALLABLE_TV) -> _CALLABLE_TV:
@@ -39,6 +47,8 @@ def register_callback_query_handler(
                 **kwargs,
             ),
             error_handler=error_handler,
+            circuit_breaker=circuit_breaker,
+            auto_answer=auto_answer,
         )
         setattr(method, KILO_DISP_REG_INFO_ATTR, reg_info)
         return method
@@ -50,6 +60,7 @@ def register_message_handler(
         *custom_filters, commands=None, regexp=None, content_types=None,
         state=None, run_task=None,
         error_handler: Optional[ErrorHandler] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
         **kwargs,
 ) -> Callable[[_CALLABLE_TV], _CALLABLE_TV]:
     """
@@ -66,6 +77,7 @@ def register_message_handler(
                 **kwargs,
             ),
             error_handler=error_handler,
+            circuit_breaker=circuit_breaker,
         )
         setattr(method, KILO_DISP_REG_INFO_ATTR, reg_info)
         return method
@@ -0,0 +1,141 @@
+"""
+Rendering of message keyboards into aiogram markup
+and tracking of the last rendered contents of sent messages
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, Hashable, Optional
+
+import attr
+from aiogram import types
+
+from aiokilogram.action_store import ActionStore
+from aiokilogram.page import MessageKeyboard
+
+
+@attr.s
+class KeyboardRenderStats:
+    hits: int = attr.ib(kw_only=True, default=0)
+    misses: int = attr.ib(kw_only=True, default=0)
+    evictions: int = attr.ib(kw_only=True, default=0)
+
+
+@attr.s
+class KeyboardRenderer:
+    """
+    Renders ``MessageKeyboard`` objects and memoizes the results.
+
+    Frozen keyboards are rendered only once and keep their markup.
+    Other keyboards are cached by their content in a bounded LRU cache.
+    Keyboards with buttons that had to be replaced with ``action_store`` tokens
+    are never cached because the tokens may expire.
+    """
+
+    _action_store: Optional[ActionStore] = attr.ib(kw_only=True, default=None)
+    max_cache_size: int = attr.ib(kw_only=True, default=1024)
+    stats: KeyboardRenderStats = attr.ib(init=False, factory=KeyboardRenderStats)
+    _cache: OrderedDict[Hashable, types.InlineKeyboardMarkup] = attr.ib(init=False, factory=OrderedDict)
+
+    async def render(self, keyboard: MessageKeyboard) -> types.InlineKeyboardMarkup:
+        if keyboard.is_frozen:
+            if keyboard.rendered_markup is not None:
+                self.stats.hits += 1
+                return keyboard.rendered_markup
+
+            self.stats.misses += 1
+            markup, cacheable = await self._render_markup(keyboard)
+            if cacheable:
+                keyboard.rendered_markup = markup
+            return markup
+
+        cache_key = keyboard.get_cache_key() if self.max_cache_size > 0 else None
+        if cache_key is not None:
+            try:
+                cached_markup = self._cache.get(cache_key)
+            except TypeError:  # Unhashable values of action fields
+                cache_key = None
+            else:
+                if cached_markup is not None:
+                    self._cache.move_to_end(cache_key)
+                    self.stats.hits += 1
+                    return cached_markup
+
+        self.stats.misses += 1
+        markup, cacheable = await self._render_markup(keyboard)
+        if cache_key is not None and cacheable:
+            self._cache[cache_key] = markup
+            while len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
+                self.stats.evictions += 1
+
+        return markup
+
+    async def _render_markup(self, keyboard: MessageKeyboard) -> tuple[types.InlineKeyboardMarkup, bool]:
+        """Return the markup and whether it can be cached"""
+        cacheable = True
+        markup = types.InlineKeyboardMarkup(row_width=keyboard.row_width)
+        for button in keyboard.buttons:
+            callback_data = button.get_callback_data()
+            if self._action_store is not None:
+                stored_callback_data = await self._action_store.shorten(callback_data)
+                if stored_callback_data != callback_data:
+                    callback_data = stored_callback_data
+                    cacheable = False
+            markup.add(types.InlineKeyboardButton(
+                text=button.full_text,
+                callback_data=callback_data,
+            ))
+
+        return markup, cacheable
+
+
+@attr.s(frozen=True)
+class RenderedPage:
+    """Contents of a message as it was sent to Telegram"""
+
+    text: str = attr.ib(kw_only=True)
+    parse_mode: Optional[str] = attr.ib(kw_only=True)
+    disable_preview: bool = attr.ib(kw_only=True)
+    reply_markup: Optional[types.InlineKeyboardMarkup] = attr.ib(kw_only=True, eq=False)
+
+    @cached_property
+    def _markup_data(self) -> Optional[dict[str, Any]]:
+        # Computed only when the markups are not the same object
+        return self.reply_markup.to_python() if self.reply_markup is not None else None
+
+    def body_equals(self, other: RenderedPage) -> bool:
+        return (
+            self.text == other.text
+            and self.parse_mode == other.parse_mode
+            and self.disable_preview == other.disable_preview
+        )
+
+    def markup_equals(self, other: RenderedPage) -> bool:
+        return self.reply_markup is other.reply_markup or self._markup_data == other._markup_data
+
+
+@attr.s
+class RenderedPageHistory:
+    """Remembers the last rendered pages of up to ``max_size`` messages"""
+
+    max_size: int = attr.ib(kw_only=True, default=10_000)
+    # {(chat_id, message_id): page}
+    _pages: OrderedDict[tuple[int, int], RenderedPage] = attr.ib(init=False, factory=OrderedDict)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, chat_id: int, message_id: int) -> Optional[RenderedPage]:
+        page = self._pages.get((chat_id, message_id))
+        if page is not None:
+            self._pages.move_to_end((chat_id, message_id))
+        return page
+
+    def set(self, chat_id: int, message_id: int, page: RenderedPage) -> None:
+        self._pages[(chat_id, message_id)] = page
+        self._pages.move_to_end((chat_id, message_id))
+        while len(self._pages) > self.max_size:
+            self._pages.popitem(last=False)
@@ -0,0 +1,355 @@
+"""
+Action-aware routing of callback queries.
+
+Instead of trying a separate regexp for every registered ``action=`` binding,
+the action classes the callback data may belong to are found once: compact actions
+are found by their tag and all other action classes are indexed
+by the values their first field can take (if these are limited,
+as with enum fields), so that only the patterns of the classes
+the data may belong to are tried.
+The values of the fields fixed via ``CallbackAction.when(...)``
+are then looked up in a hash table.
+"""
+
+from __future__ import annotations
+
+import inspect
+import itertools
+import re
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Type, TypeVar, Union, TYPE_CHECKING
+
+import attr
+from aiogram import types
+from aiogram.dispatcher.filters import FilterNotPassed, check_filters, get_filters_spec
+from aiogram.dispatcher.filters.filters import FilterObj
+from aiogram.dispatcher.handler import SkipHandler, ctx_data, current_handler
+
+from aiokilogram import codec
+from aiokilogram.action import CallbackAction, ActionParameterization
+from aiokilogram.profiling import profile_phase
+
+if TYPE_CHECKING:
+    from aiogram import Dispatcher
+
+
+# Name of the handler argument the parsed action is passed in
+ACTION_ARG_NAME = 'action'
+# Key of the handler data the matching routes are passed to the router entry in
+_ROUTES_DATA_KEY = '_kilo_callback_routes'
+# Key of the handler data the parsed callback data is kept in for the entries of all segments
+_PARSED_DATA_KEY = '_kilo_parsed_callback_data'
+
+_current_action: ContextVar[Optional[CallbackAction]] = ContextVar('current_action', default=None)
+
+_ACTION_TV = TypeVar('_ACTION_TV', bound=CallbackAction)
+
+
+def get_current_action(action_cls: Type[_ACTION_TV]) -> _ACTION_TV:
+    """
+    Return the action parsed from the callback query that is currently being processed.
+    Can be used in filters, error handlers and handlers
+    without parsing ``query.data`` again.
+    """
+    action = _current_action.get()
+    if not isinstance(action, action_cls):
+        raise LookupError(f'No current action of type {action_cls.__name__}')
+    return action
+
+
+def get_handler_spec(callback: Callable) -> inspect.FullArgSpec:
+    """Return the argument spec of the callback, looking through its decorators"""
+    while hasattr(callback, '__wrapped__'):
+        callback = callback.__wrapped__
+    return inspect.getfullargspec(callback)
+
+
+def select_handler_kwargs(spec: inspect.FullArgSpec, data: dict[str, Any]) -> dict[str, Any]:
+    """Return the items of the handler data the callback accepts"""
+    if spec.varkw:
+        return data
+    arg_names = set(spec.args + spec.kwonlyargs)
+    return {name: value for name, value in data.items() if name in arg_names}
+
+
+@attr.s(frozen=True)
+class CallbackRoute:
+    """A single handler bound to an action"""
+
+    seq: int = attr.ib(kw_only=True)
+    # Routes of different segments are served by different router entries
+    segment: int = attr.ib(kw_only=True)
+    callback: Callable = attr.ib(kw_only=True)
+    spec: inspect.FullArgSpec = attr.ib(kw_only=True)
+    filters: Sequence[FilterObj] = attr.ib(kw_only=True)
+
+
+@attr.s
+class ActionRouteTable:
+    """All routes bound to a single action class"""
+
+    action_cls: Type[CallbackAction] = attr.ib(kw_only=True)
+    # Position of the action class among the registered ones
+    seq: int = attr.ib(kw_only=True)
+    _pattern: Optional[re.Pattern] = attr.ib(init=False, default=None)
+    # {names of fixed fields: {values of fixed fields: [routes]}}
+    _tables: dict[tuple[str, ...], dict[tuple, list[CallbackRoute]]] = attr.ib(init=False, factory=dict)
+
+    def __attrs_post_init__(self) -> None:
+        if self.action_cls.COMPACT_TAG is None:
+            self._pattern = re.compile(self.action_cls.get_capturing_pattern())
+
+    def get_leading_literals(self) -> Optional[frozenset[str]]:
+        """
+        Return all values the serialized action can start with (up to the first separator)
+        or ``None`` if they are not limited
+        """
+        fields = self.action_cls.get_action_schema().fields
+        if not fields:
+            return None
+        literals = fields[0][1].get_literals()
+        if literals is None or any(self.action_cls.SEP in literal for literal in literals):
+            return None
+        return literals
+
+    def add_route(self, route: CallbackRoute, values: dict[str, Any]) -> None:
+        field_names = self.action_cls.get_action_schema().names
+        fixed_names = tuple(sorted(name for name, value in values.items() if value is not None))
+        for name in fixed_names:
+            if name not in field_names:
+                raise AttributeError(f'Invalid action field {name} for {self.action_cls.__name__}')
+
+        key = tuple(values[name] for name in fixed_names)
+        self._tables.setdefault(fixed_names, {}).setdefault(key, []).append(route)
+
+    def parse(self, data: str) -> Optional[CallbackAction]:
+        """Return the action encoded in the callback data or ``None`` if it doesn't match"""
+        try:
+            if self._pattern is None:
+                return self.action_cls.deserialize(data)
+
+            match = self._pattern.match(data)
+            if match is None:
+                return None
+            return self.action_cls(**{
+                name: field.deserialize(match.group(name))
+                for name, field in self.action_cls.get_action_schema().fields
+            })
+        except (ValueError, KeyError):
+            return None
+
+    def find_routes(self, action: CallbackAction, segment: int) -> Iterator[CallbackRoute]:
+        action_data = action.data
+        for fixed_names, table in self._tables.items():
+            key = tuple(action_data[name] for name in fixed_names)
+            for route in table.get(key, ()):
+                if route.segment == segment:
+                    yield route
+
+
+@attr.s
+class ParsedCallbackData:
+    """
+    Callback data along with the route tables of the action classes it may belong to.
+    The data is parsed by each of the tables at most once.
+    """
+
+    data: str = attr.ib(kw_only=True)
+    # In order of registration of the action classes
+    route_tables: Sequence[ActionRouteTable] = attr.ib(kw_only=True)
+    # {seq of route table: parsed action}
+    _actions: dict[int, Optional[CallbackAction]] = attr.ib(init=False, factory=dict)
+
+    def get_action(self, route_table: ActionRouteTable) -> Optional[CallbackAction]:
+        if route_table.seq not in self._actions:
+            self._actions[route_table.seq] = route_table.parse(self.data)
+        return self._actions[route_table.seq]
+
+    def iter_routes(self, segment: int) -> Iterator[tuple[CallbackRoute, CallbackAction]]:
+        """
+        Yield the routes of the segment matching the data along with the actions parsed from it.
+        Action classes are tried one after another, and the routes of each class
+        in order of registration. The later classes are only parsed if they are reached.
+        """
+        for route_table in self.route_tables:
+            with profile_phase('routing'):
+                action = self.get_action(route_table)
+                if action is None:
+                    continue
+                routes = sorted(route_table.find_routes(action, segment=segment), key=lambda route: route.seq)
+            for route in routes:
+                yield route, action
+
+
+@attr.s(frozen=True)
+class CallbackRouterEntry:
+    """
+    Is registered in the dispatcher in place of consecutive ``action=...`` bindings
+    (a segment of routes), so that they keep their position
+    among the other callback query handlers.
+
+    ``has_routes`` is used as the handler's filter, so the entry (and the
+    ``process_callback_query`` middleware) is only called for queries with matching routes.
+    """
+
+    router: CallbackQueryRouter = attr.ib(kw_only=True)
+    segment: int = attr.ib(kw_only=True)
+
+    async def has_routes(self, query: types.CallbackQuery) -> Union[bool, dict[str, Any]]:
+        routes = await self.router.match(query, segment=self.segment)
+        first_route = next(routes, None)
+        if first_route is None:
+            return False
+        return {_ROUTES_DATA_KEY: itertools.chain((first_route,), routes)}
+
+    async def dispatch(self, query: types.CallbackQuery) -> Any:
+        return await self.router.dispatch(query, routes=ctx_data.get().pop(_ROUTES_DATA_KEY))
+
+
+@attr.s
+class CallbackQueryRouter:
+    """
+    Dispatches callback queries to handlers bound via ``action=...``.
+
+    Is registered in the dispatcher via ``CallbackRouterEntry`` objects,
+    one per segment of consecutively registered routes.
+    Raises ``SkipHandler`` if no suitable route is found,
+    so that the handlers registered after it still get a chance.
+
+    If callback data matches the patterns of several (non-compact) action classes,
+    their routes are tried class by class in order of the first registration of each class.
+    A class is only parsed if none of the routes of the previous classes handle the query.
+
+    The data is parsed by each action class at most once per update. It is passed to the handler
+    as the ``action`` argument (if the handler accepts one)
+    and is available via ``get_current_action``.
+    """
+
+    _dispatcher: Dispatcher = attr.ib(kw_only=True)
+    _route_tables: dict[Type[CallbackAction], ActionRouteTable] = attr.ib(init=False, factory=dict)
+    # {separator: {leading value: [route tables]}} for non-compact action classes
+    _leading_route_tables: dict[str, dict[str, list[ActionRouteTable]]] = attr.ib(init=False, factory=dict)
+    # Non-compact action classes that can't be indexed by their leading value
+    _unindexed_route_tables: list[ActionRouteTable] = attr.ib(init=False, factory=list)
+    _compact_route_tables: dict[str, ActionRouteTable] = attr.ib(init=False, factory=dict)
+    _seq_counter: Iterator[int] = attr.ib(init=False, factory=itertools.count)
+    _segment_counter: Iterator[int] = attr.ib(init=False, factory=itertools.count)
+
+    def make_entry(self) -> CallbackRouterEntry:
+        """Start a new segment of routes"""
+        return CallbackRouterEntry(router=self, segment=next(self._segment_counter))
+
+    def add_route(
+            self, callback: Callable,
+            action: Union[Type[CallbackAction], ActionParameterization],
+            segment: int, filters: Iterable[Any] = (),
+    ) -> None:
+        values: dict[str, Any]
+        if isinstance(action, ActionParameterization):
+            action_cls, values = action.action_cls, action.values
+        else:
+            action_cls, values = action, {}
+
+        if action_cls not in self._route_tables:
+            tag = action_cls.COMPACT_TAG
+            if tag is not None:
+                if tag in self._compact_route_tables:
+                    other_cls = self._compact_route_tables[tag].action_cls
+                    raise ValueError(
+                        f'Compact tag {tag!r} of {action_cls.__name__} is already used by {other_cls.__name__}'
+                    )
+                route_table = ActionRouteTable(action_cls=action_cls, seq=len(self._route_tables))
+                self._compact_route_tables[tag] = route_table
+            else:
+                route_table = ActionRouteTable(action_cls=action_cls, seq=len(self._route_tables))
+                self._index_route_table(route_table)
+            self._route_tables[action_cls] = route_table
+
+        route = CallbackRoute(
+            seq=next(self._seq_counter),
+            segment=segment,
+            callback=callback,
+            spec=get_handler_spec(callback),
+            filters=get_filters_spec(self._dispatcher, filters),
+        )
+        self._route_tables[action_cls].add_route(route, values=values)
+
+    def _index_route_table(self, route_table: ActionRouteTable) -> None:
+        literals = route_table.get_leading_literals()
+        if literals is None:
+            self._unindexed_route_tables.append(route_table)
+            return
+
+        sep_index = self._leading_route_tables.setdefault(route_table.action_cls.SEP, {})
+        for literal in literals:
+            sep_index.setdefault(literal, []).append(route_table)
+
+    def _get_candidate_route_tables(self, data: str) -> list[ActionRouteTable]:
+        """Return the route tables of the non-compact action classes the data may belong to"""
+        candidates: list[ActionRouteTable] = []
+        for sep, sep_index in self._leading_route_tables.items():
+            candidates += sep_index.get(data.split(sep, 1)[0], ())
+
+        if not candidates:
+            return self._unindexed_route_tables
+        candidates += self._unindexed_route_tables
+        candidates.sort(key=lambda route_table: route_table.seq)
+        return candidates
+
+    def parse(self, data: str) -> ParsedCallbackData:
+        """Find the route tables of the action classes the callback data may belong to"""
+        tag, _ = codec.split_tag(data)
+        route_tables: Sequence[ActionRouteTable]
+        if tag in self._compact_route_tables:
+            route_tables = (self._compact_route_tables[tag],)
+        else:
+            route_tables = self._get_candidate_route_tables(data)
+        return ParsedCallbackData(data=data, route_tables=route_tables)
+
+    def find_routes(self, data: str, segment: int) -> list[tuple[CallbackRoute, CallbackAction]]:
+        """
+        Return all routes of the segment matching the callback data
+        along with the actions parsed from the data.
+        """
+        return list(self.parse(data).iter_routes(segment=segment))
+
+    async def match(self, query: types.CallbackQuery, segment: int) -> Iterator[tuple[CallbackRoute, CallbackAction]]:
+        """
+        Return an iterator over the routes of the segment matching the query.
+        The parsed data is kept in the handler data of the update and is shared by all segments.
+        """
+        data = ctx_data.get()
+        parsed = data.get(_PARSED_DATA_KEY)
+        if parsed is None:
+            with profile_phase('routing'):
+                parsed = data[_PARSED_DATA_KEY] = self.parse(query.data or '')
+        return parsed.iter_routes(segment=segment)
+
+    async def dispatch(
+            self, query: types.CallbackQuery, routes: Iterable[tuple[CallbackRoute, CallbackAction]],
+    ) -> Any:
+        args = (query,)
+        data = ctx_data.get()
+        for route, action in routes:
+            action_token = _current_action.set(action)
+            try:
+                try:
+                    with profile_phase('filters'):
+                        data.update(await check_filters(route.filters, args))
+                except FilterNotPassed:
+                    continue
+
+                data[ACTION_ARG_NAME] = action
+                ctx_token = current_handler.set(route.callback)
+                try:
+                    return await route.callback(*args, **select_handler_kwargs(route.spec, data))
+                except SkipHandler:
+                    continue
+                finally:
+                    current_handler.reset(ctx_token)
+            finally:
+                _current_action.reset(action_token)
+
+        # The handlers registered after the router must not see the action
+        data.pop(ACTION_ARG_NAME, None)
+        raise SkipHandler
@@ -0,0 +1,219 @@
+"""
+Rate limiting of outbound messages.
+
+Telegram allows about 30 messages per second in total
+and about one message per second in a single chat.
+``SendScheduler`` keeps the bot within these limits
+and retries the requests that hit flood control.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Awaitable, Callable, Optional, TypeVar, Union
+
+import attr
+from aiogram.utils.exceptions import RetryAfter
+
+
+class SendPriority(IntEnum):
+    interactive = 0  # Replies to users
+    bulk = 1  # Notifications, broadcasts, etc.
+
+
+@attr.s
+class TokenBucket:
+    rate: float = attr.ib(kw_only=True)  # tokens per second
+    capacity: float = attr.ib(kw_only=True)
+    _tokens: float = attr.ib(init=False)
+    _updated_at: float = attr.ib(init=False, factory=time.monotonic)
+
+    def __attrs_post_init__(self) -> None:
+        self._tokens = self.capacity
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """Take a token and return the delay (in seconds) after which it may be used"""
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    def try_take(self) -> bool:
+        """Take a token if one is available right away"""
+        self._refill(time.monotonic())
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def pause(self, seconds: float) -> None:
+        """Make the next token available no sooner than after the given time"""
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self._tokens >= self.capacity
+
+
+@attr.s
+class LaneStats:
+    waiting: int = attr.ib(kw_only=True, default=0)
+    granted: int = attr.ib(kw_only=True, default=0)
+    total_wait_time: float = attr.ib(kw_only=True, default=0.0)
+    max_wait_time: float = attr.ib(kw_only=True, default=0.0)
+
+    @property
+    def avg_wait_time(self) -> float:
+        return self.total_wait_time / self.granted if self.granted else 0.0
+
+
+@attr.s
+class SendSchedulerStats:
+    lanes: dict[SendPriority, LaneStats] = attr.ib(
+        kw_only=True, factory=lambda: {priority: LaneStats() for priority in SendPriority},
+    )
+    retries: int = attr.ib(kw_only=True, default=0)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(lane.waiting for lane in self.lanes.values())
+
+
+_RESULT_TV = TypeVar('_RESULT_TV')
+
+
+@attr.s
+class SendScheduler:
+    """
+    Schedules outbound requests using a global token bucket and per-chat token buckets.
+
+    Requests first wait for their chat's bucket,
+    then queue up for the global one. Interactive requests
+    are always let through before bulk ones.
+    A flood control error pauses both the chat's and the global bucket.
+    """
+
+    global_rate: float = attr.ib(kw_only=True, default=30.0)
+    global_burst: float = attr.ib(kw_only=True, default=30.0)
+    chat_rate: float = attr.ib(kw_only=True, default=1.0)
+    chat_burst: float = attr.ib(kw_only=True, default=3.0)
+    max_retries: int = attr.ib(kw_only=True, default=3)
+    # Idle chat buckets are dropped when there are more than this
+    max_chat_buckets: int = attr.ib(kw_only=True, default=10_000)
+    stats: SendSchedulerStats = attr.ib(init=False, factory=SendSchedulerStats)
+
+    _global_bucket: TokenBucket = attr.ib(init=False)
+    _chat_buckets: OrderedDict[Union[int, str], TokenBucket] = attr.ib(init=False, factory=OrderedDict)
+    _queues: dict[SendPriority, deque[asyncio.Future]] = attr.ib(
+        init=False, factory=lambda: {priority: deque() for priority in SendPriority},
+    )
+    _wakeup: Optional[asyncio.Event] = attr.ib(init=False, default=None)
+    _grant_task: Optional[asyncio.Task] = attr.ib(init=False, default=None)
+
+    def __attrs_post_init__(self) -> None:
+        self._global_bucket = TokenBucket(rate=self.global_rate, capacity=self.global_burst)
+
+    def _get_chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.chat_rate, capacity=self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chat_buckets:
+                self._drop_idle_chat_buckets()
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _drop_idle_chat_buckets(self) -> None:
+        # Least recently used buckets come first
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if len(self._chat_buckets) <= self.max_chat_buckets:
+                break
+            if bucket.is_full():
+                del self._chat_buckets[chat_id]
+
+    async def _grant_loop(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            queue = next((queue for queue in self._queues.values() if queue), None)
+            if queue is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._global_bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # A more important request might have arrived in the meantime
+            queue = next(queue for queue in self._queues.values() if queue)
+            future = queue.popleft()
+            if not future.done():
+                future.set_result(None)
+
+    async def acquire(self, chat_id: Union[int, str], priority: SendPriority = SendPriority.interactive) -> None:
+        """Wait until a message can be sent to the chat"""
+        started_at = time.monotonic()
+        lane_stats = self.stats.lanes[priority]
+        lane_stats.waiting += 1
+        try:
+            delay = self._get_chat_bucket(chat_id).reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if self._grant_task is None:
+                self._wakeup = asyncio.Event()
+                self._grant_task = asyncio.create_task(self._grant_loop())
+            assert self._wakeup is not None
+
+            future = asyncio.get_running_loop().create_future()
+            self._queues[priority].append(future)
+            self._wakeup.set()
+            await future
+        finally:
+            lane_stats.waiting -= 1
+
+        wait_time = time.monotonic() - started_at
+        lane_stats.granted += 1
+        lane_stats.total_wait_time += wait_time
+        lane_stats.max_wait_time = max(lane_stats.max_wait_time, wait_time)
+
+    async def run(
+            self, chat_id: Union[int, str], func: Callable[[], Awaitable[_RESULT_TV]],
+            priority: SendPriority = SendPriority.interactive,
+    ) -> _RESULT_TV:
+        """Call ``func`` within the rate limits, retrying it if flood control is triggered"""
+        attempt = 0
+        while True:
+            await self.acquire(chat_id=chat_id, priority=priority)
+            try:
+                return await func()
+            except RetryAfter as err:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.stats.retries += 1
+                # Flood control doesn't tell whether the chat's limit or the global one was hit
+                self._get_chat_bucket(chat_id).pause(err.timeout)
+                self._global_bucket.pause(err.timeout)
+
+    async def close(self) -> None:
+        if self._grant_task is not None:
+            self._grant_task.cancel()
+            try:
+                await self._grant_task
+            except asyncio.CancelledError:
+                pass
+            self._grant_task = None
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft().cancel()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import attr
 
 
@@ -11,3 +13,42 @@ class BaseGlobalSettings:
 
     # Telegram API token
     tg_bot_token: str = attr.ib(kw_only=True)
+    # Base URL of the Bot API server, e.g. of a local ``FakeBotAPIServer``. Telegram's is used if not set
+    tg_api_server: Optional[str] = attr.ib(kw_only=True, default=None)
+
+    # Connection pool of Bot API requests (see ``HttpSessionPool``)
+    http_connections_limit: int = attr.ib(kw_only=True, default=100)
+    http_connections_limit_per_host: int = attr.ib(kw_only=True, default=0)
+    http_keepalive_timeout: float = attr.ib(kw_only=True, default=15.0)
+    # DNS caching is disabled if not set
+    http_dns_cache_ttl: Optional[int] = attr.ib(kw_only=True, default=10)
+    # Timeouts of Bot API requests and of establishing connections, in seconds.
+    # Long polling requests are not limited by the request timeout
+    http_request_timeout: Optional[float] = attr.ib(kw_only=True, default=None)
+    http_connect_timeout: Optional[float] = attr.ib(kw_only=True, default=None)
+
+    # Public URL of the webhook. Long polling is used if it is not set
+    webhook_url: Optional[str] = attr.ib(kw_only=True, default=None)
+    # Local address the webhook server listens on
+    webhook_host: str = attr.ib(kw_only=True, default='0.0.0.0')
+    webhook_port: int = attr.ib(kw_only=True, default=8080)
+    webhook_path: str = attr.ib(kw_only=True, default='/webhook')
+    # Is sent by Telegram in every webhook request if set
+    webhook_secret_token: Optional[str] = attr.ib(kw_only=True, default=None)
+    # Max number of updates processed at a time, further requests wait for them
+    webhook_max_pending: int = attr.ib(kw_only=True, default=1000)
+
+    # Process updates of different chats concurrently, but at most this many at a time.
+    # Updates of each chat are still processed in order
+    chat_ordered_concurrency: Optional[int] = attr.ib(kw_only=True, default=None)
+
+    # Serve handler metrics in the Prometheus text format on this port if set.
+    # Shards of ``run_sharded`` use consecutive ports starting from this one
+    metrics_host: str = attr.ib(kw_only=True, default='0.0.0.0')
+    metrics_port: Optional[int] = attr.ib(kw_only=True, default=None)
+
+    # Log updates that take longer than this many seconds
+    slow_update_threshold: Optional[float] = attr.ib(kw_only=True, default=None)
+    # Profile every N-th update and write the results to profile_dir
+    profile_sample_every: Optional[int] = attr.ib(kw_only=True, default=None)
+    profile_dir: Optional[str] = attr.ib(kw_only=True, default=None)
@@ -0,0 +1,234 @@
+"""
+Processing updates in multiple worker processes.
+
+A single ingester (the poller or the webhook server) receives updates
+and passes them to worker processes (shards). Updates are partitioned
+by chat or user ID, so updates of one user are always processed
+by the same shard in the order they were received.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import time
+from typing import Any, Optional, Protocol, TYPE_CHECKING
+
+import attr
+from aiogram import Bot, Dispatcher, types
+
+from aiokilogram.ordering import OrderedConcurrencyLimiter, get_update_partition_key
+
+if TYPE_CHECKING:
+    # Is imported only if sharding is used
+    import multiprocessing.process
+    from aiokilogram.bot import KiloBot
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Is sent to a shard to make it stop
+_STOP = None
+
+
+class _Queue(Protocol):
+    def put(self, obj: Any) -> None: ...
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any: ...
+
+
+@attr.s
+class ShardHealth:
+    shard_id: int = attr.ib(kw_only=True)
+    pid: Optional[int] = attr.ib(kw_only=True, default=None)
+    alive: bool = attr.ib(kw_only=True, default=True)
+    processed: int = attr.ib(kw_only=True, default=0)
+    failed: int = attr.ib(kw_only=True, default=0)
+    last_update_at: Optional[float] = attr.ib(kw_only=True, default=None)  # unix time
+    reported_at: Optional[float] = attr.ib(kw_only=True, default=None)  # unix time
+
+
+async def serve_shard(
+        dispatcher: Dispatcher, shard_id: int,
+        update_queue: _Queue, health_queue: _Queue,
+        health_interval: float = 5.0, max_pending: int = 100,
+) -> None:
+    """
+    Process updates from the queue until the stop signal is received.
+    Health reports are sent every ``health_interval`` seconds.
+
+    Updates of different chats are processed concurrently
+    (limited by the dispatcher's ``update_limiter`` if it has one),
+    while the updates of each chat are processed one after another.
+    At most ``max_pending`` updates are taken from the queue
+    before the previous ones are processed.
+    """
+
+    Dispatcher.set_current(dispatcher)
+    Bot.set_current(dispatcher.bot)
+    loop = asyncio.get_running_loop()
+    health = ShardHealth(shard_id=shard_id, pid=os.getpid())
+    last_reported_at = 0.0
+    pending_slots = asyncio.Semaphore(max_pending)
+    pending_tasks: set[asyncio.Task] = set()
+    limiter: Optional[OrderedConcurrencyLimiter] = None
+    if getattr(dispatcher, 'update_limiter', None) is None:
+        # Updates of each chat must still be processed in order
+        limiter = OrderedConcurrencyLimiter(max_concurrency=max_pending)
+
+    async def process_update(update: types.Update) -> None:
+        try:
+            if limiter is None:
+                await dispatcher.process_update(update)
+            else:
+                async with limiter.slot(get_update_partition_key(update)):
+                    await dispatcher.process_update(update)
+            health.processed += 1
+        except Exception:
+            LOGGER.exception(f'Failed to process update in shard {shard_id}')
+            health.failed += 1
+        finally:
+            health.last_update_at = time.time()
+            pending_slots.release()
+
+    def get_update_data() -> Any:
+        try:
+            return update_queue.get(timeout=health_interval)
+        except queue.Empty:
+            return queue.Empty
+
+    while True:
+        await pending_slots.acquire()
+        update_data = await loop.run_in_executor(None, get_update_data)
+        if update_data is _STOP:
+            pending_slots.release()
+            break
+
+        if update_data is queue.Empty:
+            pending_slots.release()
+        else:
+            # Tasks are started in the order of the queue, so they enter the chat's slot in this order
+            task = asyncio.create_task(process_update(types.Update(**update_data)))
+            pending_tasks.add(task)
+            task.add_done_callback(pending_tasks.discard)
+
+        if time.monotonic() - last_reported_at >= health_interval:
+            health.reported_at = time.time()
+            health_queue.put(attr.evolve(health))
+            last_reported_at = time.monotonic()
+
+    if pending_tasks:
+        await asyncio.gather(*pending_tasks)
+
+    health.alive = False
+    health.reported_at = time.time()
+    health_queue.put(health)
+
+
+def _run_shard_process(
+        kilo_bot: KiloBot, shard_id: int,
+        update_queue: _Queue, health_queue: _Queue, health_interval: float, max_pending: int,
+) -> None:
+    asyncio.run(kilo_bot.run_shard(
+        shard_id=shard_id, update_queue=update_queue,
+        health_queue=health_queue, health_interval=health_interval,
+        max_pending=max_pending,
+    ))
+
+
+@attr.s
+class ShardPool:
+    """Starts and stops the shard processes and distributes updates among them"""
+
+    _kilo_bot: KiloBot = attr.ib(kw_only=True)
+    shard_count: int = attr.ib(kw_only=True, validator=attr.validators.ge(1))
+    health_interval: float = attr.ib(kw_only=True, default=5.0)
+    # Updates each shard takes from its queue ahead of processing
+    max_pending: int = attr.ib(kw_only=True, default=100, validator=attr.validators.ge(1))
+    _processes: list[multiprocessing.process.BaseProcess] = attr.ib(init=False, factory=list)
+    _update_queues: list[_Queue] = attr.ib(init=False, factory=list)
+    _health_queue: Optional[_Queue] = attr.ib(init=False, default=None)
+    _health: dict[int, ShardHealth] = attr.ib(init=False, factory=dict)
+
+    def start(self) -> None:
+        # Forking a process with a running event loop is not safe
+        import multiprocessing
+
+        mp_context = multiprocessing.get_context('spawn')
+        health_queue = mp_context.Queue()
+        self._health_queue = health_queue
+        for shard_id in range(self.shard_count):
+            update_queue = mp_context.Queue()
+            process = mp_context.Process(
+                target=_run_shard_process, name=f'kilobot-shard-{shard_id}',
+                args=(
+                    self._kilo_bot, shard_id, update_queue, health_queue,
+                    self.health_interval, self.max_pending,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._update_queues.append(update_queue)
+            self._processes.append(process)
+            self._health[shard_id] = ShardHealth(shard_id=shard_id, pid=process.pid)
+
+    def get_shard_id(self, update: types.Update) -> int:
+        key = get_update_partition_key(update)
+        if key is None:
+            return update.update_id % self.shard_count
+        return abs(key) % self.shard_count
+
+    def dispatch(self, update: types.Update) -> None:
+        self._update_queues[self.get_shard_id(update)].put(update.to_python())
+
+    def get_health(self) -> dict[int, ShardHealth]:
+        """Return the latest health reports of all shards"""
+        if self._health_queue is not None:
+            while True:
+                try:
+                    report = self._health_queue.get(block=False)
+                except queue.Empty:
+                    break
+                self._health[report.shard_id] = report
+
+        for shard_id, process in enumerate(self._processes):
+            if not process.is_alive():
+                self._health[shard_id].alive = False
+
+        return self._health
+
+    async def monitor(self) -> None:
+        """Log shards that have died or stopped reporting"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            now = time.time()
+            for health in self.get_health().values():
+                if not health.alive:
+                    LOGGER.error(f'Shard {health.shard_id} (pid {health.pid}) is not running')
+                elif health.reported_at is not None and now - health.reported_at > self.health_interval * 3:
+                    LOGGER.warning(f'Shard {health.shard_id} has not reported for {now - health.reported_at:.0f}s')
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Let the shards process the queued updates and stop"""
+        for update_queue in self._update_queues:
+            update_queue.put(_STOP)
+
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                LOGGER.warning(f'Terminating {process.name} after timeout')
+                process.terminate()
+
+
+class ShardingDispatcher(Dispatcher):
+    """Passes all updates on to the shards instead of processing them"""
+
+    def __init__(self, *args, shard_pool: ShardPool, **kwargs):  # type: ignore
+        super().__init__(*args, **kwargs)
+        self.shard_pool = shard_pool
+
+    async def process_update(self, update: types.Update) -> None:
+        self.shard_pool.dispatch(update)
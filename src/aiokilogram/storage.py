@@ -0,0 +1,292 @@
+"""
+In-process cache in front of an FSM storage backend.
+
+States and data of recently active users are kept in memory.
+Changes are written to the backend in the background,
+so several successive changes of the same user's state result in a single write.
+
+Updates of a chat must not be processed by more than one process at a time
+(which holds for ``chat_ordered_concurrency`` and ``run_sharded``),
+otherwise the cached values may be stale.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+import attr
+from aiogram.dispatcher.storage import BaseStorage
+
+
+LOGGER = logging.getLogger(__name__)
+
+_Address = tuple[str, str]
+
+
+@attr.s
+class CachingStorageStats:
+    hits: int = attr.ib(kw_only=True, default=0)
+    misses: int = attr.ib(kw_only=True, default=0)
+    evictions: int = attr.ib(kw_only=True, default=0)
+    expirations: int = attr.ib(kw_only=True, default=0)
+    # Backend writes and changes that were merged into an already pending write
+    flushes: int = attr.ib(kw_only=True, default=0)
+    coalesced_writes: int = attr.ib(kw_only=True, default=0)
+    flush_errors: int = attr.ib(kw_only=True, default=0)
+    # Time between the first unwritten change and its write, in seconds
+    last_flush_lag: float = attr.ib(kw_only=True, default=0.0)
+    max_flush_lag: float = attr.ib(kw_only=True, default=0.0)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@attr.s(slots=True)
+class _CacheEntry:
+    state: Optional[str] = attr.ib(kw_only=True)
+    data: dict = attr.ib(kw_only=True)
+    loaded_at: float = attr.ib(kw_only=True)
+    state_dirty: bool = attr.ib(kw_only=True, default=False)
+    data_dirty: bool = attr.ib(kw_only=True, default=False)
+    dirty_since: Optional[float] = attr.ib(kw_only=True, default=None)
+
+    @property
+    def is_dirty(self) -> bool:
+        return self.dirty_since is not None
+
+
+@attr.s
+class CachingStorage(BaseStorage):
+    """
+    Caches states and data of up to ``max_size`` users for ``ttl`` seconds
+    and writes changes to ``backend`` ``flush_delay`` seconds after the first one.
+
+    Buckets are not cached. Pending changes are written on ``close()``.
+    """
+
+    backend: BaseStorage = attr.ib(kw_only=True)
+    max_size: int = attr.ib(kw_only=True, default=10_000)
+    ttl: float = attr.ib(kw_only=True, default=300.0)  # seconds
+    flush_delay: float = attr.ib(kw_only=True, default=0.5)  # seconds
+    stats: CachingStorageStats = attr.ib(init=False, factory=CachingStorageStats)
+    _entries: OrderedDict[_Address, _CacheEntry] = attr.ib(init=False, factory=OrderedDict)
+    _dirty_addresses: dict[_Address, None] = attr.ib(init=False, factory=dict)
+    _flush_task: Optional[asyncio.Task] = attr.ib(init=False, default=None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._dirty_addresses)
+
+    def _resolve_address(
+            self, chat: Union[str, int, None], user: Union[str, int, None],
+    ) -> _Address:
+        chat, user = self.check_address(chat=chat, user=user)
+        return str(chat), str(user)
+
+    async def _get_entry(self, address: _Address) -> _CacheEntry:
+        entry = self._entries.get(address)
+        if entry is not None:
+            if entry.is_dirty or time.monotonic() - entry.loaded_at < self.ttl:
+                self._entries.move_to_end(address)
+                self.stats.hits += 1
+                return entry
+
+            del self._entries[address]
+            self.stats.expirations += 1
+
+        self.stats.misses += 1
+        chat, user = address
+        state = await self.backend.get_state(chat=chat, user=user)
+        data = await self.backend.get_data(chat=chat, user=user)
+        entry = self._entries.get(address)
+        if entry is not None:  # Loaded concurrently
+            return entry
+
+        entry = _CacheEntry(state=state, data=data, loaded_at=time.monotonic())
+        self._entries[address] = entry
+        await self._evict(keep=address)
+        return entry
+
+    async def _evict(self, keep: _Address) -> None:
+        """
+        Drop the least recently used entries over ``max_size`` except the one at ``keep``.
+        Entries with changes that could not be written are kept,
+        so the cache may grow over ``max_size`` while the backend fails.
+        """
+        for address in list(self._entries):
+            if len(self._entries) <= self.max_size:
+                break
+            entry = self._entries.get(address)
+            if address == keep or entry is None:
+                continue
+            if entry.is_dirty:
+                await self._flush_entry(address)
+                if entry.is_dirty:  # Failed or changed again while being written
+                    continue
+
+            if self._entries.get(address) is entry:
+                del self._entries[address]
+                self.stats.evictions += 1
+
+    def _mark_dirty(self, address: _Address, entry: _CacheEntry) -> None:
+        if address not in self._entries:  # Evicted by a concurrent load while being changed
+            self._entries[address] = entry
+        if entry.dirty_since is None:
+            entry.dirty_since = time.monotonic()
+            self._dirty_addresses[address] = None
+        else:
+            self.stats.coalesced_writes += 1
+
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        await self.flush()
+        if self._dirty_addresses:  # Retry the failed writes
+            self._schedule_flush()
+
+    async def _flush_entry(self, address: _Address) -> None:
+        entry = self._entries.get(address)
+        self._dirty_addresses.pop(address, None)
+        if entry is None or entry.dirty_since is None:
+            return
+
+        state_dirty, data_dirty, dirty_since = entry.state_dirty, entry.data_dirty, entry.dirty_since
+        entry.state_dirty = entry.data_dirty = False
+        entry.dirty_since = None
+        data = copy.deepcopy(entry.data) if data_dirty else None
+        chat, user = address
+        try:
+            if state_dirty:
+                await self.backend.set_state(chat=chat, user=user, state=entry.state)
+            if data_dirty:
+                await self.backend.set_data(chat=chat, user=user, data=data)
+        except BaseException as err:
+            # Keep the changes to write them later
+            entry.state_dirty |= state_dirty
+            entry.data_dirty |= data_dirty
+            if entry.dirty_since is None:
+                entry.dirty_since = dirty_since
+                self._dirty_addresses[address] = None
+            if not isinstance(err, Exception):
+                raise
+            LOGGER.exception('Failed to write the state of %s to the backend', address)
+            self.stats.flush_errors += 1
+            return
+
+        self.stats.flushes += 1
+        self.stats.last_flush_lag = time.monotonic() - dirty_since
+        self.stats.max_flush_lag = max(self.stats.max_flush_lag, self.stats.last_flush_lag)
+
+    async def flush(self) -> None:
+        """Write all pending changes to the backend"""
+        for address in list(self._dirty_addresses):
+            await self._flush_entry(address)
+
+    async def invalidate(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+    ) -> None:
+        """Write pending changes of the user and drop them from the cache"""
+        address = self._resolve_address(chat=chat, user=user)
+        await self._flush_entry(address)
+        entry = self._entries.get(address)
+        if entry is not None and not entry.is_dirty:
+            del self._entries[address]
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        self._entries.clear()
+        await self.backend.close()
+
+    async def wait_closed(self) -> None:
+        await self.backend.wait_closed()
+
+    async def get_state(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            default: Optional[str] = None,
+    ) -> Optional[str]:
+        entry = await self._get_entry(self._resolve_address(chat=chat, user=user))
+        if entry.state is None:
+            return self.resolve_state(default)
+        return entry.state
+
+    async def get_data(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            default: Optional[dict] = None,
+    ) -> dict:
+        entry = await self._get_entry(self._resolve_address(chat=chat, user=user))
+        if not entry.data and default is not None:
+            return copy.deepcopy(default)
+        return copy.deepcopy(entry.data)
+
+    async def set_state(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            state: Optional[Any] = None,
+    ) -> None:
+        address = self._resolve_address(chat=chat, user=user)
+        entry = await self._get_entry(address)
+        state = self.resolve_state(state)
+        if entry.state == state:
+            return
+        entry.state = state
+        entry.state_dirty = True
+        self._mark_dirty(address, entry)
+
+    async def set_data(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            data: Optional[dict] = None,
+    ) -> None:
+        address = self._resolve_address(chat=chat, user=user)
+        entry = await self._get_entry(address)
+        entry.data = copy.deepcopy(data) if data is not None else {}
+        entry.data_dirty = True
+        self._mark_dirty(address, entry)
+
+    async def update_data(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            data: Optional[dict] = None, **kwargs: Any,
+    ) -> None:
+        address = self._resolve_address(chat=chat, user=user)
+        entry = await self._get_entry(address)
+        entry.data.update(copy.deepcopy(data or {}), **copy.deepcopy(kwargs))
+        entry.data_dirty = True
+        self._mark_dirty(address, entry)
+
+    def has_bucket(self) -> bool:
+        return self.backend.has_bucket()
+
+    async def get_bucket(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            default: Optional[dict] = None,
+    ) -> dict:
+        return await self.backend.get_bucket(chat=chat, user=user, default=default)
+
+    async def set_bucket(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            bucket: Optional[dict] = None,
+    ) -> None:
+        await self.backend.set_bucket(chat=chat, user=user, bucket=bucket)
+
+    async def update_bucket(
+            self, *, chat: Union[str, int, None] = None, user: Union[str, int, None] = None,
+            bucket: Optional[dict] = None, **kwargs: Any,
+    ) -> None:
+        await self.backend.update_bucket(chat=chat, user=user, bucket=bucket, **kwargs)
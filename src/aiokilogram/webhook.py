@@ -0,0 +1,92 @@
+"""
+Receiving updates via a webhook instead of long polling
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+from typing import Optional
+
+import attr
+from aiogram import Bot, Dispatcher, types
+from aiohttp import web
+
+
+LOGGER = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+@attr.s
+class WebhookServer:
+    """
+    Accepts updates POSTed by Telegram.
+
+    Every update is acknowledged immediately and processed in the background.
+    If ``max_pending`` updates are being processed already,
+    requests are acknowledged only when one of them is done,
+    so that Telegram slows down instead of the updates piling up.
+    """
+
+    _dispatcher: Dispatcher = attr.ib(kw_only=True)
+    path: str = attr.ib(kw_only=True, default='/webhook')
+    secret_token: Optional[str] = attr.ib(kw_only=True, default=None)
+    max_pending: int = attr.ib(kw_only=True, default=1000, validator=attr.validators.ge(1))
+    _tasks: set[asyncio.Task] = attr.ib(init=False, factory=set)
+    _pending_slots: Optional[asyncio.Semaphore] = attr.ib(init=False, default=None)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_request)
+        return app
+
+    def _is_authorized(self, request: web.Request) -> bool:
+        if self.secret_token is None:
+            return True
+        return hmac.compare_digest(request.headers.get(SECRET_TOKEN_HEADER, ''), self.secret_token)
+
+    async def handle_request(self, request: web.Request) -> web.Response:
+        if not self._is_authorized(request):
+            return web.Response(status=403)
+
+        try:
+            update = types.Update(**await request.json())
+        except (ValueError, TypeError):
+            return web.Response(status=400)
+
+        if self._pending_slots is None:
+            self._pending_slots = asyncio.Semaphore(self.max_pending)
+        pending_slots = self._pending_slots
+        await pending_slots.acquire()
+        task = asyncio.create_task(self.process_update(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: pending_slots.release())
+        return web.Response(status=200)
+
+    async def process_update(self, update: types.Update) -> None:
+        Dispatcher.set_current(self._dispatcher)
+        Bot.set_current(self._dispatcher.bot)
+        try:
+            await self._dispatcher.process_update(update)
+        except Exception:
+            LOGGER.exception(f'Failed to process update {update.update_id}')
+
+    async def wait_processed(self) -> None:
+        """Wait for all updates that are being processed"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serve until cancelled, then let the updates in progress finish"""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        try:
+            site = web.TCPSite(runner, host=host, port=port)
+            await site.start()
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+            await self.wait_processed()
@@ -0,0 +1,83 @@
+"""
+Update builders and fakes shared by the tests
+"""
+
+import socket
+from enum import Enum
+from typing import Optional
+
+from aiogram import types
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiokilogram.action import CallbackAction, EnumActionField, StringActionField
+
+
+class MyEnum(Enum):
+    first = 'first'
+    second = 'second'
+
+
+class MyAction(CallbackAction):
+    some_str = StringActionField()
+    enum_value = EnumActionField(enum_cls=MyEnum)
+
+
+def make_chat(chat_id: int) -> dict:
+    if chat_id < 0:
+        return {'id': chat_id, 'type': 'group', 'title': 'Group'}
+    return {'id': chat_id, 'type': 'private'}
+
+
+def make_message_update(update_id: int, chat_id: int, text: str, user_id: Optional[int] = None) -> types.Update:
+    return types.Update(**{
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': text,
+            'chat': make_chat(chat_id),
+            'from': {'id': chat_id if user_id is None else user_id, 'is_bot': False, 'first_name': 'User'},
+        },
+    })
+
+
+def make_callback_update(
+        data: str, update_id: int = 1, user_id: int = 100, chat_id: Optional[int] = None,
+) -> types.Update:
+    """The query has a message in chat ``chat_id`` if it is set"""
+    callback_query = {
+        'id': str(update_id), 'chat_instance': '1', 'data': data,
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+    }
+    if chat_id is not None:
+        callback_query['message'] = {
+            'message_id': update_id, 'date': 0, 'text': 'Buttons', 'chat': make_chat(chat_id),
+        }
+    return types.Update(update_id=update_id, callback_query=callback_query)
+
+
+class CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.writes = 0
+        # Keyword arguments of all data writes
+        self.written: list[dict] = []
+
+    async def get_data(self, **kwargs):
+        self.reads += 1
+        return await super().get_data(**kwargs)
+
+    async def set_data(self, **kwargs):
+        self.writes += 1
+        self.written.append(kwargs)
+        return await super().set_data(**kwargs)
+
+    async def update_data(self, **kwargs):
+        self.writes += 1
+        self.written.append(kwargs)
+        return await super().update_data(**kwargs)
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
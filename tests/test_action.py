@@ -1,7 +1,9 @@
 from enum import Enum
 
+import pytest
+
 from aiokilogram.action import (
-    CallbackAction, StringActionField, EnumActionField,
+    CallbackAction, StringActionField, EnumActionField, IntegerActionField,
 )
 
 
@@ -30,3 +32,77 @@ def test_action():
 
     assert MyAction.deserialize('second/qwerty') == my_action
     assert MyAction.deserialize('first/qwerty') != my_action
+
+    assert MyAction.enum_value.get_literals() == {'first', 'second'}
+    assert MyAction.some_str.get_literals() is None
+    assert StringActionField(pattern='section').get_literals() == {'section'}
+    assert IntegerActionField().get_literals() is None
+
+
+def test_action_schema():
+    class BaseAction(CallbackAction):
+        b_field = StringActionField()
+
+    class ChildAction(BaseAction):
+        a_field = IntegerActionField()
+        c_field = StringActionField()
+
+    schema = ChildAction.get_action_schema()
+    assert [name for name, _ in schema.fields] == ['a_field', 'b_field', 'c_field']
+    assert schema.names == {'a_field', 'b_field', 'c_field'}
+    assert BaseAction.get_action_schema().names == {'b_field'}
+    assert ChildAction.get_action_props() == dict(schema.fields)
+
+    action = ChildAction(a_field=12, b_field='x', c_field='y')
+    assert action.serialize() == '12/x/y'
+    assert ChildAction.deserialize('12/x/y') == action
+
+    with pytest.raises(AttributeError):
+        BaseAction(a_field=12)
+
+
+def test_compact_action():
+    class MyEnum(Enum):
+        first = 'first'
+        second = 'second'
+
+    class MyAction(CallbackAction):
+        COMPACT_TAG = 'm'
+
+        some_str = StringActionField()
+        enum_value = EnumActionField(enum_cls=MyEnum)
+        number = IntegerActionField()
+
+    my_action = MyAction(some_str='qwerty', enum_value=MyEnum.second, number=-1000)
+    data = my_action.serialize()
+    assert data == 'm~1L-16qwerty'
+    assert MyAction.deserialize(data) == my_action
+    assert MyAction.get_pattern() == r'^m\~.*$'
+
+    for invalid_data in ('x~1L-16qwerty', 'm~1L-16qwe', 'm~1L-16qwertyz', 'm~5L-16qwerty'):
+        with pytest.raises(ValueError):
+            MyAction.deserialize(invalid_data)
+
+    # Field patterns and types are checked in the compact form too
+    class PatternAction(CallbackAction):
+        COMPACT_TAG = 'p'
+
+        some_str = StringActionField(pattern=r'\d+')
+        enum_value = EnumActionField(enum_cls=MyEnum)
+
+    assert PatternAction.deserialize('p~03123') == PatternAction(some_str='123', enum_value=MyEnum.first)
+    with pytest.raises(ValueError):
+        PatternAction.deserialize('p~03abc')
+    with pytest.raises(AssertionError):
+        PatternAction(some_str='123', enum_value='first').serialize()
+
+    # Field values of compact actions can be routed, but not matched with a regexp
+    parameterization = MyAction.when(enum_value=MyEnum.first)
+    with pytest.raises(ValueError, match='MyAction.when'):
+        parameterization.get_pattern()
+    with pytest.raises(AttributeError):
+        MyAction.when(unknown=1)
+
+    with pytest.raises(ValueError):
+        class InvalidTagAction(CallbackAction):
+            COMPACT_TAG = 'm/'
@@ -0,0 +1,30 @@
+import asyncio
+
+from aiokilogram.action_store import MemoryActionStore, TOKEN_PREFIX
+
+
+def test_memory_action_store():
+    async def run() -> None:
+        store = MemoryActionStore(max_size=2)
+        short_data = 'x' * 64
+        assert await store.shorten(short_data) == short_data
+        assert len(store) == 0
+
+        tokens = [await store.shorten(f'{idx}' * 100) for idx in range(3)]
+        assert all(token.startswith(TOKEN_PREFIX) and len(token.encode()) <= 64 for token in tokens)
+        assert store.make_token('0' * 100) == tokens[0][len(TOKEN_PREFIX):]
+        assert len(store) == 2
+        assert store.stats.evictions == 1
+
+        assert await store.resolve(tokens[2]) == '2' * 100
+        assert await store.resolve(tokens[1]) == '1' * 100
+        assert await store.resolve(tokens[0]) == tokens[0]
+        assert await store.resolve('plain') == 'plain'
+        assert (store.stats.hits, store.stats.misses) == (2, 1)
+
+        expiring_store = MemoryActionStore(ttl=-1)
+        token = await expiring_store.shorten('y' * 100)
+        assert await expiring_store.resolve(token) == token
+        assert expiring_store.stats.expirations == 1
+
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, AsyncIterator
+
+from aiogram.utils.exceptions import BotBlocked, RetryAfter
+
+from aiokilogram.broadcast import BroadcastProgress
+from aiokilogram.handler import CommandHandler
+from aiokilogram.page import simple_page
+from aiokilogram.scheduler import SendScheduler
+from aiokilogram.settings import BaseGlobalSettings
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent: list[tuple[Any, dict]] = []
+        self.flooded: set[Any] = set()
+
+    async def send_message(self, chat_id: Any, **kwargs: Any) -> None:
+        if chat_id % 10 == 0:
+            raise BotBlocked('Forbidden: bot was blocked by the user')
+        if chat_id % 7 == 0 and chat_id not in self.flooded:
+            self.flooded.add(chat_id)
+            raise RetryAfter(0)
+        self.sent.append((chat_id, kwargs))
+
+
+def test_broadcast():
+    async def user_ids() -> AsyncIterator[int]:
+        for user_id in range(1, 101):
+            yield user_id
+
+    async def run() -> None:
+        bot = FakeBot()
+        handler = CommandHandler(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token=''))
+        reports: list[int] = []
+
+        def on_progress(progress: BroadcastProgress) -> None:
+            reports.append(progress.processed)
+
+        progress = await handler.broadcast(
+            page=simple_page(text='News'), user_ids=user_ids(),
+            concurrency=5, on_progress=on_progress, progress_every=50,
+        )
+        assert (progress.sent, progress.blocked, progress.failed) == (90, 10, 0)
+        assert progress.retries == len(bot.flooded) > 0
+        assert reports == [50, 100, 100]
+        assert progress.throughput > 0
+        markups = {id(kwargs['reply_markup']) for _, kwargs in bot.sent}
+        assert len(markups) == 1
+
+    asyncio.run(run())
+
+
+class FloodedBot(FakeBot):
+    async def send_message(self, chat_id: Any, **kwargs: Any) -> None:
+        self.sent.append((chat_id, kwargs))
+        if chat_id == 7:
+            raise RetryAfter(0)
+
+
+def test_broadcast_with_scheduler():
+    async def run() -> None:
+        bot = FloodedBot()
+        scheduler = SendScheduler(max_retries=2, global_rate=1000, global_burst=1000, chat_rate=1000)
+        handler = CommandHandler(
+            bot=bot, global_settings=BaseGlobalSettings(tg_bot_token=''), send_scheduler=scheduler,
+        )
+        progress = await handler.broadcast(page=simple_page(text='News'), user_ids=range(1, 11), max_retries=3)
+        await scheduler.close()
+        assert (progress.sent, progress.failed, progress.retries) == (9, 1, 0)
+        # Flood control errors are only retried by the scheduler
+        assert sum(1 for chat_id, _ in bot.sent if chat_id == 7) == 3
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Optional
+
+from aiogram import Bot, types
+from aiogram.dispatcher.handler import SkipHandler
+
+from aiokilogram.callback_answer import CallbackAnswer
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.handler import CommandHandler
+from aiokilogram.registration import register_callback_query_handler
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import make_callback_update
+
+
+class AnswerRecordingBot(Bot):
+    def __init__(self) -> None:
+        super().__init__(token='12345:TEST')
+        self.answers: list[tuple[str, Optional[str], Optional[bool]]] = []
+
+    async def answer_callback_query(  # type: ignore
+            self, callback_query_id: str, text: Optional[str] = None,
+            show_alert: Optional[bool] = None, **kwargs: Any,
+    ) -> bool:
+        self.answers.append((callback_query_id, text, show_alert))
+        return True
+
+
+class AnsweringHandler(CommandHandler):
+    auto_answer_callback_queries = True
+
+    @register_callback_query_handler(text='slow')
+    async def slow(self, query: types.CallbackQuery) -> CallbackAnswer:
+        await asyncio.sleep(0.05)
+        return CallbackAnswer(text='Too late')
+
+    @register_callback_query_handler(text='toast')
+    async def toast(self, query: types.CallbackQuery) -> CallbackAnswer:
+        return CallbackAnswer(text='Done', show_alert=True)
+
+    @register_callback_query_handler(text='skip')
+    async def pass_on(self, query: types.CallbackQuery) -> None:
+        raise SkipHandler
+
+    @register_callback_query_handler(text='skip')
+    async def take_over(self, query: types.CallbackQuery) -> CallbackAnswer:
+        return CallbackAnswer(text='Handled')
+
+    @register_callback_query_handler(text='late_skip')
+    async def pass_on_late(self, query: types.CallbackQuery) -> None:
+        await asyncio.sleep(0.01)
+        raise SkipHandler
+
+    @register_callback_query_handler(text='late_skip')
+    async def take_over_late(self, query: types.CallbackQuery) -> CallbackAnswer:
+        return CallbackAnswer(text='Handled')
+
+    @register_callback_query_handler(text='manual', auto_answer=False)
+    async def manual(self, query: types.CallbackQuery) -> None:
+        pass
+
+
+class WaitingHandler(AnsweringHandler):
+    callback_answer_timeout = 0.02
+
+
+def process(handler_cls: type[CommandHandler], data: str) -> list[tuple[str, Optional[str], Optional[bool]]]:
+    bot = AnswerRecordingBot()
+    dispatcher = KiloDispatcher(bot=bot)
+    handler_cls(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST')).register(dispatcher)
+
+    async def run() -> None:
+        await dispatcher.process_update(make_callback_update(data))
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    return bot.answers
+
+
+def test_auto_answer(caplog):
+    # Answered right away, the returned text can't be used
+    assert process(AnsweringHandler, 'slow') == [('1', None, None)]
+    assert 'the returned CallbackAnswer' in caplog.text
+    assert process(AnsweringHandler, 'manual') == []
+    # Skipped queries are answered by the next handler only
+    assert process(AnsweringHandler, 'skip') == [('1', 'Handled', False)]
+    # unless the answer has already been sent
+    caplog.clear()
+    assert process(AnsweringHandler, 'late_skip') == [('1', None, None)]
+    assert 'the returned CallbackAnswer' in caplog.text
+
+    # Answered when the handler returns or when the timeout expires
+    assert process(WaitingHandler, 'toast') == [('1', 'Done', True)]
+    assert process(WaitingHandler, 'slow') == [('1', None, None)]
+    assert process(WaitingHandler, 'skip') == [('1', 'Handled', False)]
+    assert process(WaitingHandler, 'late_skip') == [('1', 'Handled', False)]
@@ -0,0 +1,39 @@
+import asyncio
+
+from aiogram.dispatcher import FSMContext
+
+from aiokilogram.data import get_state_data, load_current_action_from_state, save_current_action_to_state
+from tests.helpers import CountingStorage, MyAction, MyEnum
+
+
+def test_state_data_dirty_tracking():
+    storage = CountingStorage()
+    state = FSMContext(storage=storage, chat=1, user=1)
+    action = MyAction(some_str='thing', enum_value=MyEnum.first)
+
+    async def run() -> None:
+        await state.update_data(other_key='value')
+        storage.writes = 0
+
+        await save_current_action_to_state(state, action)
+        assert storage.writes == 1
+        await save_current_action_to_state(state, action)
+        assert storage.writes == 1
+
+        assert await load_current_action_from_state(state, MyAction) == action
+        async with get_state_data(state, read_only=True) as state_data:
+            state_data['ignored'] = True
+        async with get_state_data(state) as state_data:
+            assert 'ignored' not in state_data
+        assert storage.writes == 1
+
+        async with get_state_data(state) as state_data:
+            state_data['key'] = 'value'
+        assert storage.writes == 2
+        assert await load_current_action_from_state(state, MyAction, clear_state=True) == action
+        assert storage.writes == 3
+        async with get_state_data(state, read_only=True) as state_data:
+            assert state_data == {}
+        assert (await state.get_data())['other_key'] == 'value'
+
+    asyncio.run(run())
@@ -0,0 +1,276 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, types
+from aiogram.dispatcher.handler import SkipHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from aiokilogram.action import CallbackAction, StringActionField, EnumActionField
+from aiokilogram.action_store import MemoryActionStore
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.routing import ACTION_ARG_NAME, ActionRouteTable, get_current_action
+from tests.helpers import MyAction, MyEnum, make_callback_update
+
+
+class OtherAction(CallbackAction):
+    number = StringActionField(pattern=r'\d+')
+
+
+class SectionAction(CallbackAction):
+    section = StringActionField(pattern='section')
+    title = StringActionField()
+
+
+class WildAction(CallbackAction):
+    anything = StringActionField()
+
+
+class CompactAction(CallbackAction):
+    COMPACT_TAG = 'c'
+
+    some_str = StringActionField()
+    enum_value = EnumActionField(enum_cls=MyEnum)
+
+
+def test_callback_routing():
+    bot = Bot(token='12345:TEST')
+    dispatcher = KiloDispatcher(bot=bot)
+    calls: list[str] = []
+
+    def make_handler(name: str):
+        async def handler(query: types.CallbackQuery) -> None:
+            calls.append(name)
+
+        return handler
+
+    dispatcher.register_callback_query_handler(
+        make_handler('first_thing'), action=MyAction.when(enum_value=MyEnum.first, some_str='thing'))
+    dispatcher.register_callback_query_handler(
+        make_handler('first'), action=MyAction.when(enum_value=MyEnum.first))
+    dispatcher.register_callback_query_handler(make_handler('any'), action=MyAction)
+    dispatcher.register_callback_query_handler(make_handler('other'), action=OtherAction)
+    dispatcher.register_callback_query_handler(
+        make_handler('compact_second'), action=CompactAction.when(enum_value=MyEnum.second))
+    dispatcher.register_callback_query_handler(make_handler('fallback'))
+
+    async def route(data: str) -> None:
+        await dispatcher.process_update(make_callback_update(data))
+
+    asyncio.run(route('first/thing'))
+    asyncio.run(route('first/stuff'))
+    asyncio.run(route('second/thing'))
+    asyncio.run(route('123'))
+    asyncio.run(route('abc'))
+    asyncio.run(route(CompactAction(some_str='x', enum_value=MyEnum.second).serialize()))
+    asyncio.run(route(CompactAction(some_str='x', enum_value=MyEnum.first).serialize()))
+    assert calls == ['first_thing', 'first', 'any', 'other', 'fallback', 'compact_second', 'fallback']
+
+
+def test_callback_routing_tries_action_classes_in_order():
+    def make_dispatcher(action_classes: list[type[CallbackAction]], calls: list[str]) -> KiloDispatcher:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'))
+        for action_cls in action_classes:
+            async def handler(query: types.CallbackQuery, action: CallbackAction) -> None:
+                calls.append(type(action).__name__)
+
+            dispatcher.register_callback_query_handler(handler, action=action_cls)
+        return dispatcher
+
+    async def route(dispatcher: KiloDispatcher, data: str) -> None:
+        await dispatcher.process_update(make_callback_update(data))
+
+    # The data of several classes is handled by the class registered first
+    calls: list[str] = []
+    dispatcher = make_dispatcher([MyAction, WildAction, SectionAction], calls)
+    for data in ('first/thing', 'section/thing', 'other'):
+        asyncio.run(route(dispatcher, data))
+    assert calls == ['MyAction', 'WildAction', 'WildAction']
+
+    calls = []
+    dispatcher = make_dispatcher([SectionAction, MyAction, WildAction], calls)
+    for data in ('first/thing', 'section/thing', 'other'):
+        asyncio.run(route(dispatcher, data))
+    assert calls == ['MyAction', 'SectionAction', 'WildAction']
+
+
+def test_callback_routing_falls_through_action_classes():
+    dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'))
+    calls: list[str] = []
+
+    async def wild(query: types.CallbackQuery, action: WildAction) -> None:
+        calls.append('wild')
+
+    async def skipping(query: types.CallbackQuery, action: WildAction) -> None:
+        calls.append('skipping')
+        raise SkipHandler
+
+    async def my(query: types.CallbackQuery, action: MyAction) -> None:
+        calls.append(action.some_str)
+
+    dispatcher.register_callback_query_handler(wild, action=WildAction.when(anything='foo'))
+    dispatcher.register_callback_query_handler(skipping, action=WildAction.when(anything='first/skip'))
+    dispatcher.register_callback_query_handler(
+        wild, lambda query: False, action=WildAction.when(anything='first/filtered'))
+    dispatcher.register_callback_query_handler(my, action=MyAction)
+
+    async def route(data: str) -> None:
+        await dispatcher.process_update(make_callback_update(data))
+
+    # Neither a class without a matching route, nor a skipping handler or
+    # a failing filter of one class keep the data from reaching the next class
+    for data in ('foo', 'first/x', 'first/skip', 'first/filtered'):
+        asyncio.run(route(data))
+    assert calls == ['wild', 'x', 'skipping', 'skip', 'filtered']
+
+
+def test_callback_routing_with_action_store():
+    bot = Bot(token='12345:TEST')
+    action_store = MemoryActionStore()
+    dispatcher = KiloDispatcher(bot=bot, action_store=action_store)
+    received: list[str] = []
+
+    async def handler(query: types.CallbackQuery) -> None:
+        received.append(MyAction.deserialize(query.data).some_str)
+
+    dispatcher.register_callback_query_handler(handler, action=MyAction.when(enum_value=MyEnum.first))
+
+    async def run() -> None:
+        long_str = 'z' * 100
+        token = await action_store.shorten(MyAction(some_str=long_str, enum_value=MyEnum.first).serialize())
+        await dispatcher.process_update(make_callback_update(token))
+        assert received == [long_str]
+
+    asyncio.run(run())
+
+
+def test_callback_routing_with_parsed_action():
+    bot = Bot(token='12345:TEST')
+    dispatcher = KiloDispatcher(bot=bot)
+    received: list[str] = []
+
+    async def handler(query: types.CallbackQuery, action: MyAction) -> None:
+        assert MyAction.deserialize(query.data) == action
+        assert get_current_action(MyAction) is action
+        if action.some_str == 'skip':
+            raise SkipHandler
+        received.append(action.some_str)
+
+    async def fallback(query: types.CallbackQuery, **kwargs) -> None:
+        # The action of a skipped handler doesn't leak into the following ones
+        assert ACTION_ARG_NAME not in kwargs
+        with pytest.raises(LookupError):
+            get_current_action(MyAction)
+        received.append('fallback')
+
+    dispatcher.register_callback_query_handler(handler, action=MyAction.when(enum_value=MyEnum.first))
+    dispatcher.register_callback_query_handler(fallback)
+
+    asyncio.run(dispatcher.process_update(make_callback_update('first/thing')))
+    asyncio.run(dispatcher.process_update(make_callback_update('first/skip')))
+    assert received == ['thing', 'fallback']
+
+
+class CountingMiddleware(BaseMiddleware):
+    def __init__(self) -> None:
+        super().__init__()
+        self.processed: list[str] = []
+
+    async def on_process_callback_query(self, query: types.CallbackQuery, data: dict) -> None:
+        self.processed.append(query.data)
+
+
+def test_callback_routing_keeps_registration_order():
+    bot = Bot(token='12345:TEST')
+    dispatcher = KiloDispatcher(bot=bot)
+    middleware = CountingMiddleware()
+    dispatcher.middleware.setup(middleware)
+    calls: list[str] = []
+
+    async def skipping(query: types.CallbackQuery) -> None:
+        calls.append('skipping')
+        raise SkipHandler
+
+    async def plain(query: types.CallbackQuery) -> None:
+        calls.append('plain')
+
+    async def any_action(query: types.CallbackQuery) -> None:
+        calls.append('any')
+
+    dispatcher.register_callback_query_handler(skipping, action=MyAction.when(enum_value=MyEnum.first))
+    dispatcher.register_callback_query_handler(plain, text='first/thing')
+    dispatcher.register_callback_query_handler(any_action, action=MyAction)
+
+    async def route(data: str) -> None:
+        await dispatcher.process_update(make_callback_update(data))
+
+    asyncio.run(route('first/thing'))
+    asyncio.run(route('first/other'))
+    asyncio.run(route('unknown'))
+    assert calls == ['skipping', 'plain', 'skipping', 'any']
+    # The middleware is called for every matching handler (or segment of routes) only
+    assert middleware.processed == ['first/thing', 'first/thing', 'first/other', 'first/other']
+
+
+def test_callback_routing_parses_once_per_update(monkeypatch):
+    bot = Bot(token='12345:TEST')
+    dispatcher = KiloDispatcher(bot=bot)
+    router = dispatcher.callback_query_router
+    parsed: list[str] = []
+    parse = router.parse
+    table_parsed: list[str] = []
+    table_parse = ActionRouteTable.parse
+
+    def counting_parse(data: str):
+        parsed.append(data)
+        return parse(data)
+
+    def counting_table_parse(self: ActionRouteTable, data: str):
+        table_parsed.append(self.action_cls.__name__)
+        return table_parse(self, data)
+
+    monkeypatch.setattr(router, 'parse', counting_parse)
+    monkeypatch.setattr(ActionRouteTable, 'parse', counting_table_parse)
+    calls: list[str] = []
+
+    async def skipping(query: types.CallbackQuery) -> None:
+        calls.append('skipping')
+        raise SkipHandler
+
+    async def plain(query: types.CallbackQuery) -> None:
+        calls.append('plain')
+        raise SkipHandler
+
+    async def last(query: types.CallbackQuery, action: MyAction) -> None:
+        calls.append(action.some_str)
+
+    # Three segments of routes
+    dispatcher.register_callback_query_handler(skipping, action=MyAction)
+    dispatcher.register_callback_query_handler(plain)
+    dispatcher.register_callback_query_handler(skipping, action=OtherAction)
+    dispatcher.register_callback_query_handler(plain)
+    dispatcher.register_callback_query_handler(last, action=MyAction.when(enum_value=MyEnum.first))
+
+    asyncio.run(dispatcher.process_update(make_callback_update('first/thing')))
+    assert calls == ['skipping', 'plain', 'plain', 'thing']
+    assert parsed == ['first/thing']
+    # Each of the action classes parses the data once
+    assert table_parsed == ['MyAction', 'OtherAction']
+
+
+def test_plain_handler_with_action_store():
+    bot = Bot(token='12345:TEST')
+    action_store = MemoryActionStore()
+    dispatcher = KiloDispatcher(bot=bot, action_store=action_store)
+    received: list[str] = []
+
+    async def handler(query: types.CallbackQuery) -> None:
+        received.append(query.data)
+
+    dispatcher.register_callback_query_handler(handler, text_startswith='first/')
+
+    async def run() -> None:
+        data = MyAction(some_str='z' * 100, enum_value=MyEnum.first).serialize()
+        await dispatcher.process_update(make_callback_update(await action_store.shorten(data)))
+        assert received == [data]
+
+    asyncio.run(run())
@@ -0,0 +1,143 @@
+import asyncio
+
+from typing import Any
+
+import pytest
+from aiogram import Bot, types
+from aiogram.dispatcher.handler import SkipHandler
+
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.errors import CircuitBreaker, DefaultErrorHandler, NotificationThrottle, with_circuit_breaker
+from aiokilogram.handler import CommandHandler
+from aiokilogram.registration import register_message_handler
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import make_message_update
+
+
+class RecordingBot(Bot):
+    def __init__(self) -> None:
+        super().__init__(token='12345:TEST')
+        self.sent: list[tuple[Any, dict]] = []
+
+    async def send_message(self, chat_id: Any, **kwargs: Any) -> types.Message:  # type: ignore
+        self.sent.append((chat_id, kwargs))
+        return types.Message(message_id=len(self.sent), chat={'id': chat_id, 'type': 'private'})
+
+
+def test_notification_throttle():
+    throttle = NotificationThrottle(dedup_interval=60, user_interval=0, global_rate=1, global_burst=3)
+    assert throttle.allow(user_id='1', error_key='a')
+    assert not throttle.allow(user_id='1', error_key='a')
+    assert throttle.allow(user_id='1', error_key='b')
+    assert throttle.allow(user_id='2', error_key='a')
+    assert not throttle.allow(user_id='3', error_key='a')  # Global limit
+    assert (throttle.stats.sent, throttle.stats.suppressed) == (3, 2)
+
+    throttle = NotificationThrottle(user_interval=60)
+    assert throttle.allow(user_id='1', error_key='a')
+    assert not throttle.allow(user_id='1', error_key='b')
+
+
+class ThrottledErrorHandler(DefaultErrorHandler):
+    notification_throttle = NotificationThrottle(user_interval=60)
+
+    def make_message(self, err: Exception) -> str:
+        return 'Something went wrong'
+
+
+class FailingHandler(CommandHandler):
+    error_handler = ThrottledErrorHandler()
+    circuit_breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05, fallback='Try again later')
+    fail = True
+
+    @register_message_handler(commands={'start'})
+    async def start(self, event: types.Message) -> None:
+        if self.fail:
+            raise ValueError('Failed')
+        await self.respond_with_text(event=event, text='OK')
+
+
+def test_circuit_breaker():
+    bot = RecordingBot()
+    dispatcher = KiloDispatcher(bot=bot)
+    handler = FailingHandler(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST'))
+    handler.register(dispatcher)
+    circuit_breaker = handler.get_circuit_breaker('start')
+    assert circuit_breaker is not None
+    assert circuit_breaker is not FailingHandler.circuit_breaker
+
+    def process(count: int) -> list[str]:
+        bot.sent.clear()
+        for idx in range(count):
+            asyncio.run(dispatcher.process_update(make_message_update(idx + 1, chat_id=1, text='/start')))
+        return [kwargs['text'] for _, kwargs in bot.sent]
+
+    # The error is reported only once, then the breaker trips
+    # and the user gets the fallback once while it is open
+    assert process(4) == ['Something went wrong', 'Try again later']
+    assert circuit_breaker.is_open
+    assert circuit_breaker.stats.tripped == 1
+    assert circuit_breaker.stats.short_circuited == 2
+    assert circuit_breaker.stats.suppressed_fallbacks == 1
+    assert ThrottledErrorHandler.notification_throttle.stats.suppressed == 1
+
+    # A failed trial call trips the breaker again
+    asyncio.run(asyncio.sleep(0.05))
+    assert process(2) == ['Try again later']
+    assert circuit_breaker.stats.tripped == 2
+
+    handler.fail = False
+    asyncio.run(asyncio.sleep(0.05))
+    assert process(2) == ['OK', 'OK']
+    assert not circuit_breaker.is_open
+
+
+def test_circuit_breaker_fallback_throttle():
+    throttle = NotificationThrottle(user_interval=0, global_rate=1, global_burst=2)
+    circuit_breaker = CircuitBreaker(failure_threshold=1, fallback='Try again later', notification_throttle=throttle)
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_fallback('1')
+    assert not circuit_breaker.allow_fallback('1')
+    assert circuit_breaker.allow_fallback('2')
+    assert not circuit_breaker.allow_fallback('3')  # Global limit of the throttle
+    assert circuit_breaker.stats.suppressed_fallbacks == 2
+
+    # The users get the fallback again after the breaker opens again
+    circuit_breaker = CircuitBreaker(failure_threshold=1, fallback='Try again later')
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_fallback('1')
+    assert not circuit_breaker.allow_fallback('1')
+    circuit_breaker.record_success()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_fallback('1')
+
+
+def test_circuit_breaker_unfinished_trial():
+    circuit_breaker = CircuitBreaker(failure_threshold=1, cooldown=0.01)
+    outcomes = iter([ValueError(), SkipHandler(), asyncio.CancelledError(), None])
+
+    @with_circuit_breaker(circuit_breaker=circuit_breaker, messenger=CommandHandler(
+        bot=RecordingBot(), global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST'),
+    ))
+    async def handler(event: types.Message) -> str:
+        outcome = next(outcomes)
+        if outcome is not None:
+            raise outcome
+        return 'OK'
+
+    async def run() -> None:
+        event = make_message_update(1, chat_id=1, text='/start').message
+        with pytest.raises(ValueError):
+            await handler(event)
+        assert circuit_breaker.is_open
+
+        # Trials that end without a result don't keep the breaker open forever
+        await asyncio.sleep(0.01)
+        with pytest.raises(SkipHandler):
+            await handler(event)
+        with pytest.raises(asyncio.CancelledError):
+            await handler(event)
+        assert await handler(event) == 'OK'
+        assert not circuit_breaker.is_open
+
+    asyncio.run(run())
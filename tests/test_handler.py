@@ -0,0 +1,36 @@
+from aiogram import types
+
+from aiokilogram.handler import CommandHandler
+from aiokilogram.page import MessageBody
+from aiokilogram.pagination import PaginatedKeyboard
+from aiokilogram.registration import register_message_handler
+
+
+class BaseHandler(CommandHandler):
+    @register_message_handler(commands={'b'})
+    async def b_command(self, event: types.Message) -> None:
+        pass
+
+    @register_message_handler(commands={'a'})
+    async def a_command(self, event: types.Message) -> None:
+        pass
+
+
+class ChildHandler(BaseHandler):
+    items = PaginatedKeyboard(
+        keyboard_id='items', body=MessageBody(text='Items'), items=(), make_button=str,  # type: ignore
+    )
+
+    async def b_command(self, event: types.Message) -> None:
+        pass
+
+    @register_message_handler(commands={'c'})
+    async def c_command(self, event: types.Message) -> None:
+        pass
+
+
+def test_autoregistered_names():
+    assert CommandHandler._autoregistered_names == ()
+    assert BaseHandler._autoregistered_names == ('a_command', 'b_command')
+    # Overriding without the decorator cancels the registration
+    assert ChildHandler._autoregistered_names == ('a_command', 'c_command', 'items')
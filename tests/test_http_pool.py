@@ -0,0 +1,50 @@
+import asyncio
+
+from aiokilogram.bot import KiloBot
+from aiokilogram.fake_api import FakeBotAPIServer
+from aiokilogram.http_pool import HttpSessionPool
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import get_free_port
+
+
+def test_shared_session_pool():
+    async def run() -> None:
+        server = FakeBotAPIServer(port=get_free_port())
+        await server.start()
+        pool = HttpSessionPool(limit=1)
+        kilo_bots = [
+            KiloBot(
+                global_settings=BaseGlobalSettings(tg_bot_token=f'{idx}:TEST', tg_api_server=server.url),
+                http_session_pool=pool,
+            )
+            for idx in (1, 2)
+        ]
+        try:
+            bots = [kilo_bot.make_bot() for kilo_bot in kilo_bots]
+            assert all(kilo_bot.http_session_pool is pool for kilo_bot in kilo_bots)
+            assert await bots[0].get_session() is await bots[1].get_session()
+
+            await asyncio.gather(*[
+                bot.send_message(chat_id=idx, text='Hello')
+                for idx in range(5) for bot in bots
+            ])
+            assert pool.stats.requests == 10
+            # A single connection is reused by all requests
+            assert pool.stats.connections_created == 1
+            assert pool.stats.connections_reused == 9
+            assert pool.stats.reuse_ratio == 0.9
+            assert pool.stats.waits > 0
+            assert pool.open_connections == 1
+
+            # The session is closed by the last bot
+            await bots[0].close()
+            assert pool.open_connections == 1
+            # Closing a bot again doesn't release the pool on behalf of the other one
+            await bots[0].close()
+            assert pool.open_connections == 1
+            await bots[1].close()
+            assert pool.open_connections == 0
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+
+# Budgets for importing ``aiokilogram.action`` in a fresh interpreter
+ACTION_IMPORT_TIME_BUDGET = 0.25  # seconds
+# Modules imported in addition to those of ``attr``, which vary between Python versions
+ACTION_EXTRA_MODULE_COUNT_BUDGET = 10
+ACTION_FORBIDDEN_MODULES = ('aiogram', 'aiohttp', 'emoji')
+# Must not be imported until the corresponding feature is used
+LAZY_MODULES = (
+    'emoji', 'cProfile', 'pstats', 'multiprocessing',
+    'aiokilogram.metrics', 'aiokilogram.http_pool', 'aiokilogram.webhook', 'aiokilogram.sharding',
+)
+
+
+def get_import_profile(module_name: str) -> tuple[float, list[str]]:
+    """
+    Import the module in a fresh interpreter with ``-X importtime``.
+    Return the cumulative import time in seconds and the names of the modules it imported
+    """
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+        capture_output=True, text=True, check=True,
+    )
+    # Lines look like "import time: <self us> | <cumulative us> | <indentation><name>".
+    # Nested imports are indented and listed before the module that imported them
+    nested_names: list[str] = []
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative_us, raw_name = line.split('|')
+        name = raw_name.strip()
+        if raw_name.startswith('  '):
+            nested_names.append(name)
+            continue
+        if name == module_name:
+            return int(cumulative_us) / 1_000_000, nested_names
+        nested_names = []
+
+    raise AssertionError(f'Module {module_name} was not imported')
+
+
+def test_action_import_budget():
+    import_time, imported_modules = get_import_profile('aiokilogram.action')
+    forbidden_modules = [
+        name for name in imported_modules
+        if name.split('.')[0] in ACTION_FORBIDDEN_MODULES
+    ]
+    assert not forbidden_modules
+
+    _, attr_modules = get_import_profile('attr')
+    extra_modules = [name for name in imported_modules if name not in attr_modules]
+    assert len(extra_modules) <= ACTION_EXTRA_MODULE_COUNT_BUDGET, extra_modules
+    assert import_time <= ACTION_IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize('module_name', ['aiokilogram.bot', 'aiokilogram.handler'])
+def test_lazy_imports(module_name):
+    _, imported_modules = get_import_profile(module_name)
+    assert 'aiogram' in imported_modules
+    for lazy_module in LAZY_MODULES:
+        assert lazy_module not in imported_modules
@@ -0,0 +1,67 @@
+import asyncio
+
+from aiogram import Bot, types
+from aiogram.bot.api import TelegramAPIServer
+
+from aiokilogram.bot import KiloBot
+from aiokilogram.fake_api import FakeBotAPIServer
+from aiokilogram.handler import CommandHandler
+from aiokilogram.loadtest import LoadGenerator
+from aiokilogram.registration import register_message_handler
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import get_free_port
+
+
+class EchoHandler(CommandHandler):
+    @register_message_handler(commands={'start'})
+    async def start(self, event: types.Message) -> None:
+        await self.respond_with_text(event=event, text='Hello')
+
+
+def test_bot_against_fake_api():
+    async def run() -> None:
+        server = FakeBotAPIServer(port=get_free_port())
+        await server.start()
+        kilo_bot = KiloBot(
+            handler_classes=[EchoHandler],
+            global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST', tg_api_server=server.url),
+        )
+        try:
+            async with kilo_bot._make_dispatcher() as dispatcher:
+                polling_task = asyncio.create_task(dispatcher.start_polling(timeout=1, relax=0))
+                generator = LoadGenerator(server=server, rate=100, duration=0.3, user_count=5, seed=1)
+                report = await generator.run()
+                dispatcher.stop_polling()
+                await asyncio.wait_for(polling_task, timeout=5)
+        finally:
+            await server.stop()
+
+        assert report.updates_sent >= 20
+        assert report.unanswered == 0
+        assert report.replies == report.updates_sent
+        assert 0 < report.get_latency_percentile(50) <= report.get_latency_percentile(99)
+        assert report.throughput > 0
+        assert 'p99=' in report.format()
+        assert server.stats.api_calls['sendmessage'] == report.updates_sent
+
+    asyncio.run(run())
+
+
+def test_fake_api_edits_inline_messages():
+    async def run() -> None:
+        server = FakeBotAPIServer(port=get_free_port())
+        await server.start()
+        bot = Bot(token='12345:TEST', server=TelegramAPIServer.from_base(server.url))
+        try:
+            assert await bot.edit_message_text(text='Edited', inline_message_id='abc') is True
+            assert await bot.edit_message_reply_markup(inline_message_id='abc') is True
+            message = await bot.edit_message_text(text='Edited', chat_id=1, message_id=1)
+            assert message.text == 'Edited'
+        finally:
+            await (await bot.get_session()).close()
+            await server.stop()
+
+        assert server.stats.replies == 3
+        assert server.stats.api_calls['editmessagetext'] == 2
+
+    asyncio.run(run())
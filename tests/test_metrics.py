@@ -0,0 +1,84 @@
+import asyncio
+
+import aiohttp
+from aiogram import Bot, types
+from aiogram.dispatcher.handler import SkipHandler
+
+from aiokilogram.bot import KiloBot
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.handler import CommandHandler
+from aiokilogram.metrics import MetricsRegistry
+from aiokilogram.registration import register_callback_query_handler
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import MyAction, MyEnum, get_free_port, make_callback_update
+
+
+class MyHandler(CommandHandler):
+    @register_callback_query_handler(action=MyAction.when(enum_value=MyEnum.first))
+    async def first(self, query: types.CallbackQuery, action: MyAction) -> None:
+        assert action.some_str == 'thing'
+
+    @register_callback_query_handler(action=MyAction.when(enum_value=MyEnum.second))
+    async def maybe_skip(self, query: types.CallbackQuery, action: MyAction) -> None:
+        if action.some_str == 'skip':
+            raise SkipHandler
+
+    @register_callback_query_handler(action=MyAction)
+    async def other(self, query: types.CallbackQuery) -> None:
+        raise ValueError('Failed')
+
+
+def test_handler_metrics():
+    bot = Bot(token='12345:TEST')
+    dispatcher = KiloDispatcher(bot=bot)
+    registry = MetricsRegistry()
+    handler = MyHandler(
+        bot=bot, global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST'),
+        metrics_registry=registry,
+    )
+    handler.register(dispatcher)
+
+    async def route(data: str) -> None:
+        await dispatcher.process_update(make_callback_update(data))
+
+    asyncio.run(route('first/thing'))
+    asyncio.run(route('first/thing'))
+    asyncio.run(route('second/thing'))
+    try:
+        # Is skipped by maybe_skip and fails in other
+        asyncio.run(route('second/skip'))
+    except ValueError:
+        pass
+
+    labels = ('MyHandler', 'first', 'MyAction')
+    assert registry.counter('kilo_handler_calls_total').labels(*labels).value == 2
+    assert registry.counter('kilo_handler_errors_total').labels(*labels).value == 0
+    assert registry.histogram('kilo_handler_latency_seconds').labels(*labels).count == 2
+    assert registry.gauge('kilo_handler_in_progress').labels(*labels).value == 0
+    other_labels = ('MyHandler', 'other', 'MyAction')
+    assert registry.counter('kilo_handler_errors_total').labels(*other_labels).value == 1
+    # Skipping to the next handler is not an error
+    skip_labels = ('MyHandler', 'maybe_skip', 'MyAction')
+    assert registry.counter('kilo_handler_calls_total').labels(*skip_labels).value == 2
+    assert registry.counter('kilo_handler_errors_total').labels(*skip_labels).value == 0
+
+    text = registry.render()
+    assert '# TYPE kilo_handler_latency_seconds histogram' in text
+    assert 'kilo_handler_calls_total{handler="MyHandler",method="first",action="MyAction"} 2' in text
+    assert 'kilo_handler_latency_seconds_bucket{handler="MyHandler",method="first",action="MyAction",le="+Inf"} 2' in text
+
+
+def test_shard_metrics_port():
+    port = get_free_port()
+
+    async def run() -> None:
+        kilo_bot = KiloBot(
+            handler_classes=[MyHandler],
+            global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST', metrics_port=port - 2),
+        )
+        async with kilo_bot._make_dispatcher(shard_id=2):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{port}/metrics') as response:
+                    assert response.status == 200
+
+    asyncio.run(run())
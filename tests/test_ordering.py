@@ -0,0 +1,107 @@
+import asyncio
+
+from aiogram import Bot, types
+
+from aiokilogram.action_store import MemoryActionStore
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.ordering import OrderedConcurrencyLimiter
+from tests.helpers import make_callback_update, make_message_update
+
+
+def test_ordered_concurrency_limiter():
+    async def run() -> None:
+        limiter = OrderedConcurrencyLimiter(max_concurrency=2)
+        events: list[str] = []
+        max_running = 0
+
+        async def task(key: str, name: str, delay: float) -> None:
+            nonlocal max_running
+            async with limiter.slot(key):
+                max_running = max(max_running, limiter.running)
+                events.append(f'start {name}')
+                await asyncio.sleep(delay)
+                events.append(f'end {name}')
+
+        await asyncio.gather(
+            task('a', 'a1', 0.02), task('a', 'a2', 0), task('b', 'b1', 0), task('c', 'c1', 0),
+        )
+        assert events.index('end a1') < events.index('start a2')
+        assert events.index('start b1') < events.index('end a1')
+        assert max_running == 2
+        assert (limiter.running, limiter.waiting) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_dispatcher_chat_ordering():
+    async def run() -> None:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'), chat_ordered_concurrency=10)
+        received: list[str] = []
+
+        async def handler(event: types.Message) -> None:
+            if event.text == 'slow':
+                await asyncio.sleep(0.02)
+            received.append(f'{event.chat.id}:{event.text}')
+
+        dispatcher.register_message_handler(handler)
+        await dispatcher.process_updates([
+            make_message_update(1, chat_id=1, text='slow'),
+            make_message_update(2, chat_id=1, text='fast'),
+            make_message_update(3, chat_id=2, text='fast'),
+        ])
+        assert received == ['2:fast', '1:slow', '1:fast']
+
+    asyncio.run(run())
+
+
+def test_dispatcher_group_chat_ordering():
+    async def run() -> None:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'), chat_ordered_concurrency=10)
+        received: list[str] = []
+
+        async def message_handler(event: types.Message) -> None:
+            await asyncio.sleep(0.02)
+            received.append('message')
+
+        async def callback_handler(query: types.CallbackQuery) -> None:
+            received.append('button')
+
+        dispatcher.register_message_handler(message_handler)
+        dispatcher.register_callback_query_handler(callback_handler)
+        # A message and a button press of different users in the same group
+        await dispatcher.process_updates([
+            make_message_update(1, chat_id=-100, user_id=1, text='slow'),
+            make_callback_update('x', update_id=2, user_id=2, chat_id=-100),
+        ])
+        assert received == ['message', 'button']
+
+    asyncio.run(run())
+
+
+class SlowActionStore(MemoryActionStore):
+    async def load(self, token: str):
+        await asyncio.sleep(0.02)
+        return await super().load(token)
+
+
+def test_dispatcher_chat_ordering_with_action_store():
+    async def run() -> None:
+        action_store = SlowActionStore()
+        dispatcher = KiloDispatcher(
+            bot=Bot(token='12345:TEST'), chat_ordered_concurrency=10, action_store=action_store,
+        )
+        received: list[str] = []
+
+        async def handler(query: types.CallbackQuery) -> None:
+            received.append(query.data[:4])
+
+        dispatcher.register_callback_query_handler(handler)
+        # Resolving the token of the first button takes a while
+        token = await action_store.shorten('long' * 20)
+        await dispatcher.process_updates([
+            make_callback_update(token, update_id=1, chat_id=1),
+            make_callback_update('short', update_id=2, chat_id=1),
+        ])
+        assert received == ['long', 'shor']
+
+    asyncio.run(run())
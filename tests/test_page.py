@@ -0,0 +1,16 @@
+import pytest
+
+from aiokilogram.emojis import register_emojis, resolve_emoji
+from aiokilogram.page import PlainMessageButton
+
+
+def test_button_emoji():
+    button = PlainMessageButton(text='Like', emoji=':thumbs_up:', callback_data='like')
+    assert button.full_text == '\U0001f44d Like'
+    assert resolve_emoji('thumbs_up') is resolve_emoji(':thumbs_up:')
+
+    register_emojis({'my_custom_emoji': '*'})
+    assert PlainMessageButton(emoji='my_custom_emoji', callback_data='x').full_text == '*'
+
+    with pytest.raises(ValueError):
+        PlainMessageButton(text='Like', emoji='no_such_emoji_code', callback_data='like')
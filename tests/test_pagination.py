@@ -0,0 +1,106 @@
+import asyncio
+from typing import Sequence
+
+import pytest
+from aiogram import Bot, types
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.handler import CommandHandler
+from aiokilogram.page import MessageBody, PlainMessageButton
+from aiokilogram.pagination import PaginatedKeyboard, PaginationAction
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import make_callback_update
+
+
+def make_number_button(number: int) -> PlainMessageButton:
+    return PlainMessageButton(text=str(number), callback_data=f'number/{number}')
+
+
+def get_callback_data(markup: types.InlineKeyboardMarkup) -> list[str]:
+    return [button.callback_data for row in markup.inline_keyboard for button in row]
+
+
+def test_paginated_keyboard():
+    fetched: list[tuple[int, int]] = []
+
+    async def fetch_numbers(offset: int, limit: int) -> Sequence[int]:
+        fetched.append((offset, limit))
+        return range(100)[offset:offset + limit]
+
+    keyboard = PaginatedKeyboard(
+        keyboard_id='numbers', body=MessageBody(text='Numbers'),
+        items=fetch_numbers, make_button=make_number_button, page_size=3,
+    )
+
+    async def run() -> None:
+        first_keyboard = await keyboard.make_keyboard()
+        assert [button.get_callback_data() for button in first_keyboard.buttons] == [
+            'number/0', 'number/1', 'number/2',
+            PaginationAction(keyboard_id='numbers', offset=3).serialize(),
+        ]
+        last_keyboard = await keyboard.make_keyboard(offset=99)
+        assert [button.get_callback_data() for button in last_keyboard.buttons] == [
+            'number/99', PaginationAction(keyboard_id='numbers', offset=96).serialize(),
+        ]
+        assert fetched == [(0, 4), (99, 4)]
+
+    asyncio.run(run())
+
+
+class EditingBot(Bot):
+    def __init__(self) -> None:
+        super().__init__(token='12345:TEST')
+        self.edits: list[dict] = []
+        self.answered: list[str] = []
+
+    async def edit_message_text(self, **kwargs) -> None:  # type: ignore
+        self.edits.append(kwargs)
+
+    async def answer_callback_query(self, callback_query_id: str, **kwargs) -> bool:  # type: ignore
+        self.answered.append(callback_query_id)
+        return True
+
+
+class NumbersHandler(CommandHandler):
+    numbers = PaginatedKeyboard(
+        keyboard_id='numbers', body=MessageBody(text='Numbers'),
+        items=range(10), make_button=make_number_button, page_size=4,
+    )
+
+
+@pytest.mark.parametrize('state', [None, 'Form:name'])
+def test_paginated_keyboard_navigation(state):
+    bot = EditingBot()
+    dispatcher = KiloDispatcher(bot=bot, storage=MemoryStorage())
+    handler = NumbersHandler(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST'))
+    handler.register(dispatcher)
+
+    async def run() -> None:
+        await dispatcher.storage.set_state(chat=100, user=100, state=state)
+        await dispatcher.process_update(make_callback_update(
+            PaginationAction(keyboard_id='numbers', offset=8).serialize(), chat_id=100,
+        ))
+
+    asyncio.run(run())
+    assert bot.answered == ['1']
+    assert len(bot.edits) == 1
+    assert bot.edits[0]['text'] == 'Numbers'
+    assert get_callback_data(bot.edits[0]['reply_markup']) == [
+        'number/8', 'number/9', PaginationAction(keyboard_id='numbers', offset=4).serialize(),
+    ]
+
+
+def test_paginated_keyboard_navigation_in_inline_message():
+    bot = EditingBot()
+    dispatcher = KiloDispatcher(bot=bot)
+    handler = NumbersHandler(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST'))
+    handler.register(dispatcher)
+
+    update = make_callback_update(PaginationAction(keyboard_id='numbers', offset=8).serialize())
+    update.callback_query.inline_message_id = 'inline-1'
+    asyncio.run(dispatcher.process_update(update))
+    assert bot.answered == ['1']
+    assert len(bot.edits) == 1
+    assert bot.edits[0]['inline_message_id'] == 'inline-1'
+    assert get_callback_data(bot.edits[0]['reply_markup'])[:2] == ['number/8', 'number/9']
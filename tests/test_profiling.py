@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import os
+
+from aiogram import Bot, types
+
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.handler import CommandHandler
+from aiokilogram.profiling import UpdateProfiler
+from aiokilogram.registration import register_callback_query_handler
+from aiokilogram.settings import BaseGlobalSettings
+from tests.helpers import MyAction, make_callback_update
+
+
+class SlowHandler(CommandHandler):
+    @register_callback_query_handler(action=MyAction)
+    async def slow(self, query: types.CallbackQuery) -> None:
+        await asyncio.sleep(0.02)
+
+
+def test_update_profiler(tmp_path, caplog):
+    bot = Bot(token='12345:TEST')
+    profiler = UpdateProfiler(slow_threshold=0.01, sample_every=2, output_dir=str(tmp_path))
+    dispatcher = KiloDispatcher(bot=bot, profiler=profiler)
+    handler = SlowHandler(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST'))
+    handler.register(dispatcher)
+
+    async def route(data: str) -> None:
+        await dispatcher.process_update(make_callback_update(data))
+
+    with caplog.at_level(logging.WARNING, logger='aiokilogram.profiling'):
+        for _ in range(4):
+            asyncio.run(route('first/thing'))
+
+    slow_records = [record for record in caplog.records if 'Slow update' in record.getMessage()]
+    assert len(slow_records) == 4
+    message = slow_records[0].getMessage()
+    assert 'SlowHandler.slow' in message
+    assert 'routing=' in message and 'handler=' in message
+
+    assert list(profiler.get_handler_stats()) == ['SlowHandler.slow']
+    profiler.dump_handler_stats()
+    assert sorted(os.listdir(tmp_path)) == ['SlowHandler.slow-1.prof', 'SlowHandler.slow.prof']
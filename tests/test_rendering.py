@@ -0,0 +1,104 @@
+import asyncio
+
+import attr
+import pytest
+from aiogram import types
+
+from aiokilogram.action import CallbackAction, StringActionField
+from aiokilogram.action_store import MemoryActionStore
+from aiokilogram.handler import CommandHandler
+from aiokilogram.page import ActionMessageButton, MessageKeyboard, simple_page
+from aiokilogram.rendering import KeyboardRenderer
+from aiokilogram.settings import BaseGlobalSettings
+
+
+class MyAction(CallbackAction):
+    some_str = StringActionField()
+
+
+def make_keyboard(*values: str) -> MessageKeyboard:
+    page = simple_page(text='text', buttons=[(value, MyAction(some_str=value)) for value in values])
+    assert page.keyboard is not None
+    return page.keyboard
+
+
+def test_keyboard_render_cache():
+    async def run() -> None:
+        renderer = KeyboardRenderer(max_cache_size=2)
+        markup = await renderer.render(make_keyboard('a', 'b'))
+        assert [[button.callback_data for button in row] for row in markup.inline_keyboard] == [['a'], ['b']]
+        assert await renderer.render(make_keyboard('a', 'b')) is markup
+        assert await renderer.render(make_keyboard('a', 'c')) is not markup
+        await renderer.render(make_keyboard('c'))
+        assert await renderer.render(make_keyboard('a', 'b')) is not markup
+        assert (renderer.stats.hits, renderer.stats.misses, renderer.stats.evictions) == (1, 4, 2)
+
+    asyncio.run(run())
+
+
+def test_frozen_keyboard_rendering():
+    async def run() -> None:
+        renderer = KeyboardRenderer(max_cache_size=0)
+        page = simple_page(text='text', buttons=[('a', MyAction(some_str='a'))]).freeze()
+        assert page.keyboard is not None
+        markup = await renderer.render(page.keyboard)
+        assert await renderer.render(page.keyboard) is markup
+        assert (renderer.stats.hits, renderer.stats.misses) == (1, 1)
+
+        with pytest.raises(attr.exceptions.FrozenInstanceError):
+            page.keyboard.row_width = 2
+        with pytest.raises(attr.exceptions.FrozenInstanceError):
+            page.disable_preview = True
+        with pytest.raises(attr.exceptions.FrozenInstanceError):
+            page.body.text = 'other text'
+
+    asyncio.run(run())
+
+
+def test_stored_actions_are_not_cached():
+    async def run() -> None:
+        renderer = KeyboardRenderer(action_store=MemoryActionStore())
+        keyboard = MessageKeyboard(buttons=[ActionMessageButton(text='x', action=MyAction(some_str='x' * 100))])
+        assert await renderer.render(keyboard) is not await renderer.render(keyboard)
+
+    asyncio.run(run())
+
+
+class EditingBot:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def send_message(self, chat_id: int, **kwargs) -> types.Message:
+        self.calls.append('send_message')
+        return types.Message(message_id=10, chat={'id': int(chat_id), 'type': 'private'})
+
+    async def edit_message_text(self, **kwargs) -> None:
+        self.calls.append('edit_message_text')
+
+    async def edit_message_reply_markup(self, **kwargs) -> None:
+        self.calls.append('edit_message_reply_markup')
+
+
+def test_update_message_page():
+    async def run() -> None:
+        bot = EditingBot()
+        handler = CommandHandler(bot=bot, global_settings=BaseGlobalSettings(tg_bot_token=''))
+        message = types.Message(message_id=10, chat={'id': 1, 'type': 'private'})
+        buttons = [('a', MyAction(some_str='a'))]
+
+        await handler.send_message_page(user_id='1', page=simple_page(text='text', buttons=buttons))
+        await handler.update_message_page(message, simple_page(text='text', buttons=buttons))
+        assert bot.calls == ['send_message']
+        await handler.update_message_page(message, simple_page(text='text', buttons=buttons * 2))
+        assert bot.calls[-1] == 'edit_message_reply_markup'
+        await handler.update_message_page(message, simple_page(text='other', buttons=buttons * 2))
+        assert bot.calls[-1] == 'edit_message_text'
+        await handler.update_message_page(message, simple_page(text='other', buttons=buttons * 2))
+        assert len(bot.calls) == 3
+
+        # Unknown messages are always edited
+        other_message = types.Message(message_id=11, chat={'id': 1, 'type': 'private'})
+        await handler.update_message_page(other_message, simple_page(text='other'))
+        assert bot.calls[-1] == 'edit_message_text'
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.utils.exceptions import RetryAfter
+
+from aiokilogram.scheduler import SendPriority, SendScheduler, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    bucket.pause(1)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+
+def test_send_scheduler_priority():
+    async def run() -> None:
+        scheduler = SendScheduler(global_rate=200, global_burst=1, chat_rate=1000, chat_burst=1000)
+        order: list[str] = []
+
+        async def send(name: str, priority: SendPriority) -> None:
+            await scheduler.acquire(chat_id=name, priority=priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(send(f'bulk{idx}', SendPriority.bulk)) for idx in range(4)]
+        await asyncio.sleep(0.001)
+        tasks.append(asyncio.create_task(send('interactive', SendPriority.interactive)))
+        await asyncio.gather(*tasks)
+        await scheduler.close()
+
+        assert order.index('interactive') < 3
+        assert scheduler.stats.lanes[SendPriority.bulk].granted == 4
+        assert scheduler.stats.queue_depth == 0
+
+    asyncio.run(run())
+
+
+def test_send_scheduler_retry():
+    async def run() -> None:
+        scheduler = SendScheduler(max_retries=1, chat_rate=100)
+        attempts: list[int] = []
+
+        async def send() -> str:
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RetryAfter(0.01)
+            return 'ok'
+
+        assert await scheduler.run(chat_id=1, func=send) == 'ok'
+        assert scheduler.stats.retries == 1
+
+        async def always_fail() -> None:
+            raise RetryAfter(0.01)
+
+        with pytest.raises(RetryAfter):
+            await scheduler.run(chat_id=1, func=always_fail)
+        await scheduler.close()
+
+    asyncio.run(run())
+
+
+def test_send_scheduler_retry_pauses_other_chats():
+    async def run() -> None:
+        scheduler = SendScheduler(chat_rate=100)
+        failed = asyncio.Event()
+
+        async def send_once() -> None:
+            if not failed.is_set():
+                failed.set()
+                raise RetryAfter(0.1)
+
+        async def send_to_other_chat() -> float:
+            await failed.wait()
+            started_at = time.monotonic()
+            await scheduler.acquire(chat_id=2)
+            return time.monotonic() - started_at
+
+        # The global limit might have been hit, so other chats wait too
+        _, wait_time = await asyncio.gather(scheduler.run(chat_id=1, func=send_once), send_to_other_chat())
+        assert wait_time >= 0.05
+        await scheduler.close()
+
+    asyncio.run(run())
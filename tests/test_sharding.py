@@ -0,0 +1,93 @@
+import asyncio
+import queue
+
+import pytest
+from aiogram import Bot, types
+
+from aiokilogram.bot import KiloBot
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.settings import BaseGlobalSettings
+from aiokilogram.sharding import ShardHealth, ShardPool, get_update_partition_key, serve_shard
+from tests.helpers import make_callback_update, make_message_update
+
+
+def test_update_partition_key():
+    assert get_update_partition_key(make_message_update(1, chat_id=42, text='x')) == 42
+    assert get_update_partition_key(make_callback_update('x', update_id=2, user_id=43)) == 43
+    # A button in a group chat belongs to the group like the messages in it
+    assert get_update_partition_key(make_callback_update('x', update_id=3, user_id=43, chat_id=-100)) == -100
+    assert get_update_partition_key(make_message_update(4, chat_id=-100, user_id=43, text='x')) == -100
+    assert get_update_partition_key(types.Update(update_id=5)) is None
+
+
+def test_shard_pool_count():
+    with pytest.raises(ValueError):
+        ShardPool(kilo_bot=KiloBot(global_settings=BaseGlobalSettings(tg_bot_token='12345:TEST')), shard_count=0)
+
+
+def test_serve_shard():
+    async def run() -> None:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'))
+        received: list[str] = []
+
+        async def handler(event: types.Message) -> None:
+            if event.text == 'fail':
+                raise ValueError
+            received.append(event.text)
+
+        dispatcher.register_message_handler(handler)
+        update_queue: queue.Queue = queue.Queue()
+        health_queue: queue.Queue = queue.Queue()
+        for idx, text in enumerate(['first', 'fail', 'second']):
+            update_queue.put(make_message_update(idx, chat_id=1, text=text).to_python())
+        update_queue.put(None)
+
+        await serve_shard(
+            dispatcher=dispatcher, shard_id=3,
+            update_queue=update_queue, health_queue=health_queue,
+            health_interval=0,
+        )
+        assert received == ['first', 'second']
+
+        reports: list[ShardHealth] = []
+        while not health_queue.empty():
+            reports.append(health_queue.get())
+        assert reports[-1].shard_id == 3
+        assert reports[-1].alive is False
+        assert (reports[-1].processed, reports[-1].failed) == (2, 1)
+
+    asyncio.run(run())
+
+
+def test_serve_shard_concurrently():
+    async def run() -> None:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'))
+        received: list[str] = []
+        running = max_running = 0
+
+        async def handler(event: types.Message) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            if event.text == 'slow':
+                await asyncio.sleep(0.05)
+            received.append(f'{event.chat.id}:{event.text}')
+            running -= 1
+
+        dispatcher.register_message_handler(handler)
+        update_queue: queue.Queue = queue.Queue()
+        for idx, (chat_id, text) in enumerate([(1, 'slow'), (1, 'fast'), (2, 'fast'), (3, 'slow'), (4, 'slow')]):
+            update_queue.put(make_message_update(idx, chat_id=chat_id, text=text).to_python())
+        update_queue.put(None)
+
+        await serve_shard(
+            dispatcher=dispatcher, shard_id=0,
+            update_queue=update_queue, health_queue=queue.Queue(),
+            health_interval=0, max_pending=3,
+        )
+        # Other chats don't wait for a slow update, but the updates of a chat keep their order
+        assert received.index('2:fast') < received.index('1:slow') < received.index('1:fast')
+        assert len(received) == 5
+        assert 2 <= max_running <= 3
+
+    asyncio.run(run())
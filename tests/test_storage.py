@@ -0,0 +1,118 @@
+import asyncio
+
+from aiokilogram.storage import CachingStorage
+from tests.helpers import CountingStorage
+
+
+def test_caching_storage():
+    backend = CountingStorage()
+    storage = CachingStorage(backend=backend, max_size=2, flush_delay=0.01)
+
+    async def run() -> None:
+        await backend.set_data(chat=1, user=1, data={'a': 1})
+        backend.writes = 0
+
+        assert await storage.get_data(chat=1, user=1) == {'a': 1}
+        assert await storage.get_data(chat=1, user=1) == {'a': 1}
+        assert storage.stats.misses == 1
+        assert storage.stats.hits == 1
+        reads = backend.reads
+
+        # Successive changes are coalesced into a single write
+        await storage.update_data(chat=1, user=1, b=2)
+        await storage.update_data(chat=1, user=1, c=3)
+        await storage.set_state(chat=1, user=1, state='waiting')
+        assert await storage.get_state(chat=1, user=1) == 'waiting'
+        assert backend.writes == 0
+        assert storage.pending_writes == 1
+        await asyncio.sleep(0.05)
+        assert backend.writes == 1
+        assert backend.reads == reads
+        assert await backend.get_data(chat=1, user=1) == {'a': 1, 'b': 2, 'c': 3}
+        assert await backend.get_state(chat=1, user=1) == 'waiting'
+        assert storage.stats.flushes == 1
+        assert storage.stats.coalesced_writes == 2
+        assert storage.stats.last_flush_lag > 0
+
+        # Returned data is a copy
+        data = await storage.get_data(chat=1, user=1)
+        data['a'] = 100
+        assert (await storage.get_data(chat=1, user=1))['a'] == 1
+
+        # Dirty entries are written before being evicted
+        await storage.set_data(chat=2, user=2, data={'x': 1})
+        await storage.set_data(chat=3, user=3, data={'y': 1})
+        assert len(storage) == 2
+        assert storage.stats.evictions == 1
+        assert await backend.get_data(chat=1, user=1) == {'a': 1, 'b': 2, 'c': 3}
+
+        await storage.invalidate(chat=2, user=2)
+        assert await backend.get_data(chat=2, user=2) == {'x': 1}
+        assert len(storage) == 1
+
+        # Pending changes are written on close
+        await storage.update_data(chat=3, user=3, z=2)
+        written_count = len(backend.written)
+        await storage.close()
+        assert backend.written[written_count:] == [{'chat': '3', 'user': '3', 'data': {'y': 1, 'z': 2}}]
+        assert storage.pending_writes == 0
+
+    asyncio.run(run())
+
+
+def test_caching_storage_expiration():
+    backend = CountingStorage()
+    storage = CachingStorage(backend=backend, ttl=0.01)
+
+    async def run() -> None:
+        await storage.get_data(chat=1, user=1)
+        await backend.set_data(chat=1, user=1, data={'a': 1})
+        assert await storage.get_data(chat=1, user=1) == {}
+        await asyncio.sleep(0.02)
+        assert await storage.get_data(chat=1, user=1) == {'a': 1}
+        assert storage.stats.expirations == 1
+
+    asyncio.run(run())
+
+
+class FailingStorage(CountingStorage):
+    def __init__(self):
+        super().__init__()
+        self.failing = True
+
+    async def set_data(self, **kwargs):
+        if self.failing:
+            raise ConnectionError('Backend is down')
+        return await super().set_data(**kwargs)
+
+
+def test_caching_storage_with_failing_backend():
+    backend = FailingStorage()
+    storage = CachingStorage(backend=backend, max_size=2, flush_delay=0.01)
+
+    async def run() -> None:
+        await storage.set_data(chat=1, user=1, data={'a': 1})
+        await storage.set_data(chat=2, user=2, data={'b': 1})
+        # Entries with unwritten changes are not evicted, nor is the entry being loaded
+        await storage.set_data(chat=3, user=3, data={'x': 'important'})
+        assert len(storage) == 3
+        assert storage.stats.evictions == 0
+        assert storage.stats.flush_errors == 2
+        assert storage.pending_writes == 3
+
+        # The failed writes are retried once the backend recovers
+        await asyncio.sleep(0.05)
+        assert storage.pending_writes == 3
+        backend.failing = False
+        await asyncio.sleep(0.05)
+        assert storage.pending_writes == 0
+        for chat, data in ((1, {'a': 1}), (2, {'b': 1}), (3, {'x': 'important'})):
+            assert await backend.get_data(chat=chat, user=chat) == data
+
+        # The cache shrinks back on the next load
+        await storage.get_data(chat=4, user=4)
+        assert len(storage) == 2
+        assert storage.stats.evictions == 2
+        await storage.close()
+
+    asyncio.run(run())
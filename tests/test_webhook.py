@@ -0,0 +1,108 @@
+import asyncio
+
+from aiogram import Bot, types
+from aiohttp.test_utils import TestClient, TestServer
+
+from aiokilogram.bot import KiloBot
+from aiokilogram.dispatcher import KiloDispatcher
+from aiokilogram.settings import BaseGlobalSettings
+from aiokilogram.webhook import SECRET_TOKEN_HEADER, WebhookServer
+from tests.helpers import get_free_port, make_message_update
+
+
+def test_webhook_server():
+    async def run() -> None:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'))
+        received: list[str] = []
+
+        async def handler(event: types.Message) -> None:
+            received.append(event.text)
+
+        dispatcher.register_message_handler(handler)
+        server = WebhookServer(dispatcher=dispatcher, path='/hook', secret_token='secret')
+        update = {
+            'update_id': 1,
+            'message': {
+                'message_id': 1, 'date': 0, 'text': 'hello',
+                'chat': {'id': 100, 'type': 'private'},
+                'from': {'id': 100, 'is_bot': False, 'first_name': 'User'},
+            },
+        }
+
+        async with TestClient(TestServer(server.make_app())) as client:
+            response = await client.post('/hook', json=update)
+            assert response.status == 403
+            response = await client.post('/hook', data='not json', headers={SECRET_TOKEN_HEADER: 'secret'})
+            assert response.status == 400
+            response = await client.post('/hook', json=update, headers={SECRET_TOKEN_HEADER: 'secret'})
+            assert response.status == 200
+
+        await server.wait_processed()
+        assert received == ['hello']
+
+    asyncio.run(run())
+
+
+def test_webhook_server_max_pending():
+    async def run() -> None:
+        dispatcher = KiloDispatcher(bot=Bot(token='12345:TEST'))
+        release = asyncio.Event()
+        received: list[str] = []
+
+        async def handler(event: types.Message) -> None:
+            await release.wait()
+            received.append(event.text)
+
+        dispatcher.register_message_handler(handler)
+        server = WebhookServer(dispatcher=dispatcher, max_pending=1)
+        async with TestClient(TestServer(server.make_app())) as client:
+            first = await client.post('/webhook', json=make_message_update(1, chat_id=1, text='first').to_python())
+            assert first.status == 200
+            second = asyncio.create_task(
+                client.post('/webhook', json=make_message_update(2, chat_id=2, text='second').to_python()),
+            )
+            await asyncio.sleep(0.05)
+            # The second update waits until the first one is processed
+            assert not second.done()
+            release.set()
+            assert (await second).status == 200
+
+        await server.wait_processed()
+        assert received == ['first', 'second']
+
+    asyncio.run(run())
+
+
+class WebhookBot(Bot):
+    def __init__(self) -> None:
+        super().__init__(token='12345:TEST')
+        self.calls: list[str] = []
+
+    async def set_webhook(self, url: str, **kwargs) -> bool:  # type: ignore
+        self.calls.append(f'set {url}')
+        return True
+
+    async def delete_webhook(self, **kwargs) -> bool:  # type: ignore
+        self.calls.append('delete')
+        return True
+
+
+def test_run_webhook_deletes_webhook():
+    async def run() -> None:
+        settings = BaseGlobalSettings(
+            tg_bot_token='12345:TEST', webhook_url='https://example.com/webhook',
+            webhook_host='127.0.0.1', webhook_port=get_free_port(),
+        )
+        bot = WebhookBot()
+        serve_task = asyncio.create_task(KiloBot(global_settings=settings).run_webhook(
+            bot=bot, dispatcher=KiloDispatcher(bot=bot),
+        ))
+        await asyncio.sleep(0.05)
+        serve_task.cancel()
+        try:
+            await serve_task
+        except asyncio.CancelledError:
+            pass
+        assert bot.calls == ['set https://example.com/webhook', 'delete']
+
+    asyncio.run(run())